@@ -2,6 +2,7 @@
 Configuration settings loaded from environment variables
 """
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -13,9 +14,21 @@ class Config:
     # Gemini API
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
     GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-3-flash-preview")  # Default to Gemini 3 Flash for speed/cost
+    # Alternative API endpoint, e.g. the local stand-in used for load tests ("" uses Google's)
+    GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT", "")
+    # Gemini transport: "passthrough" (live API), "record" (live, saving prompt/response pairs
+    # to GEMINI_CASSETTE_PATH) or "replay" (answer from the cassette offline)
+    GEMINI_TRANSPORT = os.getenv("GEMINI_TRANSPORT", "passthrough")
+    GEMINI_CASSETTE_PATH = os.getenv("GEMINI_CASSETTE_PATH", "gemini_cassette.jsonl")
+    # Replay latency: "" (none), "recorded" (as long as the recorded call took) or milliseconds
+    GEMINI_REPLAY_LATENCY = os.getenv("GEMINI_REPLAY_LATENCY", "")
+    GEMINI_REPLAY_JITTER_MS = float(os.getenv("GEMINI_REPLAY_JITTER_MS", 0))
     
     # File upload settings
     MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE", 10 * 1024 * 1024))  # Default 10MB
+    # pandas engine workbooks are parsed with first, falling back to openpyxl (.xlsx) / xlrd (.xls)
+    # on files it fails on ("" uses those only)
+    EXCEL_ENGINE = os.getenv("EXCEL_ENGINE", "calamine")
         
     # Server settings
     HOST = os.getenv("HOST")
@@ -24,6 +37,56 @@ class Config:
     # CORS settings
     CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*").split(",") if os.getenv("CORS_ORIGINS") != "*" else ["*"]
     
+    # Charts - traces with more points than this are downsampled / pre-aggregated (0 disables)
+    CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", 5000))
+    # Number of generated charts kept in the in-memory result cache (0 disables)
+    CHART_CACHE_SIZE = int(os.getenv("CHART_CACHE_SIZE", 256))
+    
+    # Seconds between batched writes of Session.last_accessed
+    SESSION_ACCESS_FLUSH_INTERVAL = float(os.getenv("SESSION_ACCESS_FLUSH_INTERVAL", 5))
+    
+    # Conversation log write-behind: flush after this many entries or this many seconds
+    CONVERSATION_LOG_BATCH_SIZE = int(os.getenv("CONVERSATION_LOG_BATCH_SIZE", 100))
+    CONVERSATION_LOG_FLUSH_INTERVAL = float(os.getenv("CONVERSATION_LOG_FLUSH_INTERVAL", 1))
+    
+    # Idle session reaper: sessions unused for SESSION_IDLE_TTL seconds are deleted (0 disables)
+    SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", 7 * 24 * 3600))
+    SESSION_REAPER_INTERVAL = float(os.getenv("SESSION_REAPER_INTERVAL", 600))
+    SESSION_REAPER_BATCH_SIZE = int(os.getenv("SESSION_REAPER_BATCH_SIZE", 100))
+    # Conversations deleted per reaper transaction
+    SESSION_REAPER_ROW_BATCH_SIZE = int(os.getenv("SESSION_REAPER_ROW_BATCH_SIZE", 5000))
+    
+    # Startup warm-up: sessions accessed within SESSION_WARMUP_WINDOW seconds are loaded into the
+    # cache in the background (0 disables) - the most recent SESSION_WARMUP_LIMIT of them,
+    # SESSION_WARMUP_CONCURRENCY at a time
+    SESSION_WARMUP_WINDOW = float(os.getenv("SESSION_WARMUP_WINDOW", 3600))
+    SESSION_WARMUP_LIMIT = int(os.getenv("SESSION_WARMUP_LIMIT", 50))
+    SESSION_WARMUP_CONCURRENCY = int(os.getenv("SESSION_WARMUP_CONCURRENCY", 2))
+    # /ready answers 503 until this fraction of them is warm, or for at most this many seconds
+    SESSION_WARMUP_READY_FRACTION = float(os.getenv("SESSION_WARMUP_READY_FRACTION", 0.9))
+    SESSION_WARMUP_READY_TIMEOUT = float(os.getenv("SESSION_WARMUP_READY_TIMEOUT", 120))
+    
+    # Host-local store parsed uploads are shared through by all workers ("" disables)
+    SHARED_STORE_DIR = os.getenv(
+        "SHARED_STORE_DIR",
+        "/dev/shm/finance-ai-agent" if os.path.isdir("/dev/shm")
+        else os.path.join(tempfile.gettempdir(), "finance-ai-agent")
+    )
+    
+    # Blob storage for uploads and parsed data shared by all nodes: "local", "s3" or "" (single node)
+    BLOB_BACKEND = os.getenv("BLOB_BACKEND", "")
+    BLOB_LOCAL_DIR = os.getenv("BLOB_LOCAL_DIR", "blobs")
+    BLOB_S3_BUCKET = os.getenv("BLOB_S3_BUCKET", "")
+    BLOB_S3_PREFIX = os.getenv("BLOB_S3_PREFIX", "")
+    BLOB_S3_ENDPOINT_URL = os.getenv("BLOB_S3_ENDPOINT_URL")  # e.g. a local MinIO for testing
+    BLOB_S3_REGION = os.getenv("BLOB_S3_REGION")
+    
+    # PostgreSQL NOTIFY channel for cross-node cache invalidation ("" disables)
+    CACHE_INVALIDATION_CHANNEL = os.getenv("CACHE_INVALIDATION_CHANNEL", "session_invalidation")
+    
+    # Append each request's trace to this file as OTLP/JSON lines ("" disables)
+    TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "")
+    
     # Upload directory
     UPLOAD_DIR = "uploads"
     
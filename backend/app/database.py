@@ -1,9 +1,12 @@
 """
 Database connection and session management
 """
-from sqlalchemy import create_engine
+import time
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import QueuePool
 from app.config import Config
+from app.services.metrics import DB_POOL_CHECKOUT, STAGE_DURATION, registry, gauge_family
 
 # Build database URL from config
 DATABASE_URL = (
@@ -11,13 +14,51 @@ DATABASE_URL = (
     f"{Config.DB_HOST}:{Config.DB_PORT}/{Config.DB_NAME}"
 )
 
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waits for a connection"""
+    
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            DB_POOL_CHECKOUT.observe(time.perf_counter() - started)
+
+
 # Create engine
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+engine = create_engine(DATABASE_URL, pool_pre_ping=True, poolclass=TimedQueuePool)
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+@event.listens_for(SessionLocal, "before_commit")
+def _commit_started(session):
+    session.info["commit_started"] = time.perf_counter()
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _commit_finished(session):
+    started = session.info.pop("commit_started", None)
+    if started is not None:
+        STAGE_DURATION.observe(time.perf_counter() - started, stage="db_commit")
+
+
+def _collect_pool_metrics():
+    """Connection pool occupancy, read at scrape time"""
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return []
+    return [
+        gauge_family("finance_ai_db_pool_checked_out", "Connections currently checked out", pool.checkedout()),
+        gauge_family("finance_ai_db_pool_size", "Configured pool size", pool.size()),
+    ]
+
+registry.add_collector(_collect_pool_metrics)
+
+
 def get_db():
     """Dependency for getting database session"""
     db = SessionLocal()
@@ -1,8 +1,15 @@
-from fastapi import FastAPI
+import time
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from app.routes import session, upload, query, visualize
 from app.config import Config
 from app.database import init_db
+from app.services.metrics import REQUEST_DURATION, registry
+from app.services.tracing import start_trace
+from app.services.shared import (
+    access_tracker, conversation_logger, session_reaper, session_warmer, shared_store, invalidation_bus, trace_exporter
+)
 
 app = FastAPI(
     title="Finance AI Agent API",
@@ -13,8 +20,27 @@ app = FastAPI(
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database on startup"""
+    """Initialize database, start background writers and warm recently active sessions on startup"""
     init_db()
+    # In the background - /ready reports when enough sessions are warm
+    session_warmer.start()
+    if shared_store is not None:
+        # Entries left behind by workers that have exited (crash, restart)
+        shared_store.sweep()
+    access_tracker.start()
+    conversation_logger.start()
+    session_reaper.start()
+    invalidation_bus.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Flush pending background writes before exiting"""
+    await session_warmer.stop()
+    await invalidation_bus.stop()
+    await session_reaper.stop()
+    await conversation_logger.stop()
+    await access_tracker.stop()
 
 # CORS middleware - configured from environment variables
 app.add_middleware(
@@ -25,6 +51,37 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def record_request_duration(request: Request, call_next):
+    """
+    Trace the request and record its latency per route template
+    (not per URL, to bound label cardinality)
+    """
+    started = time.perf_counter()
+    status = 500
+    with start_trace(f"{request.method} {request.url.path}", **{"http.method": request.method}) as trace:
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            route = request.scope.get("route")
+            route_path = route.path if route is not None else "unmatched"
+            REQUEST_DURATION.observe(
+                time.perf_counter() - started,
+                method=request.method,
+                route=route_path,
+                status=str(status)
+            )
+            trace.root.name = f"{request.method} {route_path}"
+            trace.root.set_attribute("http.route", route_path)
+            trace.root.set_attribute("http.status_code", status)
+            trace.root.end()
+            # Only requests that ran pipeline stages are worth exporting (not health checks, scrapes)
+            if trace_exporter is not None and len(trace.spans) > 1:
+                trace_exporter.export(trace)
+
 # Include routers
 app.include_router(session.router)
 app.include_router(upload.router)
@@ -39,14 +96,33 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "session": "/api/session",
+            "history": "/api/session/{session_id}/history",
             "upload": "/api/upload",
             "query": "/api/query",
-            "visualize": "/api/visualize"
+            "visualize": "/api/visualize",
+            "metrics": "/metrics",
+            "health": "/health",
+            "ready": "/ready"
         }
     }
 
 
 @app.get("/health")
 async def health_check():
+    """Liveness - the process is up, whether or not it is ready for traffic"""
     return {"status": "healthy"}
 
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness - 503 while startup warm-up of recently active sessions is below its threshold"""
+    warmup = session_warmer.status()
+    if not warmup["ready"]:
+        return JSONResponse({"status": "warming", "warmup": warmup}, status_code=503)
+    return {"status": "ready", "warmup": warmup}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus scrape endpoint (this worker's metrics)"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,7 +1,7 @@
 """
 SQLAlchemy ORM models for PostgreSQL database
 """
-from sqlalchemy import Column, String, DateTime, Text, JSON, ForeignKey, Integer
+from sqlalchemy import Column, String, DateTime, Text, JSON, ForeignKey, Integer, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
@@ -17,6 +17,7 @@ class Session(Base):
     session_id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     created_at = Column(DateTime, default=datetime.now)
     last_accessed = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")  # Bumped on every data change
     
     # Relationships
     uploaded_files = relationship("UploadedFile", back_populates="session", cascade="all, delete-orphan")
@@ -29,7 +30,7 @@ class UploadedFile(Base):
     __tablename__ = "uploaded_files"
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    session_id = Column(String, ForeignKey("sessions.session_id"), nullable=False)
+    session_id = Column(String, ForeignKey("sessions.session_id"), nullable=False, index=True)
     filename = Column(String, nullable=False)
     file_path = Column(String, nullable=False)  # Path to the stored file
     file_size = Column(Integer, nullable=False)  # File size in bytes
@@ -45,8 +46,8 @@ class Sheet(Base):
     __tablename__ = "sheets"
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    session_id = Column(String, ForeignKey("sessions.session_id"), nullable=False)
-    uploaded_file_id = Column(Integer, ForeignKey("uploaded_files.id"), nullable=True)
+    session_id = Column(String, ForeignKey("sessions.session_id"), nullable=False, index=True)
+    uploaded_file_id = Column(Integer, ForeignKey("uploaded_files.id"), nullable=True, index=True)
     sheet_name = Column(String, nullable=False)
     schema_info_json = Column(JSON, nullable=False)  # Store schema as JSON
     created_at = Column(DateTime, default=datetime.now)
@@ -59,12 +60,17 @@ class Sheet(Base):
 class Conversation(Base):
     """Conversation table - stores query/response history"""
     __tablename__ = "conversations"
+    __table_args__ = (
+        # Serves keyset pagination of a session's history (and lookups by session_id)
+        Index("ix_conversations_session_created_id", "session_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     session_id = Column(String, ForeignKey("sessions.session_id"), nullable=False)
     question = Column(Text, nullable=True)  # For query requests
     answer = Column(Text, nullable=True)  # Response from AI
     query_used = Column(Text, nullable=True)  # Generated pandas code
+    trace = Column(JSON, nullable=True)  # Per-stage timing breakdown of the request (see tracing.Trace.to_record)
     created_at = Column(DateTime, default=datetime.now)
     
     # Relationships
@@ -1,11 +1,27 @@
 from pydantic import BaseModel
 from typing import List, Dict, Optional, Any
+from datetime import datetime
 
 
 class SessionResponse(BaseModel):
     session_id: str
 
 
+class ConversationTurn(BaseModel):
+    id: int
+    created_at: datetime
+    question: Optional[str] = None
+    answer: Optional[str] = None
+    query_used: Optional[str] = None
+    trace: Optional[Dict[str, Any]] = None
+
+
+class ConversationHistoryResponse(BaseModel):
+    session_id: str
+    turns: List[ConversationTurn]
+    next_cursor: Optional[str] = None  # Pass as ?cursor= to fetch the next (older) page
+
+
 class FileUploadInfo(BaseModel):
     filename: str
     sheets: List[str]
@@ -42,4 +58,5 @@ class VisualizeResponse(BaseModel):
     chart_type: str
     chart_data: Dict[str, Any]
     description: str
+    reductions: List[Dict[str, Any]] = []  # Traces that were downsampled / pre-aggregated
 
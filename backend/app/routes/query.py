@@ -1,24 +1,39 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header
+from starlette.concurrency import run_in_threadpool
 from app.models.schemas import QueryRequest, QueryResponse
-from app.services.shared import db_session_manager, get_gemini_service, chart_generator
+from app.services.shared import db_session_manager, get_gemini_service, query_flights
+from app.services.db_session_manager import SessionData
+from app.services.chart_cache import ChartCache
+from app.services.chart_pipeline import generate_chart
+from app.services.code_analysis import referenced_columns
+from app.services.chart_serializer import ChartJSONResponse, accepts_bdata
+from app.services.metrics import time_stage
 from app.database import get_db
 from sqlalchemy.orm import Session
+from typing import Any, Dict, Optional
 
 router = APIRouter(prefix="/api", tags=["query"])
 
 
 @router.post("/query", response_model=QueryResponse)
-async def query_data(request: QueryRequest, db: Session = Depends(get_db)):
+async def query_data(
+    request: QueryRequest,
+    db: Session = Depends(get_db),
+    accept: Optional[str] = Header(None)
+):
     """
     Answer a natural language question - handles greetings, data queries, and out-of-scope questions
     If session_id is not provided or invalid, a new session will be created
+    Visualization answers honour "Accept: application/vnd.plotly.bdata+json" like /api/visualize
     """
     # Get or create session
     session_id = db_session_manager.get_or_create_session(db, request.session_id)
     
     # Get session data
     try:
-        session = db_session_manager.get_session(db, session_id)
+        with time_stage("session_load") as span:
+            session = await run_in_threadpool(db_session_manager.get_session, db, session_id)
+            span.set_attribute("sheets", len(session.dataframes))
         has_data = bool(session.dataframes)
         schema_info = session.schema_info if has_data else {}
     except ValueError:
@@ -43,130 +58,131 @@ async def query_data(request: QueryRequest, db: Session = Depends(get_db)):
                 detail="Gemini API key not configured. Please set GEMINI_API_KEY environment variable."
             )
         
-        # Classify the query using AI
-        query_type = gemini_service.classify_query(
-            question=request.question,
-            has_data=has_data,
-            schema_info=schema_info if has_data else None
+        # Identical questions on the same data arriving together share one run of the pipeline
+        flight_key = (
+            session_id,
+            db_session_manager.get_data_version(session_id),
+            ChartCache.normalize(request.question)
         )
+        outcome, _ = await query_flights.do(flight_key, answer_question, gemini_service, session, request.question)
         
-        # Handle different query types
-        if query_type == 'greeting' or query_type == 'conversational':
-            # Handle greetings and conversational queries
-            answer = gemini_service.handle_conversational_query(
-                question=request.question,
-                has_data=has_data,
-                schema_info=schema_info if has_data else None
-            )
-            
-            # Save conversation
-            db_session_manager.save_conversation(
-                db=db,
-                session_id=session_id,
-                question=request.question,
-                answer=answer,
-                query_used=None
-            )
+        if outcome["query_type"] == 'visualization':
+            chart = outcome["chart"]
             
-            return QueryResponse(
-                session_id=session_id,
-                answer=answer,
-                query_used=None,
-                data=None
-            )
-        
-        elif query_type == 'out_of_scope':
-            # Politely decline
-            answer = gemini_service.handle_out_of_scope_query(request.question)
+            # Return response with chart data in the data field
+            # Serialized once with orjson instead of validating the figure through QueryResponse
+            response = ChartJSONResponse({
+                "session_id": session_id,
+                "answer": outcome["answer"],
+                "query_used": None,  # Don't send code to frontend
+                "data": {
+                    "chart_type": chart["chart_type"],
+                    "chart_data": chart["chart_data"],
+                    "reductions": chart["reductions"],
+                    "is_visualization": True
+                }
+            }, binary_arrays=accepts_bdata(accept))
             
-            # Save conversation
+            # Save conversation - after serializing, so its trace includes serialize_chart
             db_session_manager.save_conversation(
                 db=db,
                 session_id=session_id,
                 question=request.question,
-                answer=answer,
-                query_used=None
+                answer=outcome["answer"],
+                query_used=outcome["code"]
             )
             
-            return QueryResponse(
-                session_id=session_id,
-                answer=answer,
-                query_used=None,
-                data=None
-            )
+            return response
         
-        elif query_type == 'visualization':
-            # Handle visualization requests - generate chart
-            # Generate chart code
-            code = gemini_service.generate_chart_code(
-                request=request.question,
-                schema_info=schema_info
-            )
-            
-            # Execute code and get chart JSON
-            chart_data = chart_generator.execute_chart_code(
-                code=code,
-                dataframes=session.dataframes
-            )
-            
-            # Determine chart type
-            chart_type = chart_generator.get_chart_type(chart_data)
-            
-            # Generate description
-            description = f"Visualization showing: {request.question}"
-            
-            # Save conversation
-            db_session_manager.save_conversation(
-                db=db,
-                session_id=session_id,
-                question=request.question,
-                answer=description,
-                query_used=code
-            )
-            
-            # Return response with chart data in the data field
-            return QueryResponse(
-                session_id=session_id,
-                answer=description,
-                query_used=None,  # Don't send code to frontend
-                data={
-                    "chart_type": chart_type,
-                    "chart_data": chart_data,
-                    "is_visualization": True
-                }
-            )
+        # Save conversation (code is saved but not shown to user)
+        db_session_manager.save_conversation(
+            db=db,
+            session_id=session_id,
+            question=request.question,
+            answer=outcome["answer"],
+            query_used=outcome["code"]
+        )
         
-        elif query_type == 'data_query':
-            # Process data query (data is guaranteed to exist due to check above)
-            # Generate code to answer the question
-            code = gemini_service.generate_query_code(
-                question=request.question,
-                schema_info=schema_info
-            )
-            
-            # Execute the code safely
-            safe_globals = {
-                'pd': __import__('pandas'),
-                'dataframes': session.dataframes,
-                '__builtins__': {
-                    'len': len,
-                    'str': str,
-                    'int': int,
-                    'float': float,
-                    'list': list,
-                    'dict': dict,
-                    'range': range,
-                    'enumerate': enumerate,
-                    'zip': zip,
-                    'min': min,
-                    'max': max,
-                    'sum': sum,
-                    'abs': abs,
-                    'round': round,
-                    '__import__': __import__,
-                }
+        return QueryResponse(
+            session_id=session_id,
+            answer=outcome["answer"],
+            query_used=None,  # Don't send code to frontend
+            data=None  # Data not used by frontend, only AI answer is displayed
+        )
+    
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing query: {str(e)}"
+        )
+
+
+def answer_question(gemini_service, session: SessionData, question: str) -> Dict[str, Any]:
+    """
+    Classify a question and answer it - handles greetings, data queries, visualizations and
+    out-of-scope questions. Runs in the threadpool; returns query_type, answer, the generated
+    code (or None) and, for visualizations, the chart entry. The result may be shared between
+    coalesced requests and must not be mutated.
+    """
+    schema_info = session.schema_info
+    
+    # Classify the query using AI
+    query_type = gemini_service.classify_query(
+        question=question,
+        has_data=True,
+        schema_info=schema_info
+    )
+    
+    # Handle different query types
+    if query_type == 'out_of_scope':
+        # Politely decline
+        answer = gemini_service.handle_out_of_scope_query(question)
+        return {"query_type": query_type, "answer": answer, "code": None}
+    
+    elif query_type == 'visualization':
+        # Handle visualization requests - generate (or reuse a cached) chart
+        chart = generate_chart(gemini_service, session, question)
+        
+        # Generate description
+        description = f"Visualization showing: {question}"
+        return {"query_type": query_type, "answer": description, "code": chart["code"], "chart": chart}
+    
+    elif query_type == 'data_query':
+        # Process data query (data is guaranteed to exist due to the route's check)
+        # Generate code to answer the question
+        code = gemini_service.generate_query_code(
+            question=question,
+            schema_info=schema_info
+        )
+        
+        # Read the sheets the code references up front - only the columns it uses where that
+        # can be told - and any others when accessed
+        dataframes = session.dataframes.view(referenced_columns(code, session.schema_info))
+        
+        # Execute the code safely
+        safe_globals = {
+            'pd': __import__('pandas'),
+            'dataframes': dataframes,
+            '__builtins__': {
+                'len': len,
+                'str': str,
+                'int': int,
+                'float': float,
+                'list': list,
+                'dict': dict,
+                'range': range,
+                'enumerate': enumerate,
+                'zip': zip,
+                'min': min,
+                'max': max,
+                'sum': sum,
+                'abs': abs,
+                'round': round,
+                '__import__': __import__,
             }
-            
+        }
+        
+        with time_stage("execute_query") as span:
             exec(code, safe_globals)
             
             # Get result
@@ -174,55 +190,20 @@ async def query_data(request: QueryRequest, db: Session = Depends(get_db)):
                 result = safe_globals['result']
             else:
                 result = None
-            
-            # Generate natural language answer
-            answer = gemini_service.generate_answer_from_result(
-                question=request.question,
-                result=result
-            )
-            
-            # Save conversation (code is saved but not shown to user)
-            db_session_manager.save_conversation(
-                db=db,
-                session_id=session_id,
-                question=request.question,
-                answer=answer,
-                query_used=code
-            )
-            
-            return QueryResponse(
-                session_id=session_id,
-                answer=answer,
-                query_used=None,  # Don't send code to frontend
-                data=None  # Data not used by frontend, only AI answer is displayed
-            )
+            span.set_attribute("result_type", type(result).__name__)
+            span.set_attribute("result_chars", len(str(result)))
         
-        else:
-            # Fallback to conversational
-            answer = gemini_service.handle_conversational_query(
-                question=request.question,
-                has_data=has_data,
-                schema_info=schema_info if has_data else None
-            )
-            
-            db_session_manager.save_conversation(
-                db=db,
-                session_id=session_id,
-                question=request.question,
-                answer=answer,
-                query_used=None
-            )
-            
-            return QueryResponse(
-                session_id=session_id,
-                answer=answer,
-                query_used=None,
-                data=None
-            )
-    
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error processing query: {str(e)}"
+        # Generate natural language answer
+        answer = gemini_service.generate_answer_from_result(
+            question=question,
+            result=result
         )
-
+        return {"query_type": query_type, "answer": answer, "code": code}
+    
+    # Greetings, conversational queries and anything unrecognized
+    answer = gemini_service.handle_conversational_query(
+        question=question,
+        has_data=True,
+        schema_info=schema_info
+    )
+    return {"query_type": query_type, "answer": answer, "code": None}
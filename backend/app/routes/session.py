@@ -1,11 +1,34 @@
-from fastapi import APIRouter, Depends
-from app.models.schemas import SessionResponse
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.models.schemas import SessionResponse, ConversationHistoryResponse, ConversationTurn
+from app.models.db_models import Session as DBSessionModel
 from app.services.shared import db_session_manager
 from app.database import get_db
 from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Optional, Tuple
+import base64
+import json
 
 router = APIRouter(prefix="/api", tags=["session"])
 
+# Conversation columns that can be requested through ?fields=
+HISTORY_FIELDS = ("question", "answer", "query_used", "trace")
+MAX_HISTORY_PAGE_SIZE = 200
+
+
+def _encode_cursor(created_at: datetime, turn_id: int) -> str:
+    """Opaque cursor pointing just past the given turn"""
+    raw = json.dumps([created_at.isoformat(), turn_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        created_at, turn_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), int(turn_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 
 @router.get("/session", response_model=SessionResponse)
 async def create_session(db: Session = Depends(get_db)):
@@ -13,3 +36,49 @@ async def create_session(db: Session = Depends(get_db)):
     session_id = db_session_manager.create_session(db)
     return SessionResponse(session_id=session_id)
 
+
+@router.get(
+    "/session/{session_id}/history",
+    response_model=ConversationHistoryResponse,
+    response_model_exclude_unset=True
+)
+async def get_history(
+    session_id: str,
+    limit: int = Query(50, ge=1, le=MAX_HISTORY_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: str = Query("question,answer", description=f"Comma-separated subset of: {', '.join(HISTORY_FIELDS)}"),
+    db: Session = Depends(get_db)
+):
+    """
+    Page through a session's conversation history, newest first
+    Uses keyset pagination - follow next_cursor for older turns; every page costs the same
+    Entries are written in the background, so the latest turn can take a moment to appear
+    """
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in HISTORY_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    
+    if db.get(DBSessionModel, session_id) is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    before = _decode_cursor(cursor) if cursor else None
+    # Fetch one extra row to know whether another page exists
+    rows = db_session_manager.get_conversation_history(
+        db=db,
+        session_id=session_id,
+        limit=limit + 1,
+        before=before,
+        fields=requested
+    )
+    
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = _encode_cursor(page[-1].created_at, page[-1].id)
+    
+    return ConversationHistoryResponse(
+        session_id=session_id,
+        turns=[ConversationTurn(**row._asdict()) for row in page],
+        next_cursor=next_cursor
+    )
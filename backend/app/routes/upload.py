@@ -1,7 +1,9 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Depends
+from starlette.concurrency import run_in_threadpool
 from typing import List, Optional
 from app.models.schemas import UploadResponse, FileUploadInfo
 from app.services.shared import db_session_manager, excel_parser
+from app.services.excel_parser import SUPPORTED_EXTENSIONS
 from app.config import Config
 from app.database import get_db
 from sqlalchemy.orm import Session
@@ -18,7 +20,7 @@ async def upload_file(
     db: Session = Depends(get_db)
 ):
     """
-    Upload one or more Excel files for a session
+    Upload one or more Excel, CSV, Parquet or JSON-lines files for a session
     Supports multiple file uploads - all files will be merged into the session
     If session_id is not provided or invalid, a new session will be created
     
@@ -48,8 +50,8 @@ async def upload_file(
                 continue
             
             file_ext = os.path.splitext(file.filename)[1].lower()
-            if file_ext not in ['.xlsx', '.xls']:
-                errors.append(f"{file.filename}: Only .xlsx and .xls files are supported")
+            if file_ext not in SUPPORTED_EXTENSIONS:
+                errors.append(f"{file.filename}: Only {', '.join(SUPPORTED_EXTENSIONS)} files are supported")
                 continue
             
             # Read file content to check size
@@ -72,14 +74,16 @@ async def upload_file(
             
             # File is now closed, safe to parse
             
-            # Parse Excel file
+            # Parse the file (workbook sheets, or the single table of a CSV / Parquet / JSON-lines file)
             try:
-                dataframes = excel_parser.parse_excel(file_path)
+                # In the threadpool, so queries on other sessions keep being served meanwhile
+                dataframes = await run_in_threadpool(excel_parser.parse_file, file_path)
                 schema_info = excel_parser.extract_schema_info(dataframes)
                 
                 # Update session with data in database (handles conflicts internally)
                 # Pass file_size to the session manager
-                db_session_manager.update_session_data(
+                await run_in_threadpool(
+                    db_session_manager.update_session_data,
                     db=db,
                     session_id=session_id,
                     file_path=file_path,
@@ -89,7 +93,7 @@ async def upload_file(
                 )
                 
                 # Get updated session to see final sheet names (after conflict resolution)
-                session_data = db_session_manager.get_session(db, session_id)
+                session_data = await run_in_threadpool(db_session_manager.get_session, db, session_id)
                 
                 # Collect info for response - use original sheet names from this file
                 sheets = list(dataframes.keys())
@@ -117,7 +121,7 @@ async def upload_file(
                 
                 # Rollback database transaction on error
                 db.rollback()
-                errors.append(f"{file.filename}: Error parsing Excel file - {str(e)}")
+                errors.append(f"{file.filename}: Error parsing file - {str(e)}")
         
         except Exception as e:
             errors.append(f"{file.filename if file.filename else 'Unknown file'}: {str(e)}")
@@ -1,24 +1,37 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header
+from starlette.concurrency import run_in_threadpool
 from app.models.schemas import VisualizeRequest, VisualizeResponse
-from app.services.shared import db_session_manager, get_gemini_service, chart_generator
+from app.services.shared import db_session_manager, get_gemini_service, visualize_flights
+from app.services.chart_cache import ChartCache
+from app.services.chart_pipeline import generate_chart
+from app.services.chart_serializer import ChartJSONResponse, accepts_bdata
+from app.services.metrics import time_stage
 from app.database import get_db
 from sqlalchemy.orm import Session
+from typing import Optional
 
 router = APIRouter(prefix="/api", tags=["visualize"])
 
 
-@router.post("/visualize", response_model=VisualizeResponse)
-async def visualize_data(request: VisualizeRequest, db: Session = Depends(get_db)):
+@router.post("/visualize", response_model=VisualizeResponse, response_class=ChartJSONResponse)
+async def visualize_data(
+    request: VisualizeRequest,
+    db: Session = Depends(get_db),
+    accept: Optional[str] = Header(None)
+):
     """
     Generate a visualization based on natural language request
     If session_id is not provided or invalid, a new session will be created
+    Send "Accept: application/vnd.plotly.bdata+json" to receive numeric trace arrays as base64 typed arrays
     """
     # Get or create session
     session_id = db_session_manager.get_or_create_session(db, request.session_id)
     
     # Get session data
     try:
-        session = db_session_manager.get_session(db, session_id)
+        with time_stage("session_load") as span:
+            session = await run_in_threadpool(db_session_manager.get_session, db, session_id)
+            span.set_attribute("sheets", len(session.dataframes))
     except ValueError:
         raise HTTPException(status_code=404, detail="Session not found")
     
@@ -38,30 +51,26 @@ async def visualize_data(request: VisualizeRequest, db: Session = Depends(get_db
                 detail="Gemini API key not configured. Please set GEMINI_API_KEY environment variable."
             )
         
-        # Generate chart code
-        code = gemini_service.generate_chart_code(
-            request=request.request,
-            schema_info=session.schema_info
+        # Generate (or reuse a cached) chart for this request and data version;
+        # identical requests arriving together share one generation
+        flight_key = (
+            session_id,
+            db_session_manager.get_data_version(session_id),
+            ChartCache.normalize(request.request)
         )
-        
-        # Execute code and get chart JSON
-        chart_data = chart_generator.execute_chart_code(
-            code=code,
-            dataframes=session.dataframes
-        )
-        
-        # Determine chart type
-        chart_type = chart_generator.get_chart_type(chart_data)
+        chart, _ = await visualize_flights.do(flight_key, generate_chart, gemini_service, session, request.request)
         
         # Generate description
         description = f"Visualization showing: {request.request}"
         
-        return VisualizeResponse(
-            session_id=session_id,
-            chart_type=chart_type,
-            chart_data=chart_data,
-            description=description
-        )
+        # Serialize once with orjson instead of validating the figure through VisualizeResponse
+        return ChartJSONResponse({
+            "session_id": session_id,
+            "chart_type": chart["chart_type"],
+            "chart_data": chart["chart_data"],
+            "description": description,
+            "reductions": chart["reductions"]
+        }, binary_arrays=accepts_bdata(accept))
     
     except Exception as e:
         raise HTTPException(
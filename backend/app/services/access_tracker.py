@@ -0,0 +1,96 @@
+"""
+Write-behind tracking of Session.last_accessed
+Reads record access times in memory; a background task flushes them to PostgreSQL
+in one batched UPDATE every few seconds, so the request path issues no writes.
+"""
+import asyncio
+import logging
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Optional
+from sqlalchemy import update, bindparam
+from sqlalchemy.orm import Session as DBSession
+from app.models.db_models import Session as DBSessionModel
+
+logger = logging.getLogger(__name__)
+
+
+class AccessTracker:
+    def __init__(self, session_factory: Callable[[], DBSession], flush_interval: float = 5.0):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self._pending: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def touch(self, session_id: str) -> datetime:
+        """Record an access to a session; returns the recorded time"""
+        now = datetime.now()
+        with self._lock:
+            self._pending[session_id] = now
+        return now
+
+    def last_seen(self, session_id: str) -> Optional[datetime]:
+        """Access time not yet flushed to the database, if any"""
+        with self._lock:
+            return self._pending.get(session_id)
+
+    def forget(self, session_id: str):
+        """Drop a pending access (e.g. when the session is deleted)"""
+        with self._lock:
+            self._pending.pop(session_id, None)
+
+    def flush(self) -> int:
+        """Write pending access times in a single batched UPDATE; returns the number of sessions"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        db = self.session_factory()
+        try:
+            # Core executemany - sessions deleted in the meantime are simply skipped
+            sessions = DBSessionModel.__table__
+            db.execute(
+                update(sessions)
+                .where(sessions.c.session_id == bindparam("touched_id"))
+                .values(last_accessed=bindparam("touched_at")),
+                [{"touched_id": session_id, "touched_at": accessed} for session_id, accessed in pending.items()]
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Put the batch back so the next flush retries it, keeping newer touches
+            with self._lock:
+                for session_id, accessed in pending.items():
+                    if self._pending.get(session_id, accessed) <= accessed:
+                        self._pending[session_id] = accessed
+            raise
+        finally:
+            db.close()
+        return len(pending)
+
+    async def _run(self):
+        """Flush loop run as a background task"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                logger.warning("Failed to flush session access times: %s", e)
+
+    def start(self):
+        """Start the background flush task on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background task and flush whatever is still pending"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.flush)
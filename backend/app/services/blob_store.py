@@ -0,0 +1,158 @@
+"""
+Blob storage for uploaded workbooks and parsed columnar data
+Lets any API node serve any session: files written by the node that received an
+upload are fetched on demand by the others. Two backends share one interface:
+a directory (local disk or a mount shared by all nodes) and an S3-compatible
+object store (AWS S3, or MinIO / moto for local testing via an endpoint URL).
+
+Keys are "/"-separated paths, e.g. sessions/<session_id>/uploads/<filename>.
+"""
+import os
+import shutil
+from typing import List, Optional
+
+
+class BlobStore:
+    """Interface implemented by the blob backends"""
+
+    def put_file(self, key: str, path: str):
+        """Upload a local file under key, replacing any existing blob"""
+        raise NotImplementedError
+
+    def get_file(self, key: str, path: str) -> bool:
+        """Download key to a local path; returns False if the blob doesn't exist"""
+        raise NotImplementedError
+
+    def list_keys(self, prefix: str) -> List[str]:
+        """Keys starting with prefix"""
+        raise NotImplementedError
+
+    def delete_prefix(self, prefix: str) -> int:
+        """Delete every blob whose key starts with prefix; returns the number deleted"""
+        raise NotImplementedError
+
+
+class LocalBlobStore(BlobStore):
+    """Blobs stored as files under a root directory"""
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        os.makedirs(root_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        path = os.path.normpath(os.path.join(self.root_dir, *key.split("/")))
+        if not path.startswith(os.path.normpath(self.root_dir) + os.sep):
+            raise ValueError(f"Invalid blob key: {key}")
+        return path
+
+    def put_file(self, key: str, path: str):
+        target = self._path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # Copy then rename so readers on other nodes never see a partial file
+        tmp_path = f"{target}.tmp-{os.getpid()}"
+        shutil.copyfile(path, tmp_path)
+        os.replace(tmp_path, target)
+
+    def get_file(self, key: str, path: str) -> bool:
+        source = self._path(key)
+        if not os.path.isfile(source):
+            return False
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        shutil.copyfile(source, path)
+        return True
+
+    def list_keys(self, prefix: str) -> List[str]:
+        keys = []
+        for root, _, files in os.walk(self.root_dir):
+            for name in files:
+                key = os.path.relpath(os.path.join(root, name), self.root_dir).replace(os.sep, "/")
+                if key.startswith(prefix) and ".tmp-" not in name:
+                    keys.append(key)
+        return sorted(keys)
+
+    def delete_prefix(self, prefix: str) -> int:
+        keys = self.list_keys(prefix)
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+        # Remove the directories left empty
+        if prefix.endswith("/"):
+            shutil.rmtree(self._path(prefix.rstrip("/")), ignore_errors=True)
+        return len(keys)
+
+
+class S3BlobStore(BlobStore):
+    """Blobs stored in an S3-compatible bucket (credentials come from the usual AWS environment)"""
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None
+    ):
+        try:
+            import boto3
+            from botocore.exceptions import ClientError
+        except ImportError as e:
+            raise ImportError("The s3 blob backend requires boto3 (pip install boto3)") from e
+        self._client_error = ClientError
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+        self.client = boto3.client("s3", endpoint_url=endpoint_url or None, region_name=region or None)
+
+    def put_file(self, key: str, path: str):
+        self.client.upload_file(path, self.bucket, self.prefix + key)
+
+    def get_file(self, key: str, path: str) -> bool:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        try:
+            self.client.download_file(self.bucket, self.prefix + key, tmp_path)
+        except self._client_error as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                return False
+            raise
+        os.replace(tmp_path, path)
+        return True
+
+    def list_keys(self, prefix: str) -> List[str]:
+        keys = []
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix + prefix):
+            keys.extend(obj["Key"][len(self.prefix):] for obj in page.get("Contents", []))
+        return keys
+
+    def delete_prefix(self, prefix: str) -> int:
+        keys = self.list_keys(prefix)
+        # DeleteObjects accepts at most 1000 keys per call
+        for start in range(0, len(keys), 1000):
+            self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": [{"Key": self.prefix + key} for key in keys[start:start + 1000]], "Quiet": True}
+            )
+        return len(keys)
+
+
+def create_blob_store(
+    backend: str,
+    local_dir: str = "",
+    s3_bucket: str = "",
+    s3_prefix: str = "",
+    s3_endpoint_url: Optional[str] = None,
+    s3_region: Optional[str] = None
+) -> Optional[BlobStore]:
+    """Build the configured backend: "local", "s3", or "" for none (single node)"""
+    if not backend:
+        return None
+    if backend == "local":
+        return LocalBlobStore(local_dir)
+    if backend == "s3":
+        if not s3_bucket:
+            raise ValueError("BLOB_S3_BUCKET must be set for the s3 blob backend")
+        return S3BlobStore(s3_bucket, s3_prefix, s3_endpoint_url, s3_region)
+    raise ValueError(f"Unknown blob backend: {backend}")
@@ -0,0 +1,73 @@
+"""
+In-memory LRU cache of generated charts
+Entries are keyed by session, the session's data version and the normalized request text,
+so re-running a visualization skips both the Gemini call and the code execution.
+Uploads bump the data version, which makes older entries unreachable; they are also
+dropped eagerly through DBSessionManager's invalidation hook.
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+
+class ChartCache:
+    def __init__(self, max_entries: int = 256):
+        """max_entries bounds the cache size; 0 disables caching"""
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, int, str], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def normalize(request_text: str) -> str:
+        """Normalize request text so trivial differences (case, whitespace) share an entry"""
+        return " ".join(request_text.lower().split()).rstrip("?.!")
+
+    def get(self, session_id: str, data_version: int, request_text: str) -> Optional[Dict[str, Any]]:
+        """Return the cached chart entry or None, recording a hit or miss"""
+        key = (session_id, data_version, self.normalize(request_text))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, session_id: str, data_version: int, request_text: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Store a chart entry (chart_type, chart_data, reductions, code) and return it.
+        The entry is shared between requests and must not be mutated afterwards.
+        """
+        if self.max_entries <= 0:
+            return entry
+        key = (session_id, data_version, self.normalize(request_text))
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def invalidate_session(self, session_id: str):
+        """Drop every cached chart of a session (called when its data changes)"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == session_id]:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache size and hit metrics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,388 @@
+"""
+Point-budget reduction of plotly figures before they are sent to the browser
+- Line traces are downsampled with LTTB (Largest-Triangle-Three-Buckets)
+- Marker-only scatter traces keep per-bucket min/max points so the envelope survives
+- Histograms and box plots are pre-aggregated into bins / quartiles server-side
+Every reduction is reported so the response can tell the client what was changed.
+"""
+from __future__ import annotations
+from typing import Dict, Any, List, Optional, Tuple
+from app.services.plotly_arrays import as_array, like_original
+from app.services.deferred_import import deferred_import
+
+np = deferred_import("numpy")
+pd = deferred_import("pandas")
+
+LINE_TRACE_TYPES = {"scatter", "scattergl"}
+
+# Trace attributes that carry one value per point and must be downsampled with x/y
+PER_POINT_KEYS = ["x", "y", "text", "hovertext", "customdata", "ids"]
+PER_POINT_MARKER_KEYS = ["color", "size", "symbol", "opacity"]
+
+# Histogram-only attributes dropped when a histogram becomes a pre-binned bar trace
+HISTOGRAM_KEYS = [
+    "histfunc", "histnorm", "nbinsx", "nbinsy", "xbins", "ybins", "autobinx", "autobiny",
+    "bingroup", "cumulative", "selectedpoints",
+]
+
+# Upper bound on the number of automatically chosen histogram bins
+MAX_AUTO_BINS = 500
+
+
+class ChartDownsampler:
+    def __init__(self, max_points: int = 5000):
+        """max_points is the per-trace point budget; 0 disables reduction"""
+        self.max_points = max_points
+
+    def reduce(self, chart_data: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        Reduce oversized traces of a plotly figure dict in place.
+        Returns the figure and a list describing each reduction that was applied.
+        """
+        reductions = []
+        if self.max_points <= 0 or not isinstance(chart_data.get("data"), list):
+            return chart_data, reductions
+
+        for index, trace in enumerate(chart_data["data"]):
+            if not isinstance(trace, dict):
+                continue
+            trace_type = trace.get("type", "scatter")
+            try:
+                if trace_type in LINE_TRACE_TYPES:
+                    reduction = self._downsample_scatter(trace)
+                elif trace_type == "histogram":
+                    reduction = self._aggregate_histogram(trace)
+                elif trace_type == "box":
+                    reduction = self._aggregate_box(trace)
+                else:
+                    reduction = None
+            except (ValueError, TypeError):
+                # Unusual trace layouts are sent as-is rather than failing the chart
+                reduction = None
+
+            if reduction:
+                reduction.update({"trace": index, "name": trace.get("name"), "type": trace_type})
+                reductions.append(reduction)
+
+        return chart_data, reductions
+
+    # ------------------------------------------------------------------
+    # Line / scatter traces
+    # ------------------------------------------------------------------
+
+    def _downsample_scatter(self, trace: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Downsample a scatter trace to the point budget using LTTB or min-max"""
+        y = as_array(trace.get("y"))
+        if y is None or y.ndim != 1 or len(y) <= self.max_points:
+            return None
+        y_values = self._to_numeric(y)
+        if y_values is None:
+            return None
+
+        n = len(y)
+        if "x" in trace:
+            x = as_array(trace["x"])
+            if x is None or len(x) != n:
+                return None
+            x_values = self._to_numeric(x)
+        else:
+            x0, dx = trace.get("x0", 0), trace.get("dx", 1)
+            if not isinstance(x0, (int, float)) or not isinstance(dx, (int, float)):
+                return None
+            x_values = None
+
+        mode = trace.get("mode", "lines")
+        has_gaps = bool(np.isnan(y_values).any())
+        if "lines" in mode and not has_gaps:
+            method = "lttb"
+            positions = x_values if x_values is not None and not np.isnan(x_values).any() else np.arange(n, dtype=float)
+            indices = self._lttb_indices(positions, y_values, self.max_points)
+        else:
+            method = "minmax"
+            indices = self._minmax_indices(y_values, x_values, self.max_points)
+
+        if "x" not in trace:
+            # The implicit x axis (x0 + i * dx) must be made explicit once points are dropped
+            trace["x"] = (x0 + indices * dx).tolist()
+            trace.pop("x0", None)
+            trace.pop("dx", None)
+
+        self._take_points(trace, indices, n)
+        trace.pop("selectedpoints", None)
+        return {"method": method, "original_points": n, "reduced_points": len(indices)}
+
+    @staticmethod
+    def _lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+        """Largest-Triangle-Three-Buckets: pick the visually most significant point per bucket"""
+        n = len(y)
+        if threshold >= n or threshold < 3:
+            return np.arange(n)
+
+        indices = np.empty(threshold, dtype=np.int64)
+        indices[0], indices[-1] = 0, n - 1
+        bucket_size = (n - 2) / (threshold - 2)
+        selected = 0
+
+        for bucket in range(threshold - 2):
+            start = int(bucket * bucket_size) + 1
+            end = int((bucket + 1) * bucket_size) + 1
+            next_end = min(max(int((bucket + 2) * bucket_size) + 1, end + 1), n)
+
+            # Third triangle vertex is the average of the next bucket
+            avg_x = x[end:next_end].mean()
+            avg_y = y[end:next_end].mean()
+
+            area = np.abs(
+                (x[selected] - avg_x) * (y[start:end] - y[selected])
+                - (x[selected] - x[start:end]) * (avg_y - y[selected])
+            )
+            selected = start + int(np.argmax(area))
+            indices[bucket + 1] = selected
+
+        return indices
+
+    @staticmethod
+    def _minmax_indices(y: np.ndarray, x: Optional[np.ndarray], threshold: int) -> np.ndarray:
+        """Keep the extreme points of each bucket (of y, and of x when it is numeric)"""
+        n = len(y)
+        series = [y] if x is None else [y, x]
+        buckets = max((threshold - 2) // (2 * len(series)), 1)
+        edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+
+        keep = [0, n - 1]
+        for start, end in zip(edges[:-1], edges[1:]):
+            if end <= start:
+                continue
+            for values in series:
+                chunk = values[start:end]
+                if np.isnan(chunk).all():
+                    # Keep one point so gaps in the line are preserved
+                    keep.append(start)
+                    continue
+                keep.append(start + int(np.nanargmin(chunk)))
+                keep.append(start + int(np.nanargmax(chunk)))
+
+        return np.unique(np.asarray(keep, dtype=np.int64))
+
+    @staticmethod
+    def _take_points(trace: Dict[str, Any], indices: np.ndarray, n: int):
+        """Apply the selected point indices to every per-point attribute of a trace"""
+        containers = [(trace, PER_POINT_KEYS)]
+        if isinstance(trace.get("marker"), dict):
+            containers.append((trace["marker"], PER_POINT_MARKER_KEYS))
+
+        for container, keys in containers:
+            for key in keys:
+                if key not in container:
+                    continue
+                values = as_array(container[key])
+                if values is not None and values.ndim >= 1 and len(values) == n:
+                    container[key] = like_original(container[key], values[indices])
+
+    # ------------------------------------------------------------------
+    # Histograms
+    # ------------------------------------------------------------------
+
+    def _aggregate_histogram(self, trace: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Replace a histogram's raw samples with a pre-binned bar trace"""
+        horizontal = trace.get("orientation") == "h" or "x" not in trace
+        sample_key, value_key = ("y", "x") if horizontal else ("x", "y")
+
+        samples = as_array(trace.get(sample_key))
+        if samples is None or samples.ndim != 1 or len(samples) <= self.max_points:
+            return None
+
+        histfunc = trace.get("histfunc", "count")
+        if histfunc not in ("count", "sum") or (trace.get("cumulative") or {}).get("enabled"):
+            return None
+
+        weights = None
+        if histfunc == "sum" and value_key in trace:
+            weights = self._to_numeric(as_array(trace[value_key]))
+            if weights is None or len(weights) != len(samples):
+                return None
+
+        if samples.dtype.kind in "OU":
+            # Dates arrive as ISO strings from parsed JSON; bin them on a time axis
+            try:
+                pd.to_numeric(samples)
+            except (ValueError, TypeError):
+                parsed = self._parse_datetimes(samples)
+                if parsed is not None:
+                    samples = parsed
+
+        numeric = self._to_numeric(samples)
+        if numeric is not None:
+            positions, counts, widths = self._numeric_bins(trace, sample_key, samples, numeric, weights)
+        else:
+            positions, counts = self._categorical_bins(samples, weights)
+            widths = None
+
+        counts = self._normalize_counts(counts, widths, trace.get("histnorm", ""))
+
+        for key in HISTOGRAM_KEYS + ["text", "hovertext", "customdata", "ids"]:
+            trace.pop(key, None)
+        trace["type"] = "bar"
+        trace[sample_key] = positions
+        trace[value_key] = counts.tolist()
+        if widths is not None:
+            trace["width"] = widths.tolist()
+        if horizontal:
+            trace["orientation"] = "h"
+
+        return {"method": "histogram_bins", "original_points": len(samples), "reduced_points": len(counts)}
+
+    def _numeric_bins(
+        self,
+        trace: Dict[str, Any],
+        sample_key: str,
+        samples: np.ndarray,
+        numeric: np.ndarray,
+        weights: Optional[np.ndarray]
+    ) -> Tuple[List[Any], np.ndarray, np.ndarray]:
+        """Bin numeric or datetime samples, honouring xbins/nbinsx when the figure sets them"""
+        valid = ~np.isnan(numeric)
+        values = numeric[valid]
+        if weights is not None:
+            weights = weights[valid]
+
+        bin_spec = trace.get(f"{sample_key}bins") or {}
+        nbins = trace.get(f"nbins{sample_key}") or 0
+        is_datetime = samples.dtype.kind == "M"
+        if not is_datetime and all(isinstance(bin_spec.get(k), (int, float)) for k in ("start", "end", "size")):
+            edges = np.arange(bin_spec["start"], bin_spec["end"] + bin_spec["size"], bin_spec["size"])
+        elif nbins > 0:
+            edges = np.histogram_bin_edges(values, bins=nbins)
+        else:
+            edges = np.histogram_bin_edges(values, bins="auto")
+            if len(edges) - 1 > MAX_AUTO_BINS:
+                edges = np.histogram_bin_edges(values, bins=MAX_AUTO_BINS)
+
+        counts, edges = np.histogram(values, bins=edges, weights=weights)
+        centers = (edges[:-1] + edges[1:]) / 2
+        widths = np.diff(edges)
+
+        if is_datetime:
+            unit = np.datetime_data(samples.dtype)[0]
+            centers = np.datetime_as_string(centers.astype("int64").astype(f"datetime64[{unit}]")).tolist()
+            # plotly.js measures date axis widths in milliseconds
+            widths = widths * (np.timedelta64(1, unit) / np.timedelta64(1, "ms"))
+        else:
+            centers = centers.tolist()
+        return centers, counts, widths
+
+    @staticmethod
+    def _categorical_bins(samples: np.ndarray, weights: Optional[np.ndarray]) -> Tuple[List[Any], np.ndarray]:
+        """Count category occurrences in order of first appearance, like plotly.js does"""
+        series = pd.Series(weights if weights is not None else np.ones(len(samples)))
+        grouped = series.groupby(pd.Series(samples), sort=False).sum()
+        return grouped.index.tolist(), grouped.to_numpy()
+
+    @staticmethod
+    def _normalize_counts(counts: np.ndarray, widths: Optional[np.ndarray], histnorm: str) -> np.ndarray:
+        """Apply plotly's histnorm options to raw bin counts"""
+        counts = counts.astype(float)
+        total = counts.sum() or 1.0
+        if widths is None:
+            widths = np.ones(len(counts))
+        if histnorm == "percent":
+            return counts / total * 100
+        if histnorm == "probability":
+            return counts / total
+        if histnorm == "density":
+            return counts / widths
+        if histnorm == "probability density":
+            return counts / (total * widths)
+        return counts
+
+    # ------------------------------------------------------------------
+    # Box plots
+    # ------------------------------------------------------------------
+
+    def _aggregate_box(self, trace: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Replace a box trace's raw samples with precomputed quartiles and fences"""
+        if "q1" in trace:
+            return None
+        horizontal = trace.get("orientation") == "h" or ("y" not in trace and "x" in trace)
+        value_key, group_key = ("x", "y") if horizontal else ("y", "x")
+
+        values = as_array(trace.get(value_key))
+        if values is None or values.ndim != 1 or len(values) <= self.max_points:
+            return None
+        numeric = self._to_numeric(values)
+        if numeric is None:
+            return None
+
+        groups = as_array(trace.get(group_key)) if group_key in trace else None
+        if groups is not None and len(groups) != len(values):
+            return None
+
+        frame = pd.DataFrame({"value": numeric, "group": groups if groups is not None else 0})
+        frame = frame.dropna(subset=["value"])
+        whiskers_to_extremes = trace.get("boxpoints") is False
+
+        stats = {key: [] for key in ("q1", "median", "q3", "lowerfence", "upperfence", "mean", "sd")}
+        labels = []
+        outliers = 0
+        for label, group in frame.groupby("group", sort=False)["value"]:
+            data = group.to_numpy()
+            q1, median, q3 = np.percentile(data, [25, 50, 75])
+            if whiskers_to_extremes:
+                lower, upper = data.min(), data.max()
+            else:
+                iqr = q3 - q1
+                inside = data[(data >= q1 - 1.5 * iqr) & (data <= q3 + 1.5 * iqr)]
+                lower, upper = inside.min(), inside.max()
+                outliers += int(len(data) - len(inside))
+            for key, value in zip(stats, (q1, median, q3, lower, upper, data.mean(), data.std())):
+                stats[key].append(float(value))
+            labels.append(label)
+
+        for key in ("x", "y", "text", "hovertext", "customdata", "ids", "selectedpoints"):
+            trace.pop(key, None)
+        trace.update(stats)
+        if groups is not None:
+            trace[group_key] = like_original([], np.asarray(labels))
+        trace["boxpoints"] = False
+
+        return {
+            "method": "box_stats",
+            "original_points": len(values),
+            "reduced_points": len(labels),
+            "outliers_dropped": outliers,
+        }
+
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _to_numeric(values: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Convert a trace array to float64 for the reduction math.
+        Datetimes become their integer epoch values; returns None for categorical data.
+        """
+        kind = values.dtype.kind
+        if kind in "biuf":
+            return values.astype(float)
+        if kind in "OU" and len(values):
+            try:
+                return pd.to_numeric(values).astype(float)
+            except (ValueError, TypeError):
+                values = ChartDownsampler._parse_datetimes(values)
+                if values is None:
+                    return None
+                kind = "M"
+        if kind == "M":
+            result = values.astype("int64").astype(float)
+            result[np.isnat(values)] = np.nan
+            return result
+        return None
+
+    @staticmethod
+    def _parse_datetimes(values: np.ndarray) -> Optional[np.ndarray]:
+        """Parse ISO date strings (how dates look after a JSON round trip) into datetime64"""
+        if values.dtype.kind not in "OU":
+            return None
+        try:
+            return pd.to_datetime(values, format="ISO8601").to_numpy().astype("datetime64[ns]")
+        except (ValueError, TypeError):
+            return None
@@ -1,8 +1,11 @@
-import json
-import pandas as pd
+from __future__ import annotations
+import orjson
 from typing import Dict, Any
-import plotly.graph_objects as go
-import plotly.express as px
+from app.services.deferred_import import deferred_import
+
+pd = deferred_import("pandas")
+go = deferred_import("plotly.graph_objects")
+px = deferred_import("plotly.express")
 
 
 class ChartGenerator:
@@ -10,14 +13,15 @@ class ChartGenerator:
     def execute_chart_code(code: str, dataframes: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
         """
         Execute chart generation code in a safe context
-        Returns the chart JSON
+        Returns the figure as a dict; trace arrays stay NumPy arrays so the
+        response is serialized exactly once (see chart_serializer)
         """
         # Create a safe execution context
         safe_globals = {
-            'pd': pd,
+            'pd': pd.load(),
             'dataframes': dataframes,
-            'go': go,
-            'px': px,
+            'go': go.load(),
+            'px': px.load(),
             'plotly': __import__('plotly'),
             '__builtins__': {
                 'len': len,
@@ -41,16 +45,13 @@ class ChartGenerator:
             # Execute the code
             exec(code, safe_globals)
             
-            # Get the chart JSON
-            if 'chart_json' in safe_globals:
-                chart_data = json.loads(safe_globals['chart_json'])
-                return chart_data
+            # Prefer the figure object - converting it to a dict avoids a JSON round trip
+            if 'fig' in safe_globals and hasattr(safe_globals['fig'], 'to_plotly_json'):
+                return safe_globals['fig'].to_plotly_json()
+            elif 'chart_json' in safe_globals:
+                return orjson.loads(safe_globals['chart_json'])
             elif 'fig' in safe_globals:
-                fig = safe_globals['fig']
-                if hasattr(fig, 'to_json'):
-                    return json.loads(fig.to_json())
-                else:
-                    raise ValueError("Figure object doesn't have to_json method")
+                raise ValueError("Figure object doesn't have to_plotly_json method")
             else:
                 raise ValueError("Code did not create 'fig' or 'chart_json' variable")
         
@@ -0,0 +1,55 @@
+"""
+Chart generation pipeline shared by /api/visualize and visualization answers of /api/query
+Request text -> Gemini chart code -> executed figure -> downsampled figure, with the
+final result cached per session data version.
+"""
+from typing import Dict, Any
+from app.services.db_session_manager import SessionData
+from app.services.shared import db_session_manager, chart_generator, chart_downsampler, chart_cache
+from app.services.metrics import time_stage
+from app.services.code_analysis import referenced_columns
+
+
+def generate_chart(gemini_service, session: SessionData, request_text: str) -> Dict[str, Any]:
+    """
+    Produce a chart for a natural language request.
+    Returns a dict with chart_type, chart_data, reductions and the generated code.
+    The returned entry may be shared with the cache and must not be mutated.
+    """
+    data_version = db_session_manager.get_data_version(session.session_id)
+    cached = chart_cache.get(session.session_id, data_version, request_text)
+    if cached is not None:
+        return cached
+    
+    # Generate chart code
+    code = gemini_service.generate_chart_code(
+        request=request_text,
+        schema_info=session.schema_info
+    )
+    
+    # Read the sheets the code references up front - only the columns it uses where that
+    # can be told - and any others when accessed
+    dataframes = session.dataframes.view(referenced_columns(code, session.schema_info))
+    
+    # Execute code and get the figure
+    with time_stage("execute_chart") as span:
+        chart_data = chart_generator.execute_chart_code(
+            code=code,
+            dataframes=dataframes
+        )
+        span.set_attribute("traces", len(chart_data.get("data", [])))
+    
+    # Downsample / pre-aggregate traces that exceed the point budget
+    with time_stage("downsample_chart") as span:
+        chart_data, reductions = chart_downsampler.reduce(chart_data)
+        span.set_attribute("reduced_traces", len(reductions))
+    
+    # Determine chart type - of the chart as sent, e.g. a histogram pre-aggregated into bars
+    chart_type = chart_generator.get_chart_type(chart_data)
+    
+    return chart_cache.put(session.session_id, data_version, request_text, {
+        "chart_type": chart_type,
+        "chart_data": chart_data,
+        "reductions": reductions,
+        "code": code
+    })
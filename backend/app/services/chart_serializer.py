@@ -0,0 +1,79 @@
+"""
+Single-pass JSON serialization of chart responses
+Figures are kept as Python dicts holding NumPy arrays all the way to the response,
+and encoded exactly once with orjson - no fig.to_json() / json.loads() round trip
+and no Pydantic validation of the (potentially huge) trace arrays.
+
+Clients that send `Accept: application/vnd.plotly.bdata+json` get numeric trace arrays
+as base64 typed arrays (plotly.js bdata/dtype specs); everyone else gets plain JSON lists.
+"""
+from __future__ import annotations
+import datetime
+import decimal
+import orjson
+from typing import Any, Optional
+from fastapi.responses import Response
+from app.services.plotly_arrays import convert_figure_arrays
+from app.services.metrics import time_stage
+from app.services.deferred_import import deferred_import
+
+np = deferred_import("numpy")
+pd = deferred_import("pandas")
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+# Media type a client sends in Accept to opt in to binary (bdata) trace arrays
+BDATA_MEDIA_TYPE = "application/vnd.plotly.bdata+json"
+
+
+def accepts_bdata(accept: Optional[str]) -> bool:
+    """Check whether the client's Accept header negotiates binary trace arrays"""
+    return bool(accept) and BDATA_MEDIA_TYPE in accept
+
+
+def _default(value: Any) -> Any:
+    """Fallback for values orjson can't serialize natively"""
+    if isinstance(value, np.ndarray):
+        # Non-contiguous, object, string and datetime arrays
+        if value.dtype.kind == "M":
+            return np.datetime_as_string(value).tolist()
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (pd.Timestamp, datetime.date, datetime.time)):
+        return value.isoformat()
+    if value is pd.NaT:
+        return None
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (pd.Series, pd.Index)):
+        return value.to_numpy()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps_chart(payload: Any, binary_arrays: bool = False) -> bytes:
+    """
+    Serialize a response payload (including NumPy-backed figure dicts) to JSON bytes.
+    With binary_arrays, large numeric arrays are written as plotly.js typed arrays.
+    """
+    payload = convert_figure_arrays(payload, binary=binary_arrays)
+    return orjson.dumps(payload, default=_default, option=ORJSON_OPTIONS)
+
+
+class ChartJSONResponse(Response):
+    """JSON response for payloads carrying plotly figures, encoded once with orjson"""
+    media_type = "application/json"
+
+    def __init__(self, content: Any, binary_arrays: bool = False, **kwargs):
+        self.binary_arrays = binary_arrays
+        if binary_arrays:
+            kwargs.setdefault("media_type", BDATA_MEDIA_TYPE)
+        # The body depends on the negotiated encoding, so caches must key on Accept
+        kwargs["headers"] = {"Vary": "Accept", **(kwargs.get("headers") or {})}
+        super().__init__(content, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        with time_stage("serialize_chart") as span:
+            body = dumps_chart(content, binary_arrays=self.binary_arrays)
+            span.set_attribute("bytes", len(body))
+            return body
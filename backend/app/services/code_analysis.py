@@ -0,0 +1,283 @@
+"""
+Static analysis of generated pandas / plotly code
+Used to load only the data a snippet needs before it runs. Every function answers
+None when the code is too dynamic to tell, and callers then fall back to loading on demand.
+"""
+from __future__ import annotations
+import ast
+from typing import Dict, List, Optional, Set
+from app.services.deferred_import import deferred_import
+
+pd = deferred_import("pandas")
+
+
+def _parents(tree: ast.AST) -> Dict[ast.AST, ast.AST]:
+    parents = {}
+    for node in ast.walk(tree):
+        for child in ast.iter_child_nodes(node):
+            parents[child] = node
+    return parents
+
+
+def _string(node: ast.AST) -> Optional[str]:
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    return None
+
+
+def referenced_sheets(code: str, dataframes_var_name: str = "dataframes") -> Optional[Set[str]]:
+    """
+    Sheet keys the code reads as dataframes['Sheet'] or dataframes.get('Sheet').
+    None if the mapping is used any other way (iterated, passed on, indexed by a variable...).
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+
+    parents = _parents(tree)
+    sheets = set()
+    for node in ast.walk(tree):
+        if not (isinstance(node, ast.Name) and node.id == dataframes_var_name):
+            continue
+        parent = parents.get(node)
+        if isinstance(parent, ast.Subscript) and parent.value is node and isinstance(parent.ctx, ast.Load):
+            key = _string(parent.slice)
+        elif (isinstance(parent, ast.Attribute) and parent.attr == "get"
+              and isinstance(parents.get(parent), ast.Call) and parents[parent].func is parent
+              and parents[parent].args):
+            key = _string(parents[parent].args[0])
+        else:
+            key = None
+        if key is None:
+            return None
+        sheets.add(key)
+    return sheets
+
+
+# Frame methods that keep every column and only select or reorder rows
+_ROW_METHODS = {
+    "query", "sort_values", "sort_index", "nlargest", "nsmallest",
+    "head", "tail", "sample", "copy", "reset_index", "set_index", "fillna"
+}
+# Row methods whose rows depend on every column unless subset= names the ones to look at
+_SUBSET_ROW_METHODS = {"dropna", "drop_duplicates"}
+# Attributes of a frame that don't depend on which columns it has
+_SHAPE_FREE_ATTRIBUTES = {"index", "empty"}
+# Names read back after the code has run
+_RESULT_NAMES = {"result", "fig"}
+# plotly express functions that only read the columns they're given, as long as the arguments
+# here name some: each tuple is satisfied by any one of its arguments. Without them px goes
+# wide-form and plots every column of the frame.
+_XY = (("x",), ("y",))
+_X_OR_Y = (("x", "y"),)
+_PX_REQUIRED_COLUMNS = {
+    "scatter": _XY, "line": _XY, "area": _XY, "bar": _XY, "funnel": _XY,
+    "density_heatmap": _XY, "density_contour": _XY,
+    "scatter_3d": _XY + (("z",),), "line_3d": _XY + (("z",),),
+    "histogram": _X_OR_Y, "box": _X_OR_Y, "violin": _X_OR_Y, "strip": _X_OR_Y, "ecdf": _X_OR_Y,
+    "pie": (("names", "values"),), "treemap": (("path",),), "sunburst": (("path",),),
+}
+# px keyword arguments that name columns of the frame
+_PX_COLUMN_ARGUMENTS = {
+    "x", "y", "z", "color", "symbol", "size", "text", "hover_name", "hover_data", "custom_data",
+    "facet_row", "facet_col", "animation_frame", "animation_group", "line_group", "line_dash",
+    "pattern_shape", "names", "values", "parents", "ids", "path", "base", "error_x", "error_x_minus",
+    "error_y", "error_y_minus", "error_z", "error_z_minus",
+}
+
+
+def _strings(node: ast.AST) -> Optional[List[str]]:
+    """A string constant, or a list/tuple of them"""
+    if isinstance(node, (ast.List, ast.Tuple)):
+        values = [_string(element) for element in node.elts]
+        return None if None in values else values
+    value = _string(node)
+    return None if value is None else [value]
+
+
+def _call_of(parents: Dict[ast.AST, ast.AST], attribute: ast.AST) -> Optional[ast.Call]:
+    """The call node when attribute is called as a method"""
+    call = parents.get(attribute)
+    return call if isinstance(call, ast.Call) and call.func is attribute else None
+
+
+def _constant_aggregation(call: ast.Call) -> bool:
+    """groupby(...).agg() with columns named explicitly: {'col': 'sum'} or name=('col', 'sum')"""
+    if call.keywords:
+        return not call.args and all(
+            keyword.arg and isinstance(keyword.value, ast.Tuple) and _strings(keyword.value) for keyword in call.keywords
+        )
+    return (len(call.args) == 1 and isinstance(call.args[0], ast.Dict)
+            and all(_string(key) is not None for key in call.args[0].keys))
+
+
+class _FrameUses:
+    """
+    Follows every use of the sheet frames through the code. A use is column-safe when it
+    only ever reaches the named columns of the frame - selection, row filters and sorts
+    followed by selection, len(), long-form plotly express calls - so the frame can be
+    replaced by a projection onto those columns without changing the result.
+    """
+
+    def __init__(self, tree: ast.AST, parents: Dict[ast.AST, ast.AST]):
+        self.tree = tree
+        self.parents = parents
+        self.frame_names: Set[str] = set()
+
+    def safe(self, node: ast.AST) -> bool:
+        parent = self.parents.get(node)
+
+        if isinstance(parent, ast.Subscript) and parent.value is node:
+            columns = _strings(parent.slice)
+            if columns is not None or isinstance(parent.ctx, ast.Store):
+                return columns is not None
+            return self.safe(parent)  # Row filter - still the whole frame
+
+        if isinstance(parent, ast.Attribute) and parent.value is node:
+            return self._safe_attribute(parent)
+
+        if isinstance(parent, ast.Call) and node in parent.args:
+            if isinstance(parent.func, ast.Name) and parent.func.id == "len":
+                return True
+            return parent.args[0] is node and self._plotly_express(parent)
+
+        if isinstance(parent, ast.keyword) and parent.arg == "data_frame":
+            return self._plotly_express(self.parents.get(parent))
+
+        if isinstance(parent, ast.Assign) and parent.value is node:
+            if not all(isinstance(target, ast.Name) and target.id not in _RESULT_NAMES for target in parent.targets):
+                return False
+            self.frame_names.update(target.id for target in parent.targets)
+            return True
+
+        return isinstance(parent, ast.Expr)
+
+    def _safe_attribute(self, attribute: ast.Attribute) -> bool:
+        name = attribute.attr
+        call = _call_of(self.parents, attribute)
+        if name in _ROW_METHODS and call is not None:
+            return self.safe(call)
+        if name in _SUBSET_ROW_METHODS and call is not None:
+            subset = [keyword.value for keyword in call.keywords if keyword.arg == "subset"]
+            if name == "drop_duplicates" and call.args:
+                subset.append(call.args[0])  # drop_duplicates(subset, ...)
+            elif call.args:
+                return False  # dropna(axis, ...)
+            if any(keyword.arg == "axis" for keyword in call.keywords):
+                return False
+            return len(subset) == 1 and _strings(subset[0]) is not None and self.safe(call)
+        if name == "groupby" and call is not None:
+            return self._safe_groupby(call)
+        if name in ("pivot_table", "pivot") and call is not None:
+            return any(keyword.arg == "values" and _strings(keyword.value) for keyword in call.keywords)
+        if name in _SHAPE_FREE_ATTRIBUTES:
+            return True
+        if name == "shape":
+            parent = self.parents.get(attribute)
+            return isinstance(parent, ast.Subscript) and isinstance(parent.slice, ast.Constant) and parent.slice.value == 0
+        if name == "loc":
+            parent = self.parents.get(attribute)
+            if not isinstance(parent, ast.Subscript) or not isinstance(parent.ctx, ast.Load):
+                return False
+            if isinstance(parent.slice, ast.Tuple):
+                return len(parent.slice.elts) == 2 and _strings(parent.slice.elts[1]) is not None
+            return self.safe(parent)
+        # df.Amount - attribute access to a column, whose name counts as referenced
+        return call is None and not name.startswith("_") and not hasattr(pd.DataFrame, name)
+
+    def _safe_groupby(self, groupby: ast.Call) -> bool:
+        parent = self.parents.get(groupby)
+        if isinstance(parent, ast.Subscript) and parent.value is groupby:
+            return _strings(parent.slice) is not None
+        if isinstance(parent, ast.Attribute) and parent.value is groupby:
+            call = _call_of(self.parents, parent)
+            if call is None:
+                return False
+            if parent.attr == "size":
+                return True
+            return parent.attr in ("agg", "aggregate") and _constant_aggregation(call)
+        return False
+
+    def _plotly_express(self, call: Optional[ast.AST]) -> bool:
+        """px.<chart>(frame, x='A', y='B', ...) with every column it reads given by name"""
+        if not (isinstance(call, ast.Call) and isinstance(call.func, ast.Attribute)
+                and isinstance(call.func.value, ast.Name) and call.func.value.id == "px"):
+            return False
+        required = _PX_REQUIRED_COLUMNS.get(call.func.attr)
+        # Positional x/y/... aren't followed
+        if required is None or len(call.args) > 1:
+            return False
+        columns = set()
+        for keyword in call.keywords:
+            if keyword.arg is None:
+                return False  # **kwargs
+            if keyword.arg in _PX_COLUMN_ARGUMENTS:
+                if isinstance(keyword.value, ast.Constant) and keyword.value.value is None:
+                    continue
+                if not _strings(keyword.value):
+                    return False
+                columns.add(keyword.arg)
+        return all(any(name in columns for name in names) for names in required)
+
+    def names_safe(self) -> bool:
+        """Check every read of the variables frames were assigned to, including ones bound along the way"""
+        checked: Set[str] = set()
+        while self.frame_names - checked:
+            name = next(iter(self.frame_names - checked))
+            checked.add(name)
+            for node in ast.walk(self.tree):
+                if isinstance(node, ast.Name) and node.id == name and isinstance(node.ctx, ast.Load):
+                    if not self.safe(node):
+                        return False
+        return True
+
+
+def referenced_columns(
+    code: str,
+    schema_info: Dict[str, Dict],
+    dataframes_var_name: str = "dataframes"
+) -> Optional[Dict[str, Optional[List]]]:
+    """
+    For each sheet the code reads (see referenced_sheets), the columns it needs in sheet
+    order - or None for a sheet it may use as a whole (df.describe(), df.columns, passing the
+    frame on...). None overall when the sheets it reads can't be told.
+    The columns of each sheet come from its schema_info entry.
+    """
+    sheets = referenced_sheets(code, dataframes_var_name)
+    if sheets is None:
+        return None
+    tree = ast.parse(code)
+    parents = _parents(tree)
+
+    # Every name the code mentions as a string or attribute - a superset of the columns it uses
+    mentioned = {node.value for node in ast.walk(tree) if _string(node) is not None}
+    mentioned.update(node.attr for node in ast.walk(tree) if isinstance(node, ast.Attribute))
+    # df.query("Amount > 0") / df.eval(...) name columns inside the expression
+    expressions = [
+        node.args[0].value for node in ast.walk(tree)
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr in ("query", "eval")
+        and node.args and _string(node.args[0]) is not None
+    ]
+
+    uses = _FrameUses(tree, parents)
+    whole = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and node.id == dataframes_var_name:
+            frame = parents[node] if isinstance(parents[node], ast.Subscript) else parents[parents[node]]
+            if not uses.safe(frame):
+                whole.update(sheets)
+    if not uses.names_safe():
+        whole.update(sheets)
+
+    projection: Dict[str, Optional[List]] = {}
+    for sheet in sheets:
+        columns = schema_info.get(sheet, {}).get("columns")
+        needed = None
+        if sheet not in whole and columns and all(isinstance(column, str) for column in columns):
+            needed = [
+                column for column in columns
+                if column in mentioned or any(column in expression for expression in expressions)
+            ] or None
+        projection[sheet] = needed
+    return projection
@@ -0,0 +1,157 @@
+"""
+Write-behind conversation logging
+Requests enqueue conversation entries and return immediately; a background task
+bulk-inserts them when the batch size is reached or the flush interval elapses,
+and the queue is drained on shutdown.
+"""
+import asyncio
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, Any, List, Optional
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session as DBSession
+from app.models.db_models import Conversation
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationLogger:
+    def __init__(
+        self,
+        session_factory: Callable[[], DBSession],
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        max_queue_size: int = 10000
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue_size = max_queue_size
+        self._queue: deque = deque()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.dropped = 0
+
+    def log(
+        self,
+        session_id: str,
+        question: Optional[str] = None,
+        answer: Optional[str] = None,
+        query_used: Optional[str] = None,
+        trace: Optional[Dict[str, Any]] = None
+    ):
+        """Enqueue a conversation entry; never blocks on the database"""
+        entry = {
+            "session_id": session_id,
+            "question": question,
+            "answer": answer,
+            "query_used": query_used,
+            "trace": trace,
+            "created_at": datetime.now()
+        }
+        with self._lock:
+            if len(self._queue) >= self.max_queue_size:
+                # Shed the oldest entry rather than block the request when the DB can't keep up
+                self._queue.popleft()
+                self.dropped += 1
+            self._queue.append(entry)
+            queued = len(self._queue)
+
+        if queued >= self.batch_size and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def pending(self) -> int:
+        """Number of entries waiting to be written"""
+        with self._lock:
+            return len(self._queue)
+
+    def flush(self) -> int:
+        """Bulk insert up to one batch of queued entries; returns the number written"""
+        with self._lock:
+            batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+        if not batch:
+            return 0
+
+        db = self.session_factory()
+        try:
+            db.execute(insert(Conversation), batch)
+            db.commit()
+            return len(batch)
+        except IntegrityError as e:
+            db.rollback()
+            logger.warning("Bulk conversation insert failed (%s), retrying entries individually", e)
+            return self._insert_individually(db, batch)
+        except Exception:
+            db.rollback()
+            # Database unavailable - put the batch back in order for the next flush
+            with self._lock:
+                self._queue.extendleft(reversed(batch))
+            raise
+        finally:
+            db.close()
+
+    def _insert_individually(self, db: DBSession, batch: List[Dict[str, Any]]) -> int:
+        """Fallback after a failed bulk insert - drop only the entries that still fail (e.g. deleted session)"""
+        written = 0
+        for index, entry in enumerate(batch):
+            try:
+                db.execute(insert(Conversation), [entry])
+                db.commit()
+                written += 1
+            except IntegrityError as e:
+                db.rollback()
+                logger.warning("Dropping conversation entry for session %s: %s", entry["session_id"], e)
+            except Exception:
+                db.rollback()
+                # Database unavailable - put back the entries not written yet, like flush()
+                with self._lock:
+                    self._queue.extendleft(reversed(batch[index:]))
+                raise
+        return written
+
+    def drain(self) -> int:
+        """Flush until the queue is empty; returns the number written"""
+        written = 0
+        while self.pending():
+            written += self.flush()
+        return written
+
+    async def _run(self):
+        """Flush loop - wakes on a full batch or after flush_interval"""
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await asyncio.to_thread(self.drain)
+            except Exception as e:
+                logger.warning("Failed to flush conversation log: %s", e)
+
+    def start(self):
+        """Start the background flush task on the running event loop"""
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background task and write every remaining entry"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._loop = None
+        try:
+            await asyncio.to_thread(self.drain)
+        except Exception as e:
+            logger.error("Could not write %d queued conversation entries on shutdown: %s", self.pending(), e)
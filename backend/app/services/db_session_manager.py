@@ -3,44 +3,291 @@ Database-backed session manager using PostgreSQL
 Stores session metadata, file paths, and schema info in database
 DataFrames are cached in memory for performance and reloaded from files when needed
 """
-from sqlalchemy.orm import Session as DBSession
+from __future__ import annotations
+from sqlalchemy import insert, tuple_
+from sqlalchemy.orm import Session as DBSession, selectinload
 from app.models.db_models import Session as DBSessionModel, UploadedFile, Sheet, Conversation
 from app.services.excel_parser import ExcelParser
+from app.services.access_tracker import AccessTracker
+from app.services.conversation_logger import ConversationLogger
+from app.services.shared_store import SharedSessionStore
+from app.services.blob_store import BlobStore
+from app.services.invalidation_bus import InvalidationBus
+from app.services.rw_lock import KeyedLocks
+from app.services.lazy_sheets import LazySheets, SheetCell
+from app.services.tracing import current_trace
+import functools
 import json
-import pandas as pd
+import logging
+import threading
 import os
+import shutil
 import uuid
 from datetime import datetime
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Callable, Mapping, Sequence, Tuple
 from dataclasses import dataclass, field
+from app.services.deferred_import import deferred_import
+
+pd = deferred_import("pandas")
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass
 class SessionData:
-    """In-memory session data structure"""
+    """
+    In-memory session data structure
+    dataframes and schema_info are snapshots shared with other requests: uploads publish
+    new ones instead of changing these, so they stay consistent while code runs over them
+    and must not be mutated. Sheets in dataframes are read on first access.
+    """
     session_id: str
     uploaded_files: List[str] = field(default_factory=list)  # List of uploaded file paths
-    dataframes: Dict[str, pd.DataFrame] = field(default_factory=dict)  # Sheet name -> DataFrame
+    dataframes: Mapping[str, pd.DataFrame] = field(default_factory=LazySheets)  # Sheet name -> DataFrame, loaded on access
     schema_info: Dict[str, Dict] = field(default_factory=dict)  # Sheet name -> Schema info
     created_at: datetime = field(default_factory=datetime.now)
     last_accessed: datetime = field(default_factory=datetime.now)
 
 
+class _WorkbookSheets:
+    """
+    Per-sheet reads of one uploaded workbook. Once every sheet has been read from the workbook,
+    the file is published to the shared store so other workers can attach to it.
+    """
+    
+    def __init__(self, manager: "DBSessionManager", session_id: str, file_id: int, file_path: str):
+        self.manager = manager
+        self.session_id = session_id
+        self.file_id = file_id
+        self.file_path = file_path
+        self._schema: Dict[str, Dict] = {}
+        self._parsed: Dict[str, pd.DataFrame] = {}
+        self._lock = threading.Lock()
+    
+    def expect(self, schema_info: Dict[str, Dict]):
+        """The workbook's sheets (and their schema, published along with them)"""
+        self._schema = schema_info
+    
+    def load(self, sheet_name: str, columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        """
+        Read a sheet from the workbook. Always the whole sheet - a projection onto columns is
+        answered with None: the workbook's XML is parsed row by row, so reading fewer columns
+        (usecols) saves no time, and widening the projection later would parse it again.
+        Projections are read from the shared store's columnar copy instead.
+        """
+        if columns is not None:
+            return None
+        
+        df = self.manager.excel_parser.parse_sheet(self.file_path, sheet_name)
+        store = self.manager.shared_store
+        if store is None or not self._schema:
+            return df
+        with self._lock:
+            self._parsed[sheet_name] = df
+            complete = len(self._parsed) == len(self._schema)
+            parsed, self._parsed = (self._parsed, {}) if complete else (None, self._parsed)
+        if complete:
+            store.publish(
+                self.file_id, parsed, self._schema,
+                blob_key=self.manager._parsed_blob_key(self.session_id, self.file_id)
+            )
+        return df
+    
+    def load_shared(
+        self, sheet_name: str, loader: Callable[..., Optional[pd.DataFrame]], filename: str,
+        columns: Optional[List[str]] = None
+    ) -> Optional[pd.DataFrame]:
+        """Read a sheet from the shared store, falling back to the workbook if the entry has gone"""
+        try:
+            return loader(columns)
+        except Exception as e:
+            if not self.manager._ensure_local_file(self.session_id, filename, self.file_path):
+                raise
+            logger.warning("Shared data for file %s unavailable (%s), reading the workbook", self.file_id, e)
+            return self.load(sheet_name, columns)
+
+
 class DBSessionManager:
     """
     Database-backed session manager.
     - Stores session metadata, file paths, and schema info in PostgreSQL
     - Caches DataFrames in memory for active sessions
     - Reloads DataFrames from files when server restarts (if files still exist)
+    - Records last_accessed through an AccessTracker (write-behind) when one is given
+    - Queues conversation entries on a ConversationLogger (write-behind) when one is given
+    - Shares parsed files with the other workers on the host through a SharedSessionStore
+    - Copies uploads to a BlobStore and broadcasts changes on an InvalidationBus, so any
+      node can serve any session
+    - Guards each session's cache entries with a reader/writer lock: reads share it, while
+      loads and uploads take it exclusively and publish new snapshot dicts (copy-on-write),
+      so a cold session is parsed once however many requests race for it
     """
     
-    def __init__(self, upload_dir: str = "uploads"):
+    def __init__(
+        self,
+        upload_dir: str = "uploads",
+        access_tracker: Optional[AccessTracker] = None,
+        conversation_logger: Optional[ConversationLogger] = None,
+        shared_store: Optional[SharedSessionStore] = None,
+        blob_store: Optional[BlobStore] = None,
+        invalidation_bus: Optional[InvalidationBus] = None,
+        excel_parser: Optional[ExcelParser] = None
+    ):
         self.upload_dir = upload_dir
+        self.access_tracker = access_tracker
+        self.conversation_logger = conversation_logger
+        self.shared_store = shared_store
+        self.blob_store = blob_store
+        self.invalidation_bus = invalidation_bus
         os.makedirs(upload_dir, exist_ok=True)
-        self.excel_parser = ExcelParser()
+        self.excel_parser = excel_parser or ExcelParser()
         # In-memory cache for active sessions (DataFrames)
-        self._dataframes_cache: Dict[str, Dict[str, pd.DataFrame]] = {}
+        self._dataframes_cache: Dict[str, LazySheets] = {}
         self._schema_cache: Dict[str, Dict[str, Dict]] = {}
+        # Data version (Session.data_version) each cached session was loaded at
+        self._data_versions: Dict[str, int] = {}
+        # UploadedFile ids whose data each cached session holds (shared store references)
+        self._session_file_ids: Dict[str, List[int]] = {}
+        # Memoized memory footprint per cached session:
+        # (data version, (loaded sheet count, partially loaded column count), bytes)
+        self._cache_bytes: Dict[str, Tuple[int, Tuple[int, int], int]] = {}
+        # Per-session reader/writer locks over the cache entries above
+        self._locks = KeyedLocks()
+        # Callbacks notified with the session_id when a session's data changes
+        self._invalidation_listeners: List[Callable[[str], None]] = []
+        if invalidation_bus is not None:
+            invalidation_bus.subscribe(self.handle_invalidation)
+    
+    def add_invalidation_listener(self, listener: Callable[[str], None]):
+        """Register a callback invoked with session_id whenever that session's data changes"""
+        self._invalidation_listeners.append(listener)
+    
+    def get_data_version(self, session_id: str) -> int:
+        """
+        Return the data version of the session's cached data - derived caches should key on it.
+        Versions are persisted in Session.data_version, so they agree across workers.
+        """
+        return self._data_versions.get(session_id, 0)
+    
+    def cache_stats(self) -> Dict[str, int]:
+        """
+        Number of cached sessions and loaded DataFrames and their memory footprint in bytes
+        (including the columns read for projections of sheets that aren't loaded whole)
+        """
+        sessions = dataframes = total_bytes = 0
+        for session_id, sheets in list(self._dataframes_cache.items()):
+            frames = sheets.loaded()
+            partials = sheets.partials()
+            version = self._data_versions.get(session_id, 0)
+            # Frames only ever get added or widened, so counting them tells when to re-measure
+            shape = (len(frames), sum(len(df.columns) for df in partials.values()))
+            cached = self._cache_bytes.get(session_id)
+            if cached is None or cached[:2] != (version, shape):
+                size = sum(int(df.memory_usage(deep=True).sum()) for df in (*frames.values(), *partials.values()))
+                cached = self._cache_bytes[session_id] = (version, shape, size)
+            sessions += 1
+            dataframes += len(frames)
+            total_bytes += cached[2]
+        return {"sessions": sessions, "dataframes": dataframes, "bytes": total_bytes}
+    
+    def _touch(self, db_session: DBSessionModel) -> datetime:
+        """
+        Record an access to a session. With an access tracker this is an in-memory update
+        flushed later in batch; without one the row is updated on the caller's next commit.
+        """
+        if self.access_tracker is not None:
+            return self.access_tracker.touch(db_session.session_id)
+        db_session.last_accessed = datetime.now()
+        return db_session.last_accessed
+    
+    def _set_data_version(self, session_id: str, version: int):
+        """Record the version of a session's cached data, notifying listeners when it changes"""
+        previous = self._data_versions.get(session_id)
+        self._data_versions[session_id] = version
+        if previous is not None and previous != version:
+            for listener in self._invalidation_listeners:
+                listener(session_id)
+    
+    def _drop_cached(self, session_id: str) -> LazySheets:
+        """Remove a session from the in-memory caches and release its shared store references"""
+        dataframes = self._dataframes_cache.pop(session_id, LazySheets())
+        self._schema_cache.pop(session_id, None)
+        self._cache_bytes.pop(session_id, None)
+        file_ids = self._session_file_ids.pop(session_id, [])
+        if self.shared_store is not None:
+            self.shared_store.release(file_ids)
+        return dataframes
+    
+    def handle_invalidation(self, session_id: str, data_version: Optional[int], deleted: bool):
+        """
+        Apply a change made by another node (InvalidationBus handler): drop the session's
+        cached data if it is older than data_version, or evict it entirely if it was deleted.
+        """
+        if deleted:
+            self.cleanup_session(session_id, delete_blobs=False)
+            return
+        with self._locks.get(session_id).write():
+            if data_version is not None and self._data_versions.get(session_id, data_version) >= data_version:
+                return
+            self._drop_cached(session_id)
+            self._data_versions.pop(session_id, None)
+        for listener in self._invalidation_listeners:
+            listener(session_id)
+    
+    @staticmethod
+    def _upload_blob_key(session_id: str, filename: str) -> str:
+        return f"sessions/{session_id}/uploads/{filename}"
+    
+    @staticmethod
+    def _parsed_blob_key(session_id: str, file_id: int) -> str:
+        return f"sessions/{session_id}/parsed/file-{file_id}"
+    
+    def _ensure_local_file(self, session_id: str, filename: str, file_path: str) -> bool:
+        """Make sure an upload is on this node's disk, fetching it from the blob store if needed"""
+        if os.path.exists(file_path):
+            return True
+        return self.blob_store is not None and self.blob_store.get_file(
+            self._upload_blob_key(session_id, filename), file_path
+        )
+    
+    def _open_file(self, uploaded_file: UploadedFile) -> Optional[Tuple[Dict[str, SheetCell], Dict[str, Dict]]]:
+        """
+        Open an uploaded file's sheets for lazy loading: attach to the host's shared store if
+        another worker (or, through the blob store, another node) already parsed it, otherwise
+        read sheets from the workbook - fetched from the blob store if it isn't on this node's
+        disk - as they are accessed. Returns ({sheet name: cell}, schema_info), or None when
+        neither a parsed copy nor the workbook exists.
+        """
+        session_id, file_id = uploaded_file.session_id, uploaded_file.id
+        filename, file_path = uploaded_file.filename, uploaded_file.file_path
+        parsed_key = self._parsed_blob_key(session_id, file_id)
+        workbook = _WorkbookSheets(self, session_id, file_id, file_path)
+        
+        if self.shared_store is not None:
+            attached = self.shared_store.attach(file_id, blob_key=parsed_key)
+            if attached is not None:
+                loaders, file_schema = attached
+                cells = {
+                    sheet_name: SheetCell(functools.partial(workbook.load_shared, sheet_name, loader, filename))
+                    for sheet_name, loader in loaders.items()
+                }
+                return cells, file_schema
+        
+        if not self._ensure_local_file(session_id, filename, file_path):
+            return None
+        
+        file_schema = {sheet.sheet_name: sheet.schema_info_json for sheet in uploaded_file.sheets if sheet.schema_info_json}
+        if not file_schema:
+            # No sheet metadata to know the sheets by - parse the whole file
+            file_dataframes = self.excel_parser.parse_file(file_path)
+            file_schema = self.excel_parser.extract_schema_info(file_dataframes)
+            if self.shared_store is not None:
+                self.shared_store.publish(file_id, file_dataframes, file_schema, blob_key=parsed_key)
+            return {sheet_name: SheetCell(frame=df) for sheet_name, df in file_dataframes.items()}, file_schema
+        
+        workbook.expect(file_schema)
+        cells = {sheet_name: SheetCell(functools.partial(workbook.load, sheet_name)) for sheet_name in file_schema}
+        return cells, file_schema
     
     def create_session(self, db: DBSession) -> str:
         """Create a new session in database and return session_id"""
@@ -58,72 +305,134 @@ class DBSessionManager:
         db.refresh(db_session)
         
         # Initialize cache
-        self._dataframes_cache[session_id] = {}
+        self._dataframes_cache[session_id] = LazySheets()
         self._schema_cache[session_id] = {}
         
         return session_id
     
-    def get_session(self, db: DBSession, session_id: str) -> SessionData:
+    def get_session(self, db: DBSession, session_id: str, touch: bool = True) -> SessionData:
         """
         Get session data by session_id from database and load dataframes into cache.
         If session doesn't exist, raises ValueError.
+        touch=False loads it without recording an access (e.g. warming the cache).
         """
-        # Check database
-        db_session = db.query(DBSessionModel).filter(
-            DBSessionModel.session_id == session_id
-        ).first()
+        # Check database - on a cold cache the sheets are needed too
+        cold = session_id not in self._dataframes_cache
+        db_session = self._query_session(db, session_id, with_sheets=cold).first()
         
         if not db_session:
             raise ValueError(f"Session {session_id} not found")
         
-        # Update last accessed
-        db_session.last_accessed = datetime.now()
-        db.commit()
+        data_version = db_session.data_version or 0
+        lock = self._locks.get(session_id)
+        with lock.read():
+            snapshot = self._cached_snapshot(session_id, data_version)
+        if snapshot is None:
+            # Cold cache, or another worker changed the data since it was cached here - load it.
+            # Concurrent requests for the session queue on the write lock and find it loaded.
+            with lock.write():
+                snapshot = self._cached_snapshot(session_id, data_version)
+                if snapshot is None:
+                    if not cold:
+                        # Stale cache - reload with the sheets eager-loaded, as on a cold cache
+                        db_session = self._query_session(db, session_id, with_sheets=True).populate_existing().first()
+                        if not db_session:
+                            raise ValueError(f"Session {session_id} not found")
+                        data_version = db_session.data_version or 0
+                    snapshot = self._load_session(db_session, data_version)
+        dataframes, schema_info = snapshot
         
-        # Load dataframes and schema from DB into cache if not already there
-        if session_id not in self._dataframes_cache:
-            self._dataframes_cache[session_id] = {}
-            self._schema_cache[session_id] = {}
-            
-            # Reload dataframes from files
-            # Use composite key (filename_sheetname) to ensure uniqueness within session
-            for uploaded_file in db_session.uploaded_files:
-                if os.path.exists(uploaded_file.file_path):
-                    # Parse the file again to get dataframes
-                    file_dataframes = self.excel_parser.parse_excel(uploaded_file.file_path)
-                    file_schema = self.excel_parser.extract_schema_info(file_dataframes)
-                    
-                    # Use composite key: filename_sheetname for uniqueness
-                    file_basename = os.path.splitext(uploaded_file.filename)[0]
-                    for sheet_name, df in file_dataframes.items():
-                        cache_key = f"{file_basename}_{sheet_name}"
-                        self._dataframes_cache[session_id][cache_key] = df
-                    
-                    # Update schema cache with same composite keys
-                    for sheet_name, info in file_schema.items():
-                        cache_key = f"{file_basename}_{sheet_name}"
-                        self._schema_cache[session_id][cache_key] = info
-                else:
-                    # File was deleted, but schema info is still in DB
-                    # Use composite key based on filename from DB
-                    file_basename = os.path.splitext(uploaded_file.filename)[0]
-                    for sheet in uploaded_file.sheets:
-                        if sheet.schema_info_json:
-                            cache_key = f"{file_basename}_{sheet.sheet_name}"
-                            self._schema_cache[session_id][cache_key] = sheet.schema_info_json
+        # Update last accessed (write-behind when an access tracker is configured) - after any
+        # reload above, which would discard the unflushed change
+        last_accessed = self._touch(db_session) if touch else db_session.last_accessed
         
         # Build SessionData from cache and DB
         session_data = SessionData(
             session_id=session_id,
             uploaded_files=[f.file_path for f in db_session.uploaded_files],
-            dataframes=self._dataframes_cache[session_id],
-            schema_info=self._schema_cache[session_id],
+            dataframes=dataframes,
+            schema_info=schema_info,
             created_at=db_session.created_at,
-            last_accessed=db_session.last_accessed
+            last_accessed=last_accessed
         )
         
+        # Without an access tracker, persist last_accessed now - after the eager-loaded
+        # relationships were used, since committing expires them
+        if touch and self.access_tracker is None:
+            db.commit()
+        
         return session_data
     
+    @staticmethod
+    def _query_session(db: DBSession, session_id: str, with_sheets: bool):
+        """Query for a session with its files - and with_sheets their sheets - eager-loaded, avoiding N+1 queries"""
+        files_loader = selectinload(DBSessionModel.uploaded_files)
+        if with_sheets:
+            files_loader = files_loader.selectinload(UploadedFile.sheets)
+        return db.query(DBSessionModel).options(files_loader).filter(DBSessionModel.session_id == session_id)
+    
+    def _cached_snapshot(
+        self, session_id: str, data_version: int
+    ) -> Optional[Tuple[LazySheets, Dict[str, Dict]]]:
+        """
+        The cached (dataframes, schema_info) of a session if they are at least as new as
+        data_version, else None. Call with the session's lock held.
+        """
+        if session_id not in self._dataframes_cache or self._data_versions.get(session_id, 0) < data_version:
+            return None
+        return self._dataframes_cache[session_id], self._schema_cache.get(session_id, {})
+    
+    def _load_session(
+        self, db_session: DBSessionModel, data_version: int
+    ) -> Tuple[LazySheets, Dict[str, Dict]]:
+        """
+        Load a session's dataframes and schema into the cache, replacing any stale entries.
+        Call with the session's write lock held.
+        """
+        session_id = db_session.session_id
+        previous_file_ids = self._session_file_ids.get(session_id, [])
+        cells: Dict[str, SheetCell] = {}
+        schema_info: Dict[str, Dict] = {}
+        file_ids: List[int] = []
+        
+        # Open sheets from the shared store or from files - each is read on first access
+        # Use composite key (filename_sheetname) to ensure uniqueness within session
+        for uploaded_file in db_session.uploaded_files:
+            opened = self._open_file(uploaded_file)
+            if opened is not None:
+                file_cells, file_schema = opened
+                file_ids.append(uploaded_file.id)
+                
+                # Use composite key: filename_sheetname for uniqueness
+                file_basename = os.path.splitext(uploaded_file.filename)[0]
+                for sheet_name, cell in file_cells.items():
+                    cache_key = f"{file_basename}_{sheet_name}"
+                    cells[cache_key] = cell
+                
+                # Update schema cache with same composite keys
+                for sheet_name, info in file_schema.items():
+                    cache_key = f"{file_basename}_{sheet_name}"
+                    schema_info[cache_key] = info
+            else:
+                # File was deleted, but schema info is still in DB
+                # Use composite key based on filename from DB
+                file_basename = os.path.splitext(uploaded_file.filename)[0]
+                for sheet in uploaded_file.sheets:
+                    if sheet.schema_info_json:
+                        cache_key = f"{file_basename}_{sheet.sheet_name}"
+                        schema_info[cache_key] = sheet.schema_info_json
+        
+        dataframes = LazySheets(cells)
+        self._dataframes_cache[session_id] = dataframes
+        self._schema_cache[session_id] = schema_info
+        self._cache_bytes.pop(session_id, None)
+        self._session_file_ids[session_id] = file_ids
+        # Released only now, so files still part of the session stay in the shared store
+        if self.shared_store is not None:
+            self.shared_store.release([file_id for file_id in previous_file_ids if file_id not in file_ids])
+        self._set_data_version(session_id, data_version)
+        return dataframes, schema_info
+    
     def update_session_data(
         self,
         db: DBSession,
@@ -181,43 +490,107 @@ class DBSessionManager:
             # Store schema info for each sheet
             # Sheets are uniquely identified by (session_id, uploaded_file_id, sheet_name) in DB
             # No conflicts possible since each file has its own uploaded_file_id
+            # Inserted in one bulk statement rather than one db.add per sheet
             if schema_info:
-                file_basename = os.path.splitext(filename)[0]
-                for sheet_name, sheet_schema in schema_info.items():
-                    # Store original sheet name in DB (no need to modify - DB handles uniqueness via foreign keys)
-                    sheet = Sheet(
-                        session_id=session_id,
-                        uploaded_file_id=uploaded_file.id,
-                        sheet_name=sheet_name,  # Original sheet name - no conflict resolution needed
-                        schema_info_json=sheet_schema
-                    )
-                    db.add(sheet)
+                created_at = datetime.now()
+                db.execute(insert(Sheet), [
+                    {
+                        "session_id": session_id,
+                        "uploaded_file_id": uploaded_file.id,
+                        "sheet_name": sheet_name,  # Original sheet name - no conflict resolution needed
+                        "schema_info_json": sheet_schema,
+                        "created_at": created_at
+                    }
+                    for sheet_name, sheet_schema in schema_info.items()
+                ])
         
-        # Update cache - use composite key (filename_sheetname) for uniqueness in memory
+        # New cache entries - use composite key (filename_sheetname) for uniqueness in memory
         # This ensures sheets from different files with same name don't conflict
-        if dataframes and file_path:
-            if session_id not in self._dataframes_cache:
-                self._dataframes_cache[session_id] = {}
-            
-            file_basename = os.path.splitext(os.path.basename(file_path))[0]
-            for sheet_name, df in dataframes.items():
-                # Use composite key: filename_sheetname to ensure uniqueness within session
-                cache_key = f"{file_basename}_{sheet_name}"
-                self._dataframes_cache[session_id][cache_key] = df
-        
-        if schema_info and file_path:
-            if session_id not in self._schema_cache:
-                self._schema_cache[session_id] = {}
-            
+        # Published after the commit, as new snapshot dicts (readers may hold the old ones)
+        new_dataframes: Dict[str, pd.DataFrame] = {}
+        new_schema_info: Dict[str, Dict] = {}
+        if file_path:
             file_basename = os.path.splitext(os.path.basename(file_path))[0]
-            for sheet_name, info in schema_info.items():
-                # Use composite key: filename_sheetname to ensure uniqueness within session
-                cache_key = f"{file_basename}_{sheet_name}"
-                self._schema_cache[session_id][cache_key] = info
+            for sheet_name, df in (dataframes or {}).items():
+                new_dataframes[f"{file_basename}_{sheet_name}"] = df
+            for sheet_name, info in (schema_info or {}).items():
+                new_schema_info[f"{file_basename}_{sheet_name}"] = info
         
         # Update last accessed
-        db_session.last_accessed = datetime.now()
+        self._touch(db_session)
+        
+        if file_path and self.blob_store is not None and os.path.exists(file_path):
+            # Before the commit, so no node can see the file's row without the file
+            self.blob_store.put_file(self._upload_blob_key(session_id, os.path.basename(file_path)), file_path)
+        
+        data_changed = bool(file_path or dataframes or schema_info)
+        if data_changed:
+            # Atomic increment in SQL so concurrent uploads on other workers aren't lost
+            db_session.data_version = DBSessionModel.data_version + 1
+            if self.invalidation_bus is not None:
+                db.flush()
+                self.invalidation_bus.publish(db, session_id, db_session.data_version)
+        new_file_id = uploaded_file.id if file_path else None
         db.commit()
+        
+        if data_changed:
+            version = db_session.data_version
+            with self._locks.get(session_id).write():
+                if (session_id in self._dataframes_cache
+                        and self._data_versions.get(session_id, 0) == version - 1):
+                    # Publish the new snapshot
+                    self._dataframes_cache[session_id] = self._dataframes_cache[session_id].with_frames(new_dataframes)
+                    self._schema_cache[session_id] = {**self._schema_cache.get(session_id, {}), **new_schema_info}
+                else:
+                    # Not cached here, or another worker changed the session in between -
+                    # load it fully on next access
+                    self._drop_cached(session_id)
+                self._set_data_version(session_id, version)
+                if new_file_id is not None and dataframes:
+                    # Referenced even while the session isn't cached, so its next load attaches to it
+                    self._session_file_ids[session_id] = self._session_file_ids.get(session_id, []) + [new_file_id]
+                    if self.shared_store is not None:
+                        self.shared_store.publish(
+                            new_file_id, dataframes, schema_info or {},
+                            blob_key=self._parsed_blob_key(session_id, new_file_id)
+                        )
+    
+    def get_session_path(self, session_id: str) -> str:
+        """Get the file storage path for a session"""
+        return os.path.join(self.upload_dir, session_id)
+    
+    def cleanup_session(self, session_id: str, delete_blobs: bool = True) -> Dict[str, int]:
+        """
+        Evict a session's cached data and delete its uploaded files (including the blob store
+        copies unless delete_blobs is False, as when another node already deleted them).
+        Database rows are left to the caller (see SessionReaper, which deletes them in batches).
+        Returns the reclaimed memory and disk bytes.
+        """
+        with self._locks.get(session_id).write():
+            dataframes = self._drop_cached(session_id)
+            self._data_versions.pop(session_id, None)
+        frames = list(dataframes.loaded().values()) + list(dataframes.partials().values())
+        memory_bytes = sum(int(df.memory_usage(deep=True).sum()) for df in frames)
+        if self.access_tracker is not None:
+            self.access_tracker.forget(session_id)
+        for listener in self._invalidation_listeners:
+            listener(session_id)
+        
+        disk_bytes = 0
+        session_path = self.get_session_path(session_id)
+        if os.path.isdir(session_path):
+            for root, _, files in os.walk(session_path):
+                for name in files:
+                    try:
+                        disk_bytes += os.path.getsize(os.path.join(root, name))
+                    except OSError:
+                        pass
+            shutil.rmtree(session_path, ignore_errors=True)
+        
+        if delete_blobs and self.blob_store is not None:
+            self.blob_store.delete_prefix(f"sessions/{session_id}/")
+        
+        return {"memory_bytes": memory_bytes, "disk_bytes": disk_bytes}
     
     def save_conversation(
         self,
@@ -227,17 +600,54 @@ class DBSessionManager:
         answer: Optional[str] = None,
         query_used: Optional[str] = None
     ):
-        """Save a conversation entry to the database"""
+        """
+        Save a conversation entry to the database.
+        With a conversation logger the entry is queued and bulk-inserted in the background.
+        The current request's trace (timings so far) is stored with the entry.
+        """
+        trace = current_trace()
+        trace_record = trace.to_record() if trace is not None else None
+        if self.conversation_logger is not None:
+            self.conversation_logger.log(
+                session_id=session_id,
+                question=question,
+                answer=answer,
+                query_used=query_used,
+                trace=trace_record
+            )
+            return
+        
         conversation = Conversation(
             session_id=session_id,
             question=question,
             answer=answer,
             query_used=query_used,
+            trace=trace_record,
             created_at=datetime.now()
         )
         db.add(conversation)
         db.commit()
     
+    def get_conversation_history(
+        self,
+        db: DBSession,
+        session_id: str,
+        limit: int,
+        before: Optional[Tuple[datetime, int]] = None,
+        fields: Sequence[str] = ("question", "answer")
+    ) -> List:
+        """
+        Return up to `limit` conversation turns of a session, newest first.
+        Keyset pagination: `before` is the (created_at, id) of the last turn of the previous page,
+        so each page is an index range scan on (session_id, created_at, id) regardless of depth.
+        Only id, created_at and the requested `fields` columns are loaded.
+        """
+        columns = [Conversation.id, Conversation.created_at] + [getattr(Conversation, name) for name in fields]
+        query = db.query(*columns).filter(Conversation.session_id == session_id)
+        if before is not None:
+            query = query.filter(tuple_(Conversation.created_at, Conversation.id) < tuple_(*before))
+        return query.order_by(Conversation.created_at.desc(), Conversation.id.desc()).limit(limit).all()
+    
     def get_or_create_session(self, db: DBSession, session_id: Optional[str] = None) -> str:
         """
         Get existing session or create a new one if session_id is None or invalid.
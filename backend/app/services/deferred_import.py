@@ -0,0 +1,66 @@
+"""
+Deferred imports of the heavy data libraries
+`pd = deferred_import("pandas")` binds a stand-in that imports pandas the first time one of
+its attributes is used, so importing the app - and spawning a worker - doesn't pay for
+pandas, pyarrow or plotly until a request needs them. Modules using it keep their
+annotations as strings (from __future__ import annotations), which would otherwise touch
+the module when each function is defined.
+"""
+import importlib
+import logging
+import time
+from types import ModuleType
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Every module deferred so far, for warm_imports()
+_DEFERRED: Dict[str, "DeferredModule"] = {}
+
+
+class DeferredModule:
+    __slots__ = ("_name", "_module")
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def load(self) -> ModuleType:
+        module = self._module
+        if module is None:
+            # The import system serializes concurrent first imports of a module
+            module = self._module = importlib.import_module(self._name)
+        return module
+
+    def __getattr__(self, attribute: str):
+        return getattr(self.load(), attribute)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<deferred module {self._name!r} ({state})>"
+
+
+def deferred_import(name: str) -> DeferredModule:
+    """A stand-in for module name that imports it on first attribute access"""
+    module = _DEFERRED.get(name)
+    if module is None:
+        module = _DEFERRED[name] = DeferredModule(name)
+    return module
+
+
+def warm_imports(extra: List[str] = ()) -> float:
+    """
+    Import every deferred module, and extra ones that are only imported inside functions,
+    now; returns the seconds it took. Extra modules that aren't installed are skipped.
+    """
+    started = time.perf_counter()
+    for module in list(_DEFERRED.values()):
+        module.load()
+    for name in extra:
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            logger.warning("Could not import %s ahead of time: %s", name, e)
+    elapsed = time.perf_counter() - started
+    logger.info("Imported deferred modules in %.2fs", elapsed)
+    return elapsed
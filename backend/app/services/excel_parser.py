@@ -1,35 +1,187 @@
-import pandas as pd
+from __future__ import annotations
+import datetime
+import logging
 import os
 from typing import Dict, Any, List
-import openpyxl
-import xlrd
+from app.services.metrics import time_stage
+from app.services.deferred_import import deferred_import
+
+pd = deferred_import("pandas")
+pa = deferred_import("pyarrow")
+pq = deferred_import("pyarrow.parquet")
+
+logger = logging.getLogger(__name__)
+
+# Workbooks hold any number of sheets; the other formats hold a single table
+WORKBOOK_EXTENSIONS = ('.xlsx', '.xls')
+TABLE_EXTENSIONS = ('.csv', '.parquet', '.ndjson', '.jsonl')
+SUPPORTED_EXTENSIONS = WORKBOOK_EXTENSIONS + TABLE_EXTENSIONS
+# pandas' reader for each workbook format - the fallback when a configured engine fails
+DEFAULT_ENGINES = {'.xlsx': 'openpyxl', '.xls': 'xlrd'}
+# Module each pandas Excel engine imports when first used
+ENGINE_MODULES = {'calamine': 'python_calamine', 'openpyxl': 'openpyxl', 'xlrd': 'xlrd',
+                  'odf': 'odf', 'pyxlsb': 'pyxlsb'}
 
 
 class ExcelParser:
+    """
+    Parses uploads into sheet_name -> DataFrame.
+    Excel workbooks give one DataFrame per sheet. CSV, Parquet and JSON-lines files hold one
+    table, named after the file - like the sheet Excel creates when it opens one - and go
+    through Arrow's readers instead of a workbook parse. Every format is cleaned the same way.
+    """
+    
+    def __init__(self, engine: str = ""):
+        """
+        engine is the pandas Excel engine tried first, e.g. 'calamine' (Rust, several times faster
+        than openpyxl); a workbook it fails on is parsed again with the format's default engine.
+        "" uses the defaults only.
+        """
+        self.engine = engine
+    
+    def engines(self, file_path: str) -> List[str]:
+        """pandas engines to try on a workbook, in order"""
+        file_ext = os.path.splitext(file_path)[1].lower()
+        if file_ext not in DEFAULT_ENGINES:
+            raise ValueError(f"Unsupported file format: {file_ext}")
+        default = DEFAULT_ENGINES[file_ext]
+        return [self.engine, default] if self.engine and self.engine != default else [default]
+    
+    def engine_modules(self) -> List[str]:
+        """Modules the engines this parser may use import, for warming them up"""
+        engines = [self.engine] if self.engine else []
+        return [ENGINE_MODULES.get(engine, engine) for engine in engines + list(DEFAULT_ENGINES.values())]
+    
+    def _with_engines(self, file_path: str, read, span):
+        """read(engine) with each of engines() in turn, until one succeeds"""
+        engines = self.engines(file_path)
+        for engine in engines[:-1]:
+            try:
+                result = read(engine)
+                span.set_attribute("engine", engine)
+                return result
+            except ImportError as e:
+                # Not installed - no point trying it on every file
+                logger.warning("Excel engine %s is unavailable, using %s: %s", engine, engines[-1], e)
+                self.engine = ""
+            except Exception as e:
+                logger.warning(
+                    "Excel engine %s failed on %s, retrying with %s: %s",
+                    engine, os.path.basename(file_path), engines[-1], e
+                )
+        span.set_attribute("engine", engines[-1])
+        return read(engines[-1])
+    
+    @staticmethod
+    def _clean(df: pd.DataFrame) -> pd.DataFrame:
+        # Remove completely empty rows and columns
+        return df.dropna(how='all').dropna(axis=1, how='all')
+    
+    @staticmethod
+    def is_workbook(file_path: str) -> bool:
+        return os.path.splitext(file_path)[1].lower() in WORKBOOK_EXTENSIONS
+    
     @staticmethod
-    def parse_excel(file_path: str) -> Dict[str, pd.DataFrame]:
+    def table_name(file_path: str) -> str:
+        """Sheet name of a single-table file: the file name without extension, cut to Excel's 31 characters"""
+        return os.path.splitext(os.path.basename(file_path))[0][:31]
+    
+    def parse_file(self, file_path: str) -> Dict[str, pd.DataFrame]:
+        """Parse any supported upload into sheet_name -> DataFrame (see SUPPORTED_EXTENSIONS)"""
+        if self.is_workbook(file_path):
+            return self.parse_excel(file_path)
+        return {self.table_name(file_path): self.parse_table(file_path)}
+    
+    def parse_excel(self, file_path: str) -> Dict[str, pd.DataFrame]:
         """
         Parse Excel file and return dictionary of sheet_name -> DataFrame
         Supports both .xlsx and .xls formats
         """
-        file_ext = os.path.splitext(file_path)[1].lower()
-        
-        if file_ext == '.xlsx':
-            excel_file = pd.ExcelFile(file_path, engine='openpyxl')
-        elif file_ext == '.xls':
-            excel_file = pd.ExcelFile(file_path, engine='xlrd')
-        else:
-            raise ValueError(f"Unsupported file format: {file_ext}")
-        
+        with time_stage("parse_excel") as span:
+            dataframes = self._with_engines(file_path, lambda engine: self.read_workbook(file_path, engine), span)
+            span.set_attribute("sheets", len(dataframes))
+            span.set_attribute("rows", sum(len(df) for df in dataframes.values()))
+            return dataframes
+    
+    def parse_sheet(self, file_path: str, sheet_name: str) -> pd.DataFrame:
+        """Parse a single sheet of an upload, cleaned like parse_file"""
+        if not self.is_workbook(file_path):
+            if sheet_name != self.table_name(file_path):
+                raise ValueError(f"Worksheet named '{sheet_name}' not found")
+            return self.parse_table(file_path)
+        with time_stage("parse_sheet") as span:
+            df = self._with_engines(file_path, lambda engine: self.read_worksheet(file_path, sheet_name, engine), span)
+            span.set_attribute("rows", len(df))
+            return df
+    
+    @staticmethod
+    def read_workbook(file_path: str, engine: str) -> Dict[str, pd.DataFrame]:
+        """Every sheet of a workbook with one pandas engine, cleaned - no fallback"""
+        excel_file = pd.ExcelFile(file_path, engine=engine)
         dataframes = {}
         for sheet_name in excel_file.sheet_names:
             df = pd.read_excel(excel_file, sheet_name=sheet_name)
-            # Remove completely empty rows and columns
-            df = df.dropna(how='all').dropna(axis=1, how='all')
-            dataframes[sheet_name] = df
-        
+            dataframes[sheet_name] = ExcelParser._clean(df)
         return dataframes
     
+    @staticmethod
+    def read_worksheet(file_path: str, sheet_name: str, engine: str) -> pd.DataFrame:
+        """One sheet of a workbook with one pandas engine, cleaned - no fallback"""
+        return ExcelParser._clean(pd.read_excel(file_path, sheet_name=sheet_name, engine=engine))
+    
+    @staticmethod
+    def parse_table(file_path: str) -> pd.DataFrame:
+        """Parse a CSV, Parquet or JSON-lines file into one cleaned DataFrame"""
+        file_ext = os.path.splitext(file_path)[1].lower()
+        if file_ext == '.csv':
+            stage, read = "parse_csv", ExcelParser._read_csv
+        elif file_ext == '.parquet':
+            stage, read = "parse_parquet", ExcelParser._read_parquet
+        elif file_ext in ('.ndjson', '.jsonl'):
+            stage, read = "parse_ndjson", ExcelParser._read_ndjson
+        else:
+            raise ValueError(f"Unsupported file format: {file_ext}")
+        with time_stage(stage) as span:
+            df = ExcelParser._clean(read(file_path))
+            span.set_attribute("rows", len(df))
+            return df
+    
+    @staticmethod
+    def _read_csv(file_path: str) -> pd.DataFrame:
+        try:
+            # Arrow's reader parses blocks of the file on all cores
+            return ExcelParser._dates_as_datetimes(pd.read_csv(file_path, engine='pyarrow'))
+        except ValueError:
+            # Files Arrow rejects - ragged rows, text that isn't UTF-8 - go through the C parser
+            return pd.read_csv(file_path, encoding_errors='replace')
+    
+    @staticmethod
+    def _read_parquet(file_path: str) -> pd.DataFrame:
+        # Memory-mapped, so the file isn't first read into a buffer (pages are still decoded into
+        # new memory); split_blocks skips consolidating the columns into 2D blocks, a second copy.
+        # Dates come back as datetime64 like the other formats, not datetime.date objects.
+        df = pq.read_table(file_path, memory_map=True).to_pandas(split_blocks=True, date_as_object=False)
+        if any(name is not None for name in df.index.names):
+            # A named index (written by pandas) is data the code should see as a column
+            df = df.reset_index()
+        return df
+    
+    @staticmethod
+    def _dates_as_datetimes(df: pd.DataFrame) -> pd.DataFrame:
+        """Arrow's CSV reader gives date columns as datetime.date objects - make them datetime64"""
+        for name in df.columns[df.dtypes == object]:
+            if pd.api.types.infer_dtype(df[name], skipna=True) == 'date':
+                df[name] = pd.to_datetime(df[name])
+        return df
+    
+    @staticmethod
+    def _read_ndjson(file_path: str) -> pd.DataFrame:
+        try:
+            return pd.read_json(file_path, lines=True, engine='pyarrow')
+        except (ValueError, pa.ArrowException):
+            # e.g. a field whose type changes between lines
+            return pd.read_json(file_path, lines=True)
+    
     @staticmethod
     def extract_schema_info(dataframes: Dict[str, pd.DataFrame]) -> Dict[str, Dict[str, Any]]:
         """
@@ -55,7 +207,7 @@ class ExcelParser:
                     # Convert non-serializable types
                     if pd.isna(val):
                         sample_row[col] = None
-                    elif isinstance(val, (pd.Timestamp, pd.DatetimeTZDtype)):
+                    elif isinstance(val, (pd.Timestamp, pd.DatetimeTZDtype, datetime.date, datetime.time)):
                         sample_row[col] = str(val)
                     else:
                         sample_row[col] = val
@@ -1,19 +1,42 @@
 import os
-import google.generativeai as genai
 from typing import Dict, Any, Optional
 import re
 from app.config import Config
+from app.services.gemini_transport import GeminiTransport, create_transport
+from app.services.metrics import LLM_CALLS, LLM_IN_FLIGHT, time_stage
 
 
 class GeminiService:
-    def __init__(self, api_key: Optional[str] = None, model_name: Optional[str] = None):
-        api_key = api_key or Config.GEMINI_API_KEY
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY not found in environment variables")
-        
-        model_name = model_name or Config.GEMINI_MODEL
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel(model_name)
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model_name: Optional[str] = None,
+        transport: Optional[GeminiTransport] = None
+    ):
+        if transport is None:
+            transport = create_transport(
+                Config.GEMINI_TRANSPORT,
+                api_key or Config.GEMINI_API_KEY,
+                model_name or Config.GEMINI_MODEL,
+                api_endpoint=Config.GEMINI_API_ENDPOINT,
+                cassette_path=Config.GEMINI_CASSETTE_PATH,
+                replay_latency=Config.GEMINI_REPLAY_LATENCY,
+                replay_jitter_ms=Config.GEMINI_REPLAY_JITTER_MS
+            )
+        self.transport = transport
+    
+    def _generate(self, stage: str, prompt: str) -> str:
+        """Call the model, recording the call's latency under the given pipeline stage; returns the response text"""
+        with LLM_IN_FLIGHT.track_inprogress(), time_stage(stage) as span:
+            span.set_attribute("prompt_chars", len(prompt))
+            try:
+                text = self.transport.generate(stage, prompt)
+                span.set_attribute("response_chars", len(text))
+            except Exception:
+                LLM_CALLS.inc(stage=stage, outcome="error")
+                raise
+        LLM_CALLS.inc(stage=stage, outcome="ok")
+        return text
     
     def _build_schema_context(self, schema_info: Dict[str, Dict[str, Any]]) -> str:
         """Build a context string from schema information"""
@@ -96,8 +119,8 @@ Return ONLY the Python code, no explanations or markdown formatting. The code sh
 """
         
         try:
-            response = self.model.generate_content(prompt)
-            code = self._extract_code(response.text)
+            text = self._generate("generate_query_code", prompt)
+            code = self._extract_code(text)
             return code
         except Exception as e:
             raise Exception(f"Error generating code with Gemini: {str(e)}")
@@ -130,8 +153,7 @@ Generate Python code using plotly to create the requested visualization. The cod
 3. If multiple sheets are needed, you can merge/join them or create subplots
 4. Prepare the data for visualization
 5. Create a plotly figure (use plotly.graph_objects or plotly.express)
-6. Store the figure in a variable called 'fig'
-7. Convert the figure to JSON using: chart_json = fig.to_json()
+6. Store the figure in a variable called 'fig' (do not convert it to JSON - the server serializes it)
 
 Important:
 - Always use dataframes['SheetName'] to access a specific sheet
@@ -142,8 +164,8 @@ Return ONLY the Python code, no explanations or markdown formatting. The code sh
 """
         
         try:
-            response = self.model.generate_content(prompt)
-            code = self._extract_code(response.text)
+            text = self._generate("generate_chart_code", prompt)
+            code = self._extract_code(text)
             return code
         except Exception as e:
             raise Exception(f"Error generating chart code with Gemini: {str(e)}")
@@ -178,8 +200,8 @@ Respond with ONLY one word: greeting, data_query, visualization, out_of_scope, o
 """
         
         try:
-            response = self.model.generate_content(prompt)
-            classification = response.text.strip().lower()
+            text = self._generate("classify_query", prompt)
+            classification = text.strip().lower()
             # Extract just the classification word
             for cat in ['greeting', 'data_query', 'visualization', 'out_of_scope', 'conversational']:
                 if cat in classification:
@@ -216,8 +238,8 @@ Just be friendly and helpful without over-sharing information.
 """
         
         try:
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
+            text = self._generate("conversational_reply", prompt)
+            return text.strip()
         except Exception as e:
             # Fallback responses
             if any(word in question.lower() for word in ['hi', 'hello', 'hey']):
@@ -232,8 +254,8 @@ This question is outside the scope of data analysis. Politely decline and redire
 """
         
         try:
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
+            text = self._generate("out_of_scope_reply", prompt)
+            return text.strip()
         except Exception as e:
             return "I'm focused on helping you analyze your financial data. Could you ask me something about your uploaded data instead?"
     
@@ -249,8 +271,8 @@ Provide a clear, conversational answer to the user's question based on this resu
 """
         
         try:
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
+            text = self._generate("generate_answer", prompt)
+            return text.strip()
         except Exception as e:
             # Fallback to simple formatting
             return f"Based on your data: {result_str}"
@@ -0,0 +1,141 @@
+"""
+Transports GeminiService sends prompts through
+- passthrough: the live Gemini API
+- record: the live API, saving every prompt/response pair to a cassette file
+- replay: answers from the cassette only (no network or API key), with optional simulated latency
+Replay makes pipeline benchmarks and regression runs reproducible: the same prompts always
+get the same generated code.
+"""
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+
+class GeminiTransport:
+    """Sends one prompt to the model and returns the response text"""
+
+    def generate(self, stage: str, prompt: str) -> str:
+        raise NotImplementedError
+
+
+class PassthroughTransport(GeminiTransport):
+    def __init__(self, api_key: str, model_name: str, api_endpoint: str = ""):
+        import google.generativeai as genai
+        if api_endpoint:
+            # REST transport, so plain http:// endpoints work too
+            genai.configure(api_key=api_key, transport="rest", client_options={"api_endpoint": api_endpoint})
+        else:
+            genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate(self, stage: str, prompt: str) -> str:
+        return self.model.generate_content(prompt).text
+
+
+class Cassette:
+    """
+    Prompt/response pairs in a JSON-lines file, keyed by model and prompt.
+    Recording appends; when a prompt was recorded more than once the last response wins.
+    """
+
+    def __init__(self, path: str, model_name: str):
+        self.path = path
+        self.model_name = model_name
+        self._lock = threading.Lock()
+        self._entries: Dict[str, dict] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[entry["key"]] = entry
+
+    def key(self, prompt: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{prompt}".encode()).hexdigest()
+
+    def get(self, prompt: str) -> Optional[dict]:
+        return self._entries.get(self.key(prompt))
+
+    def add(self, stage: str, prompt: str, response: str, latency_ms: float):
+        entry = {
+            "key": self.key(prompt),
+            "model": self.model_name,
+            "stage": stage,
+            "latency_ms": round(latency_ms, 3),
+            "prompt": prompt,
+            "response": response,
+        }
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            self._entries[entry["key"]] = entry
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RecordingTransport(GeminiTransport):
+    def __init__(self, inner: GeminiTransport, cassette: Cassette):
+        self.inner = inner
+        self.cassette = cassette
+
+    def generate(self, stage: str, prompt: str) -> str:
+        started = time.perf_counter()
+        text = self.inner.generate(stage, prompt)
+        self.cassette.add(stage, prompt, text, (time.perf_counter() - started) * 1000)
+        return text
+
+
+class ReplayTransport(GeminiTransport):
+    """
+    Serves recorded responses. latency is "" (answer immediately), "recorded" (sleep as
+    long as the recorded call took) or a number of milliseconds, optionally with +-jitter_ms
+    of uniform noise. Unrecorded prompts raise LookupError.
+    """
+
+    def __init__(self, cassette: Cassette, latency: str = "", jitter_ms: float = 0, seed: Optional[int] = None):
+        self.cassette = cassette
+        self.latency = latency
+        self.jitter_ms = jitter_ms
+        self._random = random.Random(seed)
+        if latency not in ("", "recorded"):
+            float(latency)  # Fail at startup, not on the first call
+
+    def _delay_ms(self, entry: dict) -> float:
+        if self.latency == "":
+            return 0.0
+        base = entry.get("latency_ms", 0.0) if self.latency == "recorded" else float(self.latency)
+        if self.jitter_ms:
+            base += self._random.uniform(-self.jitter_ms, self.jitter_ms)
+        return max(0.0, base)
+
+    def generate(self, stage: str, prompt: str) -> str:
+        entry = self.cassette.get(prompt)
+        if entry is None:
+            raise LookupError(f"No recorded {stage} response for this prompt in {self.cassette.path}")
+        delay = self._delay_ms(entry)
+        if delay:
+            time.sleep(delay / 1000)
+        return entry["response"]
+
+
+def create_transport(mode: str, api_key: Optional[str], model_name: str, api_endpoint: str = "",
+                     cassette_path: str = "", replay_latency: str = "", replay_jitter_ms: float = 0) -> GeminiTransport:
+    """Build the transport for a GEMINI_TRANSPORT mode"""
+    if mode == "replay":
+        return ReplayTransport(Cassette(cassette_path, model_name), replay_latency, replay_jitter_ms)
+    if mode not in ("passthrough", "record"):
+        raise ValueError(f"Unknown GEMINI_TRANSPORT {mode!r}: expected passthrough, record or replay")
+    if not api_key:
+        raise ValueError("GEMINI_API_KEY not found in environment variables")
+    transport = PassthroughTransport(api_key, model_name, api_endpoint)
+    if mode == "record":
+        return RecordingTransport(transport, Cassette(cassette_path, model_name))
+    return transport
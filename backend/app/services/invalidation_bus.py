@@ -0,0 +1,154 @@
+"""
+Cross-node cache invalidation over PostgreSQL LISTEN/NOTIFY
+Uploads and session deletions publish a notification inside the transaction that
+changes the data, so it is delivered to every node exactly when the change commits
+(and never for a rolled-back one). Each process listens on a dedicated connection
+and drops its cached copy of the session, so requests don't need sticky routing.
+Session.data_version still guards every read; the notifications only free stale
+memory (DataFrames, charts) promptly.
+"""
+import asyncio
+import json
+import logging
+import select
+import uuid
+from typing import Callable, List, Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session as DBSession
+
+logger = logging.getLogger(__name__)
+
+# Handler signature: (session_id, data_version, deleted)
+InvalidationHandler = Callable[[str, Optional[int], bool], None]
+
+
+class InvalidationBus:
+    def __init__(self, engine: Engine, channel: str = "session_invalidation", poll_interval: float = 1.0):
+        self.engine = engine
+        self.channel = channel
+        self.poll_interval = poll_interval
+        # Identifies this process, so it can skip its own notifications
+        self.origin = uuid.uuid4().hex
+        self._handlers: List[InvalidationHandler] = []
+        self._raw = None
+        self._connection = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.received = 0
+
+    @property
+    def enabled(self) -> bool:
+        """NOTIFY is PostgreSQL-only; other databases (e.g. SQLite in development) run single-node"""
+        return bool(self.channel) and self.engine.dialect.name == "postgresql"
+
+    def subscribe(self, handler: InvalidationHandler):
+        """Register a handler called for every notification from another process"""
+        self._handlers.append(handler)
+
+    def publish(self, db: DBSession, session_id: str, data_version: Optional[int] = None, deleted: bool = False):
+        """Queue a notification on db's transaction - delivered to listeners when it commits"""
+        if not self.enabled:
+            return
+        payload = json.dumps({
+            "session_id": session_id,
+            "data_version": data_version,
+            "deleted": deleted,
+            "origin": self.origin
+        })
+        db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": self.channel, "payload": payload})
+
+    def dispatch(self, payload: str):
+        """Handle one raw notification payload"""
+        try:
+            message = json.loads(payload)
+            session_id = message["session_id"]
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring malformed invalidation payload: %r", payload)
+            return
+        if message.get("origin") == self.origin:
+            return
+        self.received += 1
+        for handler in self._handlers:
+            try:
+                handler(session_id, message.get("data_version"), bool(message.get("deleted")))
+            except Exception as e:
+                logger.warning("Invalidation handler failed for session %s: %s", session_id, e)
+
+    # ------------------------------------------------------------------
+    # Listening
+    # ------------------------------------------------------------------
+
+    def _connect(self):
+        """Open the dedicated LISTEN connection (a raw driver connection in autocommit mode)"""
+        raw = self.engine.raw_connection()
+        connection = raw.driver_connection
+        connection.autocommit = True
+        cursor = connection.cursor()
+        # Channel names are identifiers, not bindable parameters
+        cursor.execute(f'LISTEN "{self.channel}"')
+        cursor.close()
+        self._raw = raw
+        self._connection = connection
+
+    def _close(self):
+        if self._connection is not None:
+            try:
+                self._raw.invalidate()
+            except Exception:
+                pass
+            self._connection = None
+
+    def poll(self, timeout: float) -> int:
+        """Wait up to timeout seconds for notifications and dispatch them; returns the number handled"""
+        if self._connection is None:
+            self._connect()
+        payloads = []
+        if hasattr(self._connection, "poll"):
+            # psycopg2
+            if select.select([self._connection], [], [], timeout)[0]:
+                self._connection.poll()
+                while self._connection.notifies:
+                    payloads.append(self._connection.notifies.pop(0).payload)
+        else:
+            # psycopg 3
+            for notify in self._connection.notifies(timeout=timeout):
+                payloads.append(notify.payload)
+        for payload in payloads:
+            self.dispatch(payload)
+        return len(payloads)
+
+    async def _run(self):
+        """Listen loop - reconnects after connection failures; returns once stop() is called"""
+        while not self._stopping:
+            try:
+                await asyncio.to_thread(self.poll, self.poll_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self._stopping:
+                    break
+                logger.warning("Invalidation listener failed, reconnecting: %s", e)
+                self._close()
+                await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        """Start listening on the running event loop"""
+        if self._task is None and self.enabled:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop listening and close the connection"""
+        if self._task is not None:
+            # Cancelling the task wouldn't stop a poll running in its thread, which would go on
+            # using the connection while it is closed - let the poll return (within
+            # poll_interval) and the loop exit instead
+            self._stopping = True
+            done, _ = await asyncio.wait({self._task}, timeout=self.poll_interval + 5)
+            task, self._task = self._task, None
+            if not done:
+                task.cancel()
+                logger.warning("Invalidation listener didn't stop in time, leaving its connection open")
+                return
+        self._close()
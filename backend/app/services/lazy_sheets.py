@@ -0,0 +1,170 @@
+"""
+Lazily materialized session sheets
+SessionData.dataframes maps each sheet of a session to a SheetCell that loads the DataFrame
+on first access - from the shared columnar store or from the workbook - so a cold query
+touching one sheet doesn't pay for the others. Snapshots of a session share their cells,
+so a sheet loaded through one snapshot is loaded for all of them.
+A cell can also load just some of a sheet's columns (see LazySheets.view) when the loader
+supports it: loaders take the list of columns wanted, or None for the whole sheet, and may
+answer None when they can't read a projection.
+"""
+from __future__ import annotations
+import threading
+from collections.abc import Mapping
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+from app.services.metrics import time_stage
+from app.services.deferred_import import deferred_import
+
+pd = deferred_import("pandas")
+
+
+class SheetCell:
+    """One sheet, loaded at most once - or first in part, one set of columns at a time"""
+    __slots__ = ("_loader", "_frame", "_partial", "_lock")
+
+    def __init__(
+        self,
+        loader: Optional[Callable[[Optional[List[str]]], Optional[pd.DataFrame]]] = None,
+        frame: Optional[pd.DataFrame] = None
+    ):
+        self._loader = loader
+        self._frame = frame
+        # Columns read so far for projections, while the whole sheet isn't loaded
+        self._partial: Optional[pd.DataFrame] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._frame is not None
+
+    @property
+    def partial(self) -> Optional[pd.DataFrame]:
+        """The columns loaded for projections, if the whole sheet isn't loaded"""
+        return None if self._frame is not None else self._partial
+
+    def get(self) -> pd.DataFrame:
+        frame = self._frame
+        if frame is None:
+            with self._lock:
+                if self._frame is None:
+                    self._frame = self._loader(None)
+                    self._loader = None
+                    self._partial = None
+                frame = self._frame
+        return frame
+
+    def get_columns(self, columns: List[str]) -> pd.DataFrame:
+        """
+        The sheet projected onto columns. Unless the whole sheet is loaded, only the missing
+        columns are read - together with the ones read before, which the cell keeps.
+        """
+        frame = self._frame
+        if frame is not None:
+            return frame[columns]
+        with self._lock:
+            if self._frame is not None:
+                return self._frame[columns]
+            partial = self._partial
+            if partial is None or not set(columns).issubset(partial.columns):
+                wanted = list(partial.columns) if partial is not None else []
+                wanted += [column for column in columns if column not in wanted]
+                partial = self._loader(wanted)
+                if partial is None:
+                    # The loader can't project - load the whole sheet instead
+                    self._frame = self._loader(None)
+                    self._loader = None
+                    self._partial = None
+                    return self._frame[columns]
+                self._partial = partial
+            return partial[columns]
+
+
+class LazySheets(Mapping):
+    """
+    Read-only mapping of sheet key -> DataFrame whose sheets load on first access.
+    Keys are known up front, so listing, len() and `in` never load anything.
+    """
+
+    def __init__(self, cells: Optional[Dict[str, SheetCell]] = None):
+        self._cells: Dict[str, SheetCell] = cells or {}
+
+    @classmethod
+    def from_frames(cls, frames: Dict[str, pd.DataFrame]) -> "LazySheets":
+        return cls({key: SheetCell(frame=df) for key, df in frames.items()})
+
+    def __getitem__(self, key: str) -> pd.DataFrame:
+        return self._cells[key].get()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._cells)
+
+    def __len__(self) -> int:
+        return len(self._cells)
+
+    def __contains__(self, key) -> bool:
+        return key in self._cells
+
+    def __repr__(self) -> str:
+        return f"LazySheets({len(self._cells)} sheets, {len(self.loaded())} loaded)"
+
+    def with_frames(self, frames: Dict[str, pd.DataFrame]) -> "LazySheets":
+        """A new snapshot with these (already loaded) sheets added or replaced"""
+        cells = dict(self._cells)
+        cells.update((key, SheetCell(frame=df)) for key, df in frames.items())
+        return LazySheets(cells)
+
+    def loaded(self) -> Dict[str, pd.DataFrame]:
+        """The sheets materialized so far"""
+        return {key: cell.get() for key, cell in self._cells.items() if cell.loaded}
+
+    def partials(self) -> Dict[str, pd.DataFrame]:
+        """The columns read for projections of sheets that aren't otherwise loaded"""
+        partials = {key: cell.partial for key, cell in self._cells.items()}
+        return {key: df for key, df in partials.items() if df is not None}
+
+    def preload(self, keys: Optional[Iterable[str]]):
+        """Materialize the given sheets now (e.g. the ones generated code references); None does nothing"""
+        pending = [key for key in keys or () if key in self._cells and self._pending(key)]
+        if not pending:
+            return
+        with time_stage("load_sheets") as span:
+            span.set_attribute("sheets", len(pending))
+            for key in pending:
+                self[key]
+
+    def _pending(self, key: str) -> bool:
+        """Whether reading self[key] would load anything"""
+        return not self._cells[key].loaded
+
+    def view(self, projection: Optional[Dict[str, Optional[List[str]]]]) -> "LazySheets":
+        """
+        These sheets as generated code should see them: the ones in projection (from
+        code_analysis.referenced_columns) are loaded now - just the listed columns, or whole
+        where the list is None - and any others load whole when accessed.
+        None for projection, as when the code is too dynamic to analyze, loads nothing up front.
+        """
+        if not projection:
+            return self
+        view = _ProjectedSheets(self._cells, {key: columns for key, columns in projection.items() if columns})
+        view.preload(projection)
+        return view
+
+
+class _ProjectedSheets(LazySheets):
+    """LazySheets serving some sheets projected onto the columns a snippet uses"""
+
+    def __init__(self, cells: Dict[str, SheetCell], columns: Dict[str, List[str]]):
+        super().__init__(cells)
+        self._columns = columns
+
+    def __getitem__(self, key: str) -> pd.DataFrame:
+        columns = self._columns.get(key)
+        if columns is None:
+            return super().__getitem__(key)
+        return self._cells[key].get_columns(columns)
+
+    def _pending(self, key: str) -> bool:
+        cell = self._cells[key]
+        if key not in self._columns or cell.loaded:
+            return not cell.loaded
+        return cell.partial is None or not set(self._columns[key]).issubset(cell.partial.columns)
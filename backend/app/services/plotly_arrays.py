@@ -0,0 +1,130 @@
+"""
+Helpers for the array representations found in plotly figure data
+A trace array can be a plain list (parsed JSON), a NumPy array (figure objects)
+or a plotly.js typed array spec: {"dtype": "f8", "bdata": "<base64>", "shape": "2, 3"}
+"""
+from __future__ import annotations
+import base64
+from typing import Any, Optional
+from app.services.deferred_import import deferred_import
+
+np = deferred_import("numpy")
+
+# NumPy dtype name -> plotly.js typed array dtype
+PLOTLYJS_DTYPES = {
+    "int8": "i1",
+    "uint8": "u1",
+    "int16": "i2",
+    "uint16": "u2",
+    "int32": "i4",
+    "uint32": "u4",
+    "float32": "f4",
+    "float64": "f8",
+}
+
+# Integer types plotly.js can represent, smallest first (int64 is not supported)
+_SIGNED_DOWNCASTS = ["int8", "int16", "int32"]
+_UNSIGNED_DOWNCASTS = ["uint8", "uint16", "uint32"]
+
+
+def is_typed_array(value: Any) -> bool:
+    """Check whether value is a plotly.js typed array spec"""
+    return isinstance(value, dict) and "bdata" in value and "dtype" in value
+
+
+def decode_typed_array(spec: dict) -> np.ndarray:
+    """Decode a plotly.js typed array spec into a (read-only) NumPy array"""
+    dtype = spec["dtype"]
+    if dtype == "u1c":  # Clamped uint8 has the same memory layout as uint8
+        dtype = "u1"
+    array = np.frombuffer(base64.b64decode(spec["bdata"]), dtype=np.dtype(dtype).newbyteorder("<"))
+    shape = spec.get("shape")
+    if shape:
+        array = array.reshape([int(dim) for dim in str(shape).split(",")])
+    return array
+
+
+def encode_typed_array(array: np.ndarray) -> Any:
+    """
+    Encode a numeric NumPy array as a plotly.js typed array spec.
+    Arrays that plotly.js can't represent (objects, strings, datetimes) are returned unchanged.
+    """
+    if array.size == 0:
+        return array
+
+    if array.dtype == np.int64 or array.dtype == np.uint64:
+        candidates = _SIGNED_DOWNCASTS if array.dtype == np.int64 else _UNSIGNED_DOWNCASTS
+        low, high = array.min(), array.max()
+        for candidate in candidates:
+            info = np.iinfo(candidate)
+            if low >= info.min and high <= info.max:
+                array = array.astype(candidate)
+                break
+        else:
+            array = array.astype("float64")
+
+    dtype_code = PLOTLYJS_DTYPES.get(array.dtype.name)
+    if dtype_code is None:
+        return array
+
+    # plotly.js reads little-endian, C-contiguous buffers
+    array = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder("<"))
+    spec = {"dtype": dtype_code, "bdata": base64.b64encode(array.data).decode("ascii")}
+    if array.ndim > 1:
+        spec["shape"] = ", ".join(str(dim) for dim in array.shape)
+    return spec
+
+
+def as_array(value: Any) -> Optional[np.ndarray]:
+    """
+    Return a trace attribute as a NumPy array, or None if it isn't array-like.
+    Lists are converted with np.asarray, so mixed content ends up with object dtype.
+    """
+    if isinstance(value, np.ndarray):
+        return value
+    if is_typed_array(value):
+        return decode_typed_array(value)
+    if isinstance(value, (list, tuple)):
+        return np.asarray(value)
+    return None
+
+
+def like_original(original: Any, array: np.ndarray) -> Any:
+    """Return array in the same representation (list, ndarray or typed array) as original"""
+    if isinstance(original, np.ndarray):
+        return array
+    if is_typed_array(original):
+        return encode_typed_array(array)
+    if array.dtype.kind == "M":
+        return np.datetime_as_string(array).tolist()
+    return array.tolist()
+
+
+# Attributes plotly.py never converts to typed arrays (GeoJSON, map layers, axis ranges)
+SKIPPED_KEYS = {"geojson", "layer", "layers", "range"}
+
+# Numeric arrays shorter than this stay JSON lists - base64 only pays off for larger arrays
+BDATA_MIN_LENGTH = 64
+
+
+def convert_figure_arrays(value: Any, binary: bool, min_length: int = BDATA_MIN_LENGTH) -> Any:
+    """
+    Return a copy of a figure (or response payload) with its arrays in the requested encoding.
+    binary=True encodes numeric NumPy arrays as typed array specs straight from their buffers;
+    binary=False decodes typed array specs back into arrays that serialize as plain JSON lists.
+    Lists of scalars are passed through untouched to avoid per-element Python work.
+    """
+    if isinstance(value, dict):
+        if is_typed_array(value):
+            return value if binary else decode_typed_array(value)
+        return {
+            key: item if key in SKIPPED_KEYS else convert_figure_arrays(item, binary, min_length)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        if value and isinstance(value[0], (dict, list)):
+            return [convert_figure_arrays(item, binary, min_length) for item in value]
+        return value
+    if binary and isinstance(value, np.ndarray) and value.dtype.kind in "iuf" and value.size >= min_length:
+        return encode_typed_array(value)
+    return value
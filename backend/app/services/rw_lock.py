@@ -0,0 +1,62 @@
+"""
+Reader/writer locks for the per-session caches
+Any number of readers may hold a ReadWriteLock together; a writer holds it alone. Waiting
+writers block new readers, so a stream of queries can't starve an upload. Not reentrant.
+"""
+import threading
+import weakref
+from contextlib import contextmanager
+
+
+class ReadWriteLock:
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self._condition:
+            while self._writer or self._writers_waiting:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._condition:
+            self._writers_waiting += 1
+            try:
+                while self._writer or self._readers:
+                    self._condition.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writer = False
+                self._condition.notify_all()
+
+
+class KeyedLocks:
+    """One ReadWriteLock per key, created on demand and dropped once nobody references it"""
+
+    def __init__(self):
+        self._locks: "weakref.WeakValueDictionary[str, ReadWriteLock]" = weakref.WeakValueDictionary()
+        self._mutex = threading.Lock()
+
+    def get(self, key: str) -> ReadWriteLock:
+        with self._mutex:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = ReadWriteLock()
+            return lock
@@ -0,0 +1,199 @@
+"""
+Background reaper for idle sessions
+Sessions whose last_accessed is older than the idle TTL are removed everywhere:
+cached DataFrames and charts, uploaded files on disk, and their database rows.
+Rows are deleted in bounded batches (short transactions of at most batch_size sessions and
+row_batch_size conversations) to avoid long locks. Every worker runs a reaper, but on
+PostgreSQL only the one holding an advisory lock sweeps; each batch locks the sessions that
+are still idle (skipping ones a request holds) and deletes only those.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set
+from sqlalchemy import delete, select, text
+from sqlalchemy.orm import Session as DBSession
+from app.models.db_models import Session as DBSessionModel, UploadedFile, Sheet, Conversation
+
+logger = logging.getLogger(__name__)
+
+# Child tables first so foreign keys are never violated mid-batch
+DELETE_ORDER = [
+    ("conversations", Conversation),
+    ("sheets", Sheet),
+    ("uploaded_files", UploadedFile),
+    ("sessions", DBSessionModel),
+]
+# pg_try_advisory_lock key held by the one process that sweeps
+ADVISORY_LOCK_KEY = 0x5E55_0EA9
+
+
+class SessionReaper:
+    def __init__(
+        self,
+        session_factory: Callable[[], DBSession],
+        session_manager,
+        idle_ttl: float,
+        interval: float = 600.0,
+        batch_size: int = 100,
+        row_batch_size: int = 5000
+    ):
+        """
+        idle_ttl and interval are in seconds; idle_ttl <= 0 disables reaping. Each transaction
+        deletes at most batch_size sessions and row_batch_size of their conversations.
+        """
+        self.session_factory = session_factory
+        self.session_manager = session_manager
+        self.idle_ttl = idle_ttl
+        self.interval = interval
+        self.batch_size = batch_size
+        self.row_batch_size = row_batch_size
+        self._task: Optional[asyncio.Task] = None
+
+    def sweep(self) -> Dict[str, int]:
+        """Reap every idle session; returns counts of reclaimed rows and bytes"""
+        report = {"sessions": 0, "conversations": 0, "sheets": 0, "uploaded_files": 0, "disk_bytes": 0, "memory_bytes": 0}
+        if self.idle_ttl <= 0:
+            return report
+
+        tracker = self.session_manager.access_tracker
+        if tracker is not None:
+            # Make recent (not yet flushed) accesses visible to the idle query
+            tracker.flush()
+
+        cutoff = datetime.now() - timedelta(seconds=self.idle_ttl)
+        skipped: Set[str] = set()
+        db = self.session_factory()
+        lock_connection = None
+        try:
+            bind = db.get_bind()
+            if bind.dialect.name == "postgresql":
+                # Held on its own connection for the whole sweep - the session's connection goes
+                # back to the pool at every commit
+                lock_connection = bind.connect()
+                if not lock_connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY}).scalar():
+                    logger.debug("Another process is reaping idle sessions")
+                    lock_connection.close()
+                    lock_connection = None
+                    return report
+            while True:
+                query = (
+                    select(DBSessionModel.session_id)
+                    .where(DBSessionModel.last_accessed < cutoff)
+                    .order_by(DBSessionModel.last_accessed)
+                    .limit(self.batch_size)
+                )
+                if skipped:
+                    query = query.where(DBSessionModel.session_id.notin_(skipped))
+                candidates = db.execute(query).scalars().all()
+                if not candidates:
+                    break
+
+                batch: List[str] = []
+                for session_id in candidates:
+                    # Accessed since the flush above - keep it
+                    seen = tracker.last_seen(session_id) if tracker is not None else None
+                    if seen is not None and seen >= cutoff:
+                        skipped.add(session_id)
+                    else:
+                        batch.append(session_id)
+
+                if batch:
+                    skipped.update(self._delete_batch(db, batch, cutoff, report))
+                if len(candidates) < self.batch_size:
+                    break
+        finally:
+            db.close()
+            if lock_connection is not None:
+                try:
+                    lock_connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY})
+                    lock_connection.commit()
+                finally:
+                    lock_connection.close()
+
+        return report
+
+    @staticmethod
+    def _idle(session_ids: List[str], cutoff: datetime):
+        """Query for those of session_ids still idle in the database"""
+        return select(DBSessionModel.session_id).where(
+            DBSessionModel.session_id.in_(session_ids), DBSessionModel.last_accessed < cutoff
+        )
+
+    def _delete_batch(self, db: DBSession, batch: List[str], cutoff: datetime, report: Dict[str, int]) -> Set[str]:
+        """
+        Delete one batch of sessions' rows, then their files and caches. Returns the sessions
+        kept because they were accessed (or locked by a request) since they were listed.
+        """
+        try:
+            # Conversations first, row_batch_size per transaction, while their session stays idle
+            while True:
+                chunk = select(Conversation.id).where(
+                    Conversation.session_id.in_(self._idle(batch, cutoff))
+                ).limit(self.row_batch_size)
+                deleted = db.execute(
+                    delete(Conversation).where(Conversation.id.in_(chunk)).execution_options(synchronize_session=False)
+                ).rowcount
+                db.commit()
+                report["conversations"] += deleted
+                if deleted < self.row_batch_size:
+                    break
+
+            # Then the sessions themselves in one transaction - only those still idle, locked so
+            # an access can't slip in between the check and the delete
+            session_ids = db.execute(
+                self._idle(batch, cutoff).with_for_update(skip_locked=True)
+            ).scalars().all()
+            if session_ids:
+                for key, model in DELETE_ORDER:
+                    condition = model.session_id.in_(session_ids)
+                    if model is DBSessionModel:
+                        condition = condition & (DBSessionModel.last_accessed < cutoff)
+                    result = db.execute(delete(model).where(condition).execution_options(synchronize_session=False))
+                    report[key] += result.rowcount
+                bus = self.session_manager.invalidation_bus
+                if bus is not None:
+                    # Delivered on commit - other nodes evict the sessions from memory
+                    for session_id in session_ids:
+                        bus.publish(db, session_id, deleted=True)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        for session_id in session_ids:
+            reclaimed = self.session_manager.cleanup_session(session_id)
+            report["disk_bytes"] += reclaimed["disk_bytes"]
+            report["memory_bytes"] += reclaimed["memory_bytes"]
+        return set(batch) - set(session_ids)
+
+    async def _run(self):
+        """Sweep loop run as a background task"""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                report = await asyncio.to_thread(self.sweep)
+                if report["sessions"]:
+                    logger.info(
+                        "Reaped %d idle sessions: %d conversations, %d sheets, %d files; "
+                        "reclaimed %d disk bytes and %d memory bytes",
+                        report["sessions"], report["conversations"], report["sheets"], report["uploaded_files"],
+                        report["disk_bytes"], report["memory_bytes"]
+                    )
+            except Exception as e:
+                logger.warning("Idle session sweep failed: %s", e)
+
+    def start(self):
+        """Start the periodic sweep on the running event loop"""
+        if self._task is None and self.idle_ttl > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the periodic sweep"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,150 @@
+"""
+Startup warm-up of recently active sessions
+After a restart every session's cache is cold, so the first query on each pays for reading
+its workbooks. The warmer loads the sessions accessed within a recent window - most recent
+first, a few at a time - in the background, and reports readiness once enough of them are warm
+so a load balancer can hold traffic until then. Before that it imports the data libraries
+the app defers (see deferred_import), so the first request doesn't pay for them either.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Sequence
+from sqlalchemy import select
+from sqlalchemy.orm import Session as DBSession
+from app.models.db_models import Session as DBSessionModel
+from app.services.deferred_import import warm_imports
+
+logger = logging.getLogger(__name__)
+
+
+class SessionWarmer:
+    def __init__(
+        self,
+        session_factory: Callable[[], DBSession],
+        session_manager,
+        window: float,
+        limit: int = 50,
+        concurrency: int = 2,
+        ready_fraction: float = 1.0,
+        ready_timeout: float = 120.0,
+        imports: Sequence[str] = ()
+    ):
+        """
+        window is in seconds (<= 0 disables warming sessions); at most limit sessions are warmed,
+        concurrency at a time. ready() turns true once the imports are done and ready_fraction
+        of the sessions have been attempted, or ready_timeout seconds after start() whatever
+        the progress. imports are modules to import along with the deferred ones.
+        """
+        self.session_factory = session_factory
+        self.session_manager = session_manager
+        self.window = window
+        self.limit = limit
+        self.concurrency = max(1, concurrency)
+        self.ready_fraction = ready_fraction
+        self.ready_timeout = ready_timeout
+        self.imports = list(imports)
+        self._task: Optional[asyncio.Task] = None
+        self._started_at: Optional[float] = None
+        self._imported = False
+        self._total: Optional[int] = None  # Unknown until the candidates are listed
+        self._warmed = 0
+        self._failed = 0
+        self._done = False
+
+    def candidates(self) -> List[str]:
+        """Sessions accessed within the window, most recent first"""
+        cutoff = datetime.now() - timedelta(seconds=self.window)
+        db = self.session_factory()
+        try:
+            return db.execute(
+                select(DBSessionModel.session_id)
+                .where(DBSessionModel.last_accessed >= cutoff)
+                .order_by(DBSessionModel.last_accessed.desc())
+                .limit(self.limit)
+            ).scalars().all()
+        finally:
+            db.close()
+
+    def warm(self, session_id: str):
+        """Load one session and all of its sheets into the cache, without counting it as an access"""
+        db = self.session_factory()
+        try:
+            session = self.session_manager.get_session(db, session_id, touch=False)
+            for key in session.dataframes:
+                session.dataframes[key]
+        finally:
+            db.close()
+
+    async def _warm_one(self, session_id: str, semaphore: asyncio.Semaphore):
+        async with semaphore:
+            try:
+                await asyncio.to_thread(self.warm, session_id)
+                self._warmed += 1
+            except Exception as e:
+                # e.g. deleted since it was listed - readiness shouldn't wait on it
+                self._failed += 1
+                logger.warning("Could not warm session %s: %s", session_id, e)
+
+    async def _run(self):
+        try:
+            await asyncio.to_thread(warm_imports, self.imports)
+        except Exception as e:
+            logger.warning("Import warm-up failed: %s", e)
+        finally:
+            self._imported = True
+        if self.window <= 0:
+            self._done = True
+            return
+        started = time.perf_counter()
+        try:
+            session_ids = await asyncio.to_thread(self.candidates)
+            self._total = len(session_ids)
+            semaphore = asyncio.Semaphore(self.concurrency)
+            await asyncio.gather(*(self._warm_one(session_id, semaphore) for session_id in session_ids))
+            logger.info(
+                "Warmed %d of %d recently active sessions in %.1fs (%d failed)",
+                self._warmed, self._total, time.perf_counter() - started, self._failed
+            )
+        except Exception as e:
+            logger.warning("Session warm-up failed: %s", e)
+        finally:
+            self._done = True
+
+    def start(self):
+        """Start warming on the running event loop"""
+        self._started_at = time.monotonic()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop warming (sessions being loaded finish in their threads)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def ready(self) -> bool:
+        """Whether enough of the warm-up is done to take traffic"""
+        if self._done:
+            return True
+        if self._started_at is None:
+            return False
+        if time.monotonic() - self._started_at >= self.ready_timeout:
+            return True
+        return (self._imported and self._total is not None
+                and self._warmed + self._failed >= self.ready_fraction * self._total)
+
+    def status(self) -> Dict[str, object]:
+        return {
+            "ready": self.ready(),
+            "done": self._done,
+            "imports": self._imported,
+            "sessions": self._total,
+            "warmed": self._warmed,
+            "failed": self._failed,
+        }
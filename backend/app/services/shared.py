@@ -2,15 +2,82 @@
 Shared service instances used across the application
 """
 from app.services.db_session_manager import DBSessionManager
+from app.services.access_tracker import AccessTracker
+from app.services.conversation_logger import ConversationLogger
+from app.services.session_reaper import SessionReaper
+from app.services.session_warmer import SessionWarmer
+from app.services.shared_store import SharedSessionStore
+from app.services.blob_store import create_blob_store
+from app.services.invalidation_bus import InvalidationBus
 from app.services.excel_parser import ExcelParser
 from app.services.gemini_service import GeminiService
 from app.services.chart_generator import ChartGenerator
+from app.services.chart_downsampler import ChartDownsampler
+from app.services.chart_cache import ChartCache
+from app.services.single_flight import SingleFlight
+from app.services.metrics import registry, gauge_family
+from app.services.tracing import TraceExporter
 from app.config import Config
+from app.database import SessionLocal, engine
 import os
 
 # Shared instances - initialized once
-db_session_manager = DBSessionManager(upload_dir=Config.UPLOAD_DIR)
-excel_parser = ExcelParser()
+access_tracker = AccessTracker(
+    session_factory=SessionLocal,
+    flush_interval=Config.SESSION_ACCESS_FLUSH_INTERVAL
+)
+conversation_logger = ConversationLogger(
+    session_factory=SessionLocal,
+    batch_size=Config.CONVERSATION_LOG_BATCH_SIZE,
+    flush_interval=Config.CONVERSATION_LOG_FLUSH_INTERVAL
+)
+# Uploads and parsed data shared between nodes (None on a single node)
+blob_store = create_blob_store(
+    Config.BLOB_BACKEND,
+    local_dir=Config.BLOB_LOCAL_DIR,
+    s3_bucket=Config.BLOB_S3_BUCKET,
+    s3_prefix=Config.BLOB_S3_PREFIX,
+    s3_endpoint_url=Config.BLOB_S3_ENDPOINT_URL,
+    s3_region=Config.BLOB_S3_REGION
+)
+# Parsed uploads shared between the workers on this host
+shared_store = SharedSessionStore(Config.SHARED_STORE_DIR, blob_store=blob_store) if Config.SHARED_STORE_DIR else None
+# Cross-node cache invalidation over PostgreSQL LISTEN/NOTIFY
+invalidation_bus = InvalidationBus(engine, channel=Config.CACHE_INVALIDATION_CHANNEL)
+# Workbooks are parsed with the configured engine (calamine by default), openpyxl/xlrd as fallback
+excel_parser = ExcelParser(engine=Config.EXCEL_ENGINE)
+db_session_manager = DBSessionManager(
+    upload_dir=Config.UPLOAD_DIR,
+    access_tracker=access_tracker,
+    conversation_logger=conversation_logger,
+    shared_store=shared_store,
+    blob_store=blob_store,
+    invalidation_bus=invalidation_bus,
+    excel_parser=excel_parser
+)
+
+# Periodically deletes idle sessions (cache, files and database rows)
+session_reaper = SessionReaper(
+    session_factory=SessionLocal,
+    session_manager=db_session_manager,
+    idle_ttl=Config.SESSION_IDLE_TTL,
+    interval=Config.SESSION_REAPER_INTERVAL,
+    batch_size=Config.SESSION_REAPER_BATCH_SIZE,
+    row_batch_size=Config.SESSION_REAPER_ROW_BATCH_SIZE
+)
+
+# Imports the deferred data libraries and loads recently active sessions at startup; gates /ready
+session_warmer = SessionWarmer(
+    session_factory=SessionLocal,
+    session_manager=db_session_manager,
+    window=Config.SESSION_WARMUP_WINDOW,
+    limit=Config.SESSION_WARMUP_LIMIT,
+    concurrency=Config.SESSION_WARMUP_CONCURRENCY,
+    ready_fraction=Config.SESSION_WARMUP_READY_FRACTION,
+    ready_timeout=Config.SESSION_WARMUP_READY_TIMEOUT,
+    # Imported inside functions on first use: the Excel engines pandas picks, the Gemini SDK
+    imports=excel_parser.engine_modules() + ["google.generativeai"]
+)
 
 # Gemini service - will be initialized when API key is available
 # Initialize lazily to handle missing API key gracefully
@@ -28,4 +95,38 @@ def get_gemini_service():
     return _gemini_service
 
 chart_generator = ChartGenerator()
+chart_downsampler = ChartDownsampler(max_points=Config.CHART_MAX_POINTS)
+
+# Generated charts keyed by session data version - uploads drop a session's entries
+chart_cache = ChartCache(max_entries=Config.CHART_CACHE_SIZE)
+db_session_manager.add_invalidation_listener(chart_cache.invalidate_session)
+
+# Identical concurrent questions / chart requests share one computation
+query_flights = SingleFlight("query")
+visualize_flights = SingleFlight("visualize")
+
+
+# Optional OTLP/JSON file export of request traces
+trace_exporter = TraceExporter(Config.TRACE_EXPORT_PATH) if Config.TRACE_EXPORT_PATH else None
+
+
+def _collect_metrics():
+    """Scrape-time metrics read from the caches and background writers"""
+    charts = chart_cache.stats()
+    frames = db_session_manager.cache_stats()
+    return [
+        ("finance_ai_chart_cache_lookups", "counter", "Chart cache lookups by result", [
+            ("_total", {"result": "hit"}, charts["hits"]),
+            ("_total", {"result": "miss"}, charts["misses"]),
+        ]),
+        gauge_family("finance_ai_chart_cache_hit_ratio", "Chart cache hits / lookups since start", charts["hit_ratio"]),
+        gauge_family("finance_ai_chart_cache_entries", "Charts currently cached", charts["entries"]),
+        gauge_family("finance_ai_dataframe_cache_sessions", "Sessions with DataFrames cached in memory", frames["sessions"]),
+        gauge_family("finance_ai_dataframe_cache_bytes", "Memory used by cached DataFrames", frames["bytes"]),
+        gauge_family("finance_ai_conversation_log_pending", "Conversation entries waiting to be written", conversation_logger.pending()),
+        gauge_family("finance_ai_ready", "1 once startup warm-up lets this worker take traffic", int(session_warmer.ready())),
+        gauge_family("finance_ai_coalescing_in_flight", "Distinct query / visualize computations running",
+                     query_flights.in_flight() + visualize_flights.in_flight()),
+    ]
 
+registry.add_collector(_collect_metrics)
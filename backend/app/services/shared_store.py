@@ -0,0 +1,380 @@
+"""
+Host-level store of parsed uploads shared by all uvicorn workers on a machine
+The first worker to parse an uploaded file publishes its sheets as Arrow IPC files
+(by default under /dev/shm); other workers memory-map them instead of reparsing the
+workbook. Numeric columns without nulls attach zero-copy. Object columns, which may mix
+types (numbers and text in one column), are stored value by value with each value's type,
+and non-string column labels go in the manifest; a file with values that can't be stored
+exactly isn't shared, and each worker parses it. Entries are keyed by
+UploadedFile.id, which never changes once a file is uploaded, and are reference
+counted with one holder file per attached process.
+
+With a blob store, published entries are also uploaded so workers on other nodes
+download the parsed data instead of reparsing the workbook.
+"""
+from __future__ import annotations
+import datetime
+import functools
+import json
+import logging
+import os
+import shutil
+import uuid
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from app.services.blob_store import BlobStore
+from app.services.deferred_import import deferred_import
+
+np = deferred_import("numpy")
+pd = deferred_import("pandas")
+pa = deferred_import("pyarrow")
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+HOLDERS = "holders"
+# Value types an object column can hold, by name, with the Arrow type each is stored as (see
+# _encode_object). A value's position in this list + 1 is its type code; 0 is None.
+OBJECT_KINDS = [
+    ("str", "string"), ("bool", "bool_"), ("int", "int64"), ("float", "float64"),
+    ("datetime", "timestamp_us"), ("timestamp", "timestamp_ns"), ("date", "date32"), ("time", "time64_us"),
+]
+# Index dtypes non-string column labels are restored with
+LABEL_DTYPES = {"object", "int64", "float64"}
+
+
+def _arrow_type(name: str):
+    if name == "timestamp_us":
+        return pa.timestamp("us")
+    if name == "timestamp_ns":
+        return pa.timestamp("ns")
+    if name == "time64_us":
+        return pa.time64("us")
+    return getattr(pa, name)()
+
+
+def _value_kind(value) -> Optional[str]:
+    """Name of a value's kind in OBJECT_KINDS ("none" for None), or None if it can't be stored exactly"""
+    kind = type(value)
+    if value is None:
+        return "none"
+    if kind in (str, bool, int, float, datetime.date):
+        return kind.__name__
+    if kind in (datetime.datetime, datetime.time):
+        return kind.__name__ if value.tzinfo is None else None
+    if kind is pd.Timestamp:
+        return "timestamp" if value.tz is None else None
+    return None
+
+
+def _encode_object(values) -> Optional[pa.StructArray]:
+    """
+    An object column as a struct of its type codes and one field per value type present, so
+    mixed columns come back with each value's original type; None if a value can't be stored.
+    """
+    codes = {"none": 0, **{name: code for code, (name, _) in enumerate(OBJECT_KINDS, 1)}}
+    kinds = [_value_kind(value) for value in values]
+    if None in kinds:
+        return None
+    fields, names = [pa.array([codes[kind] for kind in kinds], pa.int8())], ["kind"]
+    for name, arrow_type in OBJECT_KINDS:
+        if name in kinds:
+            column = [value if kind == name else None for value, kind in zip(values, kinds)]
+            fields.append(pa.array(column, _arrow_type(arrow_type)))
+            names.append(name)
+    return pa.StructArray.from_arrays(fields, names=names)
+
+
+def _decode_object(column) -> np.ndarray:
+    """Inverse of _encode_object"""
+    struct = column.combine_chunks()
+    codes = struct.field("kind").to_numpy()
+    values = np.full(len(codes), None, dtype=object)
+    for code, (name, _) in enumerate(OBJECT_KINDS, 1):
+        positions = np.flatnonzero(codes == code)
+        if len(positions):
+            values[positions] = struct.field(name).take(positions).to_pylist()
+    return values
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SharedSessionStore:
+    def __init__(self, root_dir: str, blob_store: Optional[BlobStore] = None):
+        self.root_dir = root_dir
+        self.blob_store = blob_store
+        os.makedirs(root_dir, exist_ok=True)
+
+    def _entry_path(self, file_id: int) -> str:
+        return os.path.join(self.root_dir, f"file-{file_id}")
+
+    # ------------------------------------------------------------------
+    # Reference counting
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _add_holder(entry_path: str):
+        holders = os.path.join(entry_path, HOLDERS)
+        os.makedirs(holders, exist_ok=True)
+        open(os.path.join(holders, str(os.getpid())), "w").close()
+
+    @staticmethod
+    def _live_holders(entry_path: str) -> int:
+        """Count holders whose process is still running, pruning dead ones"""
+        holders = os.path.join(entry_path, HOLDERS)
+        live = 0
+        for name in os.listdir(holders) if os.path.isdir(holders) else []:
+            if name.isdigit() and _pid_alive(int(name)):
+                live += 1
+            else:
+                try:
+                    os.remove(os.path.join(holders, name))
+                except OSError:
+                    pass
+        return live
+
+    def release(self, file_ids: Iterable[int]):
+        """Drop this process's references; entries nobody references any more are deleted"""
+        for file_id in file_ids:
+            entry_path = self._entry_path(file_id)
+            try:
+                os.remove(os.path.join(entry_path, HOLDERS, str(os.getpid())))
+            except OSError:
+                pass
+            if os.path.isdir(entry_path) and self._live_holders(entry_path) == 0:
+                shutil.rmtree(entry_path, ignore_errors=True)
+
+    def sweep(self) -> int:
+        """Delete entries (and abandoned partial publishes) held by no running process"""
+        removed = 0
+        for name in os.listdir(self.root_dir):
+            path = os.path.join(self.root_dir, name)
+            if ".tmp-" in name:
+                # Partial publish: file-<id>.tmp-<pid>-<nonce>
+                pid = name.split(".tmp-")[1].split("-")[0]
+                if pid.isdigit() and _pid_alive(int(pid)):
+                    continue
+            elif self._live_holders(path) > 0:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+        return removed
+
+    # ------------------------------------------------------------------
+    # Publish / attach
+    # ------------------------------------------------------------------
+
+    def attach(
+        self, file_id: int, blob_key: Optional[str] = None
+    ) -> Optional[Tuple[Dict[str, Callable[..., Optional[pd.DataFrame]]], Dict[str, Dict]]]:
+        """
+        Attach to a published file without reading its sheets yet; returns
+        ({sheet name: loader}, schema_info) or None. Each loader memory-maps its sheet when called,
+        with an optional list of columns to read (see _read_sheet).
+        blob_key is the entry's prefix in the blob store, tried when the host has no copy.
+        """
+        entry_path = self._entry_path(file_id)
+        manifest_path = os.path.join(entry_path, MANIFEST)
+        if not os.path.exists(manifest_path) and not self._download(file_id, blob_key):
+            return None
+
+        try:
+            self._add_holder(entry_path)
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            for sheet in manifest["sheets"]:
+                self._check_sheet(sheet)
+            loaders = {
+                sheet["name"]: functools.partial(self._read_sheet, os.path.join(entry_path, sheet["file"]), sheet)
+                for sheet in manifest["sheets"]
+            }
+            return loaders, manifest["schema"]
+        except (OSError, ValueError, KeyError) as e:
+            # Entry removed or damaged while attaching - the caller reparses the workbook
+            logger.warning("Could not attach shared data for file %s: %s", file_id, e)
+            self.release([file_id])
+            return None
+
+    def load(self, file_id: int, blob_key: Optional[str] = None) -> Optional[Tuple[Dict[str, pd.DataFrame], Dict[str, Dict]]]:
+        """Attach to a published file and read all its sheets; returns (dataframes, schema_info) or None"""
+        attached = self.attach(file_id, blob_key)
+        if attached is None:
+            return None
+        loaders, schema_info = attached
+        try:
+            return {name: load() for name, load in loaders.items()}, schema_info
+        except (OSError, ValueError, pa.ArrowException) as e:
+            logger.warning("Could not attach shared data for file %s: %s", file_id, e)
+            self.release([file_id])
+            return None
+
+    @staticmethod
+    def _check_sheet(sheet: Dict):
+        """Raise ValueError unless a manifest entry is an Arrow file inside the entry directory"""
+        if sheet.get("format") != "arrow" or os.path.basename(sheet["file"]) != sheet["file"]:
+            raise ValueError(f"Unsupported shared sheet {sheet.get('file')!r} ({sheet.get('format')})")
+
+    @staticmethod
+    def _read_sheet(sheet_path: str, sheet: Dict, columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        """
+        Read a sheet, or with columns only those columns - None if that can't be done
+        (a sheet whose labels aren't all strings). Arrow converts just the selected columns
+        out of the memory map.
+        """
+        labels = sheet.get("labels")
+        if columns is not None and labels is not None:
+            return None
+        table = pa.ipc.open_file(pa.memory_map(sheet_path)).read_all()
+        if columns is not None:
+            # Keep the index columns too, so the projection has the sheet's row labels
+            index_columns = table.schema.pandas_metadata.get("index_columns", []) if table.schema.metadata else []
+            table = table.select(list(columns) + [column for column in index_columns if isinstance(column, str)])
+        decoded = {}
+        for name in sheet.get("objects", []):
+            position = table.schema.get_field_index(name)
+            if position >= 0:
+                decoded[name] = _decode_object(table.column(position))
+                # A null placeholder converts for free; the decoded values replace it
+                table = table.set_column(position, name, pa.nulls(table.num_rows))
+        # split_blocks lets numeric columns stay views on the memory map
+        df = table.to_pandas(split_blocks=True)
+        for name, values in decoded.items():
+            df[name] = values
+        if labels is not None:
+            df.columns = pd.Index(labels, dtype=sheet["labels_dtype"])
+        return df
+
+    def publish(
+        self,
+        file_id: int,
+        dataframes: Dict[str, pd.DataFrame],
+        schema_info: Dict[str, Dict],
+        blob_key: Optional[str] = None
+    ) -> bool:
+        """
+        Publish a parsed file for other workers (and, given blob_key, other nodes).
+        Returns False if another worker already did.
+        Written to a temporary directory and renamed into place, so readers never see partial data.
+        """
+        entry_path = self._entry_path(file_id)
+        if os.path.exists(entry_path):
+            self._add_holder(entry_path)
+            return False
+
+        tmp_path = f"{entry_path}.tmp-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        try:
+            os.makedirs(tmp_path)
+            sheets = []
+            for index, (sheet_name, df) in enumerate(dataframes.items()):
+                sheet = self._write_sheet(tmp_path, index, df)
+                if sheet is None:
+                    logger.info("Not sharing file %s: sheet %r has values that can't be stored exactly", file_id, sheet_name)
+                    shutil.rmtree(tmp_path, ignore_errors=True)
+                    return False
+                sheets.append({"name": sheet_name, **sheet})
+            with open(os.path.join(tmp_path, MANIFEST), "w") as f:
+                json.dump({"sheets": sheets, "schema": schema_info}, f, default=str)
+            self._upload(tmp_path, sheets, blob_key)
+            self._add_holder(tmp_path)
+            os.rename(tmp_path, entry_path)
+            return True
+        except OSError as e:
+            # Lost the race to another worker (rename onto a non-empty directory) or disk full
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            if os.path.isdir(entry_path):
+                self._add_holder(entry_path)
+            else:
+                logger.warning("Could not publish shared data for file %s: %s", file_id, e)
+            return False
+
+    def _upload(self, directory: str, sheets, blob_key: Optional[str]):
+        """
+        Copy an entry to the blob store - manifest last, so a visible manifest means a complete entry.
+        Only Arrow entries are ever shared between nodes.
+        """
+        if self.blob_store is None or not blob_key:
+            return
+        try:
+            for sheet in sheets:
+                self._check_sheet(sheet)
+            for sheet in sheets:
+                self.blob_store.put_file(f"{blob_key}/{sheet['file']}", os.path.join(directory, sheet["file"]))
+            self.blob_store.put_file(f"{blob_key}/{MANIFEST}", os.path.join(directory, MANIFEST))
+        except Exception as e:
+            # Other nodes fall back to the uploaded workbook
+            logger.warning("Could not upload shared data to %s: %s", blob_key, e)
+
+    def _download(self, file_id: int, blob_key: Optional[str]) -> bool:
+        """
+        Fetch an entry other nodes published into the host store; returns False if unavailable.
+        Entries that aren't all Arrow files are refused, and the caller parses the uploaded file.
+        """
+        if self.blob_store is None or not blob_key:
+            return False
+        entry_path = self._entry_path(file_id)
+        tmp_path = f"{entry_path}.tmp-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        try:
+            if not self.blob_store.get_file(f"{blob_key}/{MANIFEST}", os.path.join(tmp_path, MANIFEST)):
+                return False
+            with open(os.path.join(tmp_path, MANIFEST)) as f:
+                manifest = json.load(f)
+            for sheet in manifest["sheets"]:
+                self._check_sheet(sheet)
+            for sheet in manifest["sheets"]:
+                if not self.blob_store.get_file(f"{blob_key}/{sheet['file']}", os.path.join(tmp_path, sheet["file"])):
+                    return False
+            os.rename(tmp_path, entry_path)
+            return True
+        except OSError:
+            # Another worker on this host downloaded it first
+            return os.path.isdir(entry_path)
+        except Exception as e:
+            logger.warning("Could not download shared data from %s: %s", blob_key, e)
+            return False
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+    @staticmethod
+    def _write_sheet(directory: str, index: int, df: pd.DataFrame) -> Optional[Dict]:
+        """
+        Write one sheet as Arrow IPC, object columns encoded with their values' types (see
+        _encode_object) and non-string labels kept in the manifest. None if the sheet can't be
+        stored exactly - unusual values or labels, or something else Arrow rejects.
+        """
+        sheet = {"file": f"{index}.arrow", "format": "arrow"}
+        if not all(isinstance(label, str) for label in df.columns):
+            labels = list(df.columns)
+            if str(df.columns.dtype) not in LABEL_DTYPES or not all(type(label) in (str, int, float) for label in labels):
+                return None
+            sheet["labels"], sheet["labels_dtype"] = labels, str(df.columns.dtype)
+            df = df.set_axis([str(position) for position in range(len(labels))], axis=1)
+        if df.columns.duplicated().any():
+            return None
+
+        try:
+            objects = {}
+            for position, name in enumerate(df.columns):
+                if df[name].dtype == object:
+                    encoded = _encode_object(df[name].tolist())
+                    if encoded is None:
+                        return None
+                    objects[position] = (name, encoded)
+            table = pa.Table.from_pandas(df.drop(columns=[name for name, _ in objects.values()]))
+            for position, (name, encoded) in objects.items():
+                table = table.add_column(position, name, encoded)
+            with pa.OSFile(os.path.join(directory, sheet["file"]), "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+        except (pa.ArrowException, ValueError, TypeError, OverflowError) as e:
+            logger.info("Could not store sheet as Arrow: %s", e)
+            return None
+        if objects:
+            sheet["objects"] = [name for name, _ in objects.values()]
+        return sheet
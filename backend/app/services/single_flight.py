@@ -0,0 +1,46 @@
+"""
+Single-flight coalescing of identical concurrent requests
+The first request for a key runs the computation in the threadpool; identical requests
+arriving while it runs wait for that same result instead of repeating the Gemini calls and
+code execution. Nothing is kept afterwards - the next request for the key starts a new run
+(completed charts are cached separately by ChartCache).
+"""
+import asyncio
+from typing import Any, Callable, Dict, Hashable, Tuple
+from starlette.concurrency import run_in_threadpool
+from app.services.metrics import COALESCED_REQUESTS
+from app.services.tracing import span
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        """name labels this flight group's metrics (e.g. the route)"""
+        self.name = name
+        self._in_flight: Dict[Hashable, "asyncio.Task"] = {}
+
+    async def do(self, key: Hashable, fn: Callable[..., Any], *args) -> Tuple[Any, bool]:
+        """
+        Run fn(*args) in the threadpool, or wait for the identical call already running.
+        Returns (result, shared) - shared is True when the result came from another request.
+        Results are handed to every waiter and must not be mutated. Must be called from the event loop.
+        """
+        task = self._in_flight.get(key)
+        if task is None:
+            # A task of its own, so a disconnecting client doesn't cancel the run for the others
+            task = asyncio.ensure_future(run_in_threadpool(fn, *args))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+            return await asyncio.shield(task), False
+
+        COALESCED_REQUESTS.inc(flight=self.name)
+        with span("coalesced_wait"):
+            return await asyncio.shield(task), True
+
+    def _finished(self, key: Hashable, task: "asyncio.Task"):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            task.exception()  # Mark retrieved even if every waiter has gone away
+
+    def in_flight(self) -> int:
+        return len(self._in_flight)
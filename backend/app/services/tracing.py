@@ -0,0 +1,170 @@
+"""
+Lightweight per-request span tracing
+Each HTTP request gets a Trace (started by middleware); pipeline stages open spans on
+it through context variables, so nested calls need no plumbing. The timing breakdown is
+stored with the request's Conversation row and can be exported as OTLP/JSON.
+Spans opened outside a request are no-ops.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    __slots__ = ("name", "span_id", "parent_id", "start_ns", "end_ns", "attributes")
+
+    def __init__(self, name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+
+
+class _NoopSpan:
+    """Returned when no trace is active, so callers can set attributes unconditionally"""
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    def __init__(self, name: str, **attributes):
+        self.trace_id = os.urandom(16).hex()
+        self.root = Span(name, None, attributes)
+        self.spans: List[Span] = [self.root]
+
+    def add_span(self, name: str, parent: Optional[Span], attributes: Dict[str, Any]) -> Span:
+        span = Span(name, (parent or self.root).span_id, attributes)
+        self.spans.append(span)
+        return span
+
+    def to_record(self) -> Dict[str, Any]:
+        """
+        Compact timing breakdown stored on Conversation.trace.
+        Offsets and durations are in milliseconds from the start of the request;
+        spans still running (e.g. the request itself) are measured up to now.
+        """
+        now = time.time_ns()
+        start = self.root.start_ns
+        index = {span.span_id: position for position, span in enumerate(self.spans)}
+        spans = []
+        for span in self.spans[1:]:
+            spans.append({
+                "name": span.name,
+                "parent": index.get(span.parent_id, 0),
+                "start_ms": round((span.start_ns - start) / 1e6, 3),
+                "duration_ms": round(((span.end_ns or now) - span.start_ns) / 1e6, 3),
+                **({"attributes": dict(span.attributes)} if span.attributes else {})
+            })
+        return {
+            "trace_id": self.trace_id,
+            "name": self.root.name,
+            "duration_ms": round(((self.root.end_ns or now) - start) / 1e6, 3),
+            "spans": spans
+        }
+
+    def to_otlp(self, service_name: str) -> Dict[str, Any]:
+        """The trace as an OTLP/JSON ExportTraceServiceRequest"""
+        now = time.time_ns()
+        spans = []
+        for span in self.spans:
+            spans.append({
+                "traceId": self.trace_id,
+                "spanId": span.span_id,
+                **({"parentSpanId": span.parent_id} if span.parent_id else {}),
+                "name": span.name,
+                "kind": 2 if span is self.root else 1,  # SERVER for the request, INTERNAL for stages
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns or now),
+                "attributes": [_otlp_attribute(key, value) for key, value in span.attributes.items()],
+                "status": {"code": 2} if "error" in span.attributes else {}
+            })
+        return {"resourceSpans": [{
+            "resource": {"attributes": [_otlp_attribute("service.name", service_name)]},
+            "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}]
+        }]}
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def start_trace(name: str, **attributes):
+    """Make a new trace current for the enclosed block (one per request)"""
+    trace = Trace(name, **attributes)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(trace.root)
+    try:
+        yield trace
+    finally:
+        trace.root.end()
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Record the enclosed block as a span of the current trace, nested under the current span"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield NOOP_SPAN
+        return
+    current = trace.add_span(name, _current_span.get(), attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.set_attribute("error", type(e).__name__)
+        raise
+    finally:
+        current.end()
+        _current_span.reset(token)
+
+
+class TraceExporter:
+    """Appends finished traces to a file as OTLP/JSON, one ExportTraceServiceRequest per line"""
+
+    def __init__(self, path: str, service_name: str = "finance-ai-agent"):
+        self.path = path
+        self.service_name = service_name
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def export(self, trace: Trace):
+        line = json.dumps(trace.to_otlp(self.service_name), separators=(",", ":"), default=str)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
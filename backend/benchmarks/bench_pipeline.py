@@ -0,0 +1,381 @@
+"""
+Offline benchmark suite for the upload, parse, profile, execute and chart paths
+Measures, at each requested scale:
+  parse_excel, extract_schema_info, session cold load (parse - all sheets or only the
+  first - and shared-store attach, reading a query's first sheet whole or only the
+  columns the query uses),
+  session warm load, generated query code execution, execute_chart_code,
+  chart downsampling and serialization, and end-to-end /api/upload, /api/query
+  and /api/visualize latency with a stubbed GeminiService.
+Routes run in-process against a temporary SQLite database - no PostgreSQL or API key needed.
+
+Run from the backend directory:
+    python -m benchmarks.bench_pipeline                            # small and medium scales
+    python -m benchmarks.bench_pipeline --scales large --repeat 3 --output results.json
+    python -m benchmarks.bench_pipeline --compare baseline.json --output results.json
+Scales (total rows, sheets): small 10k/1, medium 100k/5, large 1M/10, xlarge 10M/50.
+Workbooks are generated once and cached in --data-dir.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+# The app reads its settings at import time: run single-node, without a shared store
+# (cold loads measure parsing; the attach path is benchmarked explicitly), blob store or tracing
+for key, value in {"PORT": "8000", "DB_PORT": "5432", "SHARED_STORE_DIR": "", "BLOB_BACKEND": "",
+                   "TRACE_EXPORT_PATH": "", "CACHE_INVALIDATION_CHANNEL": ""}.items():
+    os.environ.setdefault(key, value)
+
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from benchmarks.workload import workbook_path
+
+SCALES = {
+    "small": (10_000, 1),
+    "medium": (100_000, 5),
+    "large": (1_000_000, 10),
+    "xlarge": (10_000_000, 50),
+}
+
+# Generated query code, as GeminiService.generate_query_code would return it ({sheet} is substituted)
+QUERY_CODE = {
+    "groupby_sum": "result = dataframes['{sheet}'].groupby('Branch')['Amount'].sum().to_dict()",
+    "filter_top10": "df = dataframes['{sheet}']\nresult = df[df['Quantity'] > 25].nlargest(10, 'Amount')",
+    "monthly_totals": "df = dataframes['{sheet}']\nresult = df.groupby(df['Date'].dt.to_period('M'))['Amount'].sum()",
+    "all_sheets_pivot": "result = pd.concat(list(dataframes.values())).pivot_table(index='Branch', columns='Account', values='Amount', aggfunc='sum')",
+}
+
+# Generated chart code, as GeminiService.generate_chart_code would return it
+CHART_CODE = {
+    "bar_by_branch": "df = dataframes['{sheet}'].groupby('Branch', as_index=False)['Amount'].sum()\nfig = px.bar(df, x='Branch', y='Amount')",
+    "daily_line": "df = dataframes['{sheet}'].groupby('Date', as_index=False)['Amount'].sum()\nfig = px.line(df, x='Date', y='Amount')",
+    "raw_scatter": "fig = px.scatter(dataframes['{sheet}'], x='Quantity', y='Amount')",
+}
+
+
+def use_sqlite(db_path: str, **engine_options):
+    """
+    Rebind app.database to a SQLite file and create the tables.
+    Must run before app.main (and so the shared services) is imported.
+    """
+    import app.database as database
+    from app.models.db_models import Base
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False}, **engine_options)
+    database.engine = engine
+    database.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def measure(fn, repeat: int) -> dict:
+    """Run fn repeat times; returns latency statistics in milliseconds"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return {
+        "n": len(times),
+        "median_ms": statistics.median(times),
+        "p95_ms": times[min(len(times) - 1, int(round(0.95 * (len(times) - 1))))],
+        "min_ms": times[0],
+        "max_ms": times[-1],
+    }
+
+
+class StubGeminiService:
+    """GeminiService stand-in returning canned code instantly"""
+
+    def __init__(self, query_code: str, chart_code: str):
+        self.query_code = query_code
+        self.chart_code = chart_code
+        self.kind = "data_query"
+
+    @staticmethod
+    def _first_sheet(schema_info) -> str:
+        return next(iter(schema_info))
+
+    def classify_query(self, question, has_data=False, schema_info=None):
+        return self.kind
+
+    def generate_query_code(self, question, schema_info):
+        return self.query_code.format(sheet=self._first_sheet(schema_info))
+
+    def generate_chart_code(self, request, schema_info, dataframes_var_name="dataframes"):
+        return self.chart_code.format(sheet=self._first_sheet(schema_info))
+
+    def generate_answer_from_result(self, question, result):
+        return "stub answer"
+
+    def handle_conversational_query(self, question, has_data=False, schema_info=None):
+        return "stub reply"
+
+    def handle_out_of_scope_query(self, question):
+        return "stub decline"
+
+
+class Suite:
+    def __init__(self, work_dir: str, repeat: int):
+        self.work_dir = work_dir
+        self.repeat = repeat
+        self.results = []
+        self._app = None
+
+    def record(self, benchmark: str, scale: str, rows: int, sheets: int, stats: dict, **extra):
+        self.results.append({"benchmark": benchmark, "scale": scale, "rows": rows, "sheets": sheets, **stats, **extra})
+        print(f"  {benchmark:<34} median {stats['median_ms']:>10.2f} ms   p95 {stats['p95_ms']:>10.2f} ms", flush=True)
+
+    # ------------------------------------------------------------------
+    # Component benchmarks
+    # ------------------------------------------------------------------
+
+    def run_components(self, scale: str, rows: int, sheets: int, path: str):
+        from app.models.db_models import Base
+        from app.services.chart_downsampler import ChartDownsampler
+        from app.services.chart_generator import ChartGenerator
+        from app.services.chart_serializer import dumps_chart
+        from app.services.code_analysis import referenced_columns, referenced_sheets
+        from app.services.db_session_manager import DBSessionManager
+        from app.config import Config
+        from app.services.excel_parser import ExcelParser
+        from app.services.shared_store import SharedSessionStore
+
+        # The engine the app is configured with (EXCEL_ENGINE), as uploads and cold loads use it
+        parser = ExcelParser(engine=Config.EXCEL_ENGINE)
+        self.record("parse_excel", scale, rows, sheets, measure(lambda: parser.parse_excel(path), self.repeat))
+        dataframes = parser.parse_excel(path)
+        self.record("extract_schema_info", scale, rows, sheets,
+                    measure(lambda: parser.extract_schema_info(dataframes), self.repeat))
+
+        # Session loads against a scratch SQLite database
+        scratch = tempfile.mkdtemp(dir=self.work_dir)
+        engine = create_engine(f"sqlite:///{scratch}/bench.db")
+        Base.metadata.create_all(engine)
+        SessionFactory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        upload_dir = os.path.join(scratch, "uploads")
+
+        db = SessionFactory()
+        manager = DBSessionManager(upload_dir=upload_dir, excel_parser=parser)
+        session_id = manager.create_session(db)
+        file_path = os.path.join(manager.get_session_path(session_id), os.path.basename(path))
+        shutil.copyfile(path, file_path)
+        manager.update_session_data(db, session_id, file_path=file_path, file_size=os.path.getsize(file_path),
+                                    dataframes=dataframes, schema_info=parser.extract_schema_info(dataframes))
+        db.close()
+
+        def cold_load(store=None, sheets_read=None):
+            """Load the session in a fresh manager and read sheets_read of its sheets (None: all)"""
+            session_db = SessionFactory()
+            try:
+                session = DBSessionManager(upload_dir=upload_dir, shared_store=store, excel_parser=parser).get_session(session_db, session_id)
+                for key in list(session.dataframes)[:sheets_read]:
+                    session.dataframes[key]
+            finally:
+                session_db.close()
+
+        self.record("session_cold_load_parse", scale, rows, sheets, measure(cold_load, self.repeat))
+        self.record("session_cold_load_parse_one_sheet", scale, rows, sheets,
+                    measure(lambda: cold_load(sheets_read=1), self.repeat))
+
+        store = SharedSessionStore(os.path.join(scratch, "shared"))
+        cold_load(store)  # publishes the parsed file
+        self.record("session_cold_load_shared_attach", scale, rows, sheets,
+                    measure(lambda: cold_load(store), self.repeat))
+
+        def cold_query(code, projected):
+            """Attach to the shared copy in a fresh manager and read what code needs of its first sheet"""
+            session_db = SessionFactory()
+            try:
+                session = DBSessionManager(upload_dir=upload_dir, shared_store=store, excel_parser=parser).get_session(session_db, session_id)
+                code = code.format(sheet=next(iter(session.dataframes)))
+                if projected:
+                    session.dataframes.view(referenced_columns(code, session.schema_info))
+                else:
+                    session.dataframes.preload(referenced_sheets(code))
+            finally:
+                session_db.close()
+
+        for mode in ("whole", "projected"):
+            self.record(f"session_cold_query_shared[{mode}]", scale, rows, sheets, measure(
+                lambda mode=mode: cold_query(QUERY_CODE["groupby_sum"], mode == "projected"), self.repeat))
+
+        db = SessionFactory()
+        manager.get_session(db, session_id)
+        self.record("session_warm_load", scale, rows, sheets,
+                    measure(lambda: manager.get_session(db, session_id), max(self.repeat, 10)))
+        session = manager.get_session(db, session_id)
+        db.close()
+        engine.dispose()
+
+        sheet = next(iter(session.dataframes))
+        for name, code in QUERY_CODE.items():
+            code = code.format(sheet=sheet)
+
+            def run_query(code=code):
+                exec(code, {"pd": pd, "dataframes": session.dataframes})
+
+            self.record(f"execute_query[{name}]", scale, rows, sheets, measure(run_query, self.repeat))
+
+        generator = ChartGenerator()
+        downsampler = ChartDownsampler()
+        for name, code in CHART_CODE.items():
+            code = code.format(sheet=sheet)
+            self.record(f"execute_chart_code[{name}]", scale, rows, sheets, measure(
+                lambda code=code: generator.execute_chart_code(code, session.dataframes), self.repeat))
+            figure = generator.execute_chart_code(code, session.dataframes)
+            self.record(f"downsample_chart[{name}]", scale, rows, sheets,
+                        measure(lambda figure=figure: downsampler.reduce(figure), self.repeat))
+            reduced, _ = downsampler.reduce(figure)
+            body = dumps_chart({"chart_data": reduced})
+            self.record(f"serialize_chart[{name}]", scale, rows, sheets,
+                        measure(lambda reduced=reduced: dumps_chart({"chart_data": reduced}), self.repeat),
+                        bytes=len(body))
+
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    # ------------------------------------------------------------------
+    # End-to-end routes
+    # ------------------------------------------------------------------
+
+    def _client(self):
+        """In-process app bound to a scratch SQLite database and a stub GeminiService"""
+        if self._app is None:
+            from sqlalchemy.pool import StaticPool
+            use_sqlite(f"{self.work_dir}/routes.db", poolclass=StaticPool)
+            # Imported only now, so the shared services pick up the SQLite session factory
+            from fastapi.testclient import TestClient
+            from app.main import app
+            import app.services.shared as shared
+            shared.db_session_manager.upload_dir = os.path.join(self.work_dir, "uploads")
+            shared.chart_cache.max_entries = 0  # measure chart generation, not cache hits
+            self.stub = StubGeminiService(QUERY_CODE["groupby_sum"], CHART_CODE["bar_by_branch"])
+            shared._gemini_service = self.stub
+            self._app = TestClient(app)
+        return self._app
+
+    def run_routes(self, scale: str, rows: int, sheets: int, path: str):
+        client = self._client()
+        with open(path, "rb") as f:
+            content = f.read()
+
+        def upload():
+            response = client.post("/api/upload", files=[("file", (os.path.basename(path), content))])
+            assert response.status_code == 200, response.text
+            return response.json()["session_id"]
+
+        self.record("route[/api/upload]", scale, rows, sheets, measure(upload, self.repeat))
+        session_id = upload()
+
+        def post(url, payload):
+            response = client.post(url, json=payload)
+            assert response.status_code == 200, response.text
+
+        self.stub.kind = "data_query"
+        self.record("route[/api/query data_query]", scale, rows, sheets, measure(
+            lambda: post("/api/query", {"session_id": session_id, "question": "total by branch"}), self.repeat))
+        self.stub.kind = "visualization"
+        self.record("route[/api/query visualization]", scale, rows, sheets, measure(
+            lambda: post("/api/query", {"session_id": session_id, "question": "chart by branch"}), self.repeat))
+        self.record("route[/api/visualize]", scale, rows, sheets, measure(
+            lambda: post("/api/visualize", {"session_id": session_id, "request": "chart by branch"}), self.repeat))
+
+        # Don't let earlier scales' sessions inflate later measurements
+        import app.services.shared as shared
+        shared.db_session_manager.cleanup_session(session_id)
+
+
+def environment() -> dict:
+    """Run metadata stored with the results, to tell comparable runs apart"""
+    from app.config import Config
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": commit,
+        "python": sys.version.split()[0],
+        "pandas": pd.__version__,
+        "excel_engine": Config.EXCEL_ENGINE,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> int:
+    """Print median changes against a baseline run; returns the number of regressions"""
+    previous = {(r["benchmark"], r["scale"]): r for r in baseline["results"]}
+    regressions = 0
+    print(f"\nComparison with baseline ({baseline['environment'].get('git_commit')}):")
+    for result in current["results"]:
+        before = previous.get((result["benchmark"], result["scale"]))
+        if before is None or not before["median_ms"]:
+            continue
+        change = result["median_ms"] / before["median_ms"] - 1
+        flag = ""
+        if change > threshold:
+            regressions += 1
+            flag = "  REGRESSION"
+        print(f"  {result['scale']:<7} {result['benchmark']:<34} {before['median_ms']:>10.2f} -> "
+              f"{result['median_ms']:>10.2f} ms ({change:+.1%}){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="small,medium", help=f"Comma-separated subset of: {', '.join(SCALES)}")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per benchmark")
+    parser.add_argument("--skip-routes", action="store_true", help="Only run the component benchmarks")
+    parser.add_argument("--data-dir", default=os.path.join(os.path.dirname(__file__), ".data"),
+                        help="Where generated workbooks are cached")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--compare", help="Baseline results JSON to compare medians against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Relative median slowdown counted as a regression (exit status 1)")
+    args = parser.parse_args()
+
+    scales = [scale.strip() for scale in args.scales.split(",") if scale.strip()]
+    unknown = [scale for scale in scales if scale not in SCALES]
+    if unknown:
+        parser.error(f"Unknown scales: {', '.join(unknown)}")
+
+    work_dir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    suite = Suite(work_dir, args.repeat)
+    try:
+        for scale in scales:
+            rows, sheets = SCALES[scale]
+            print(f"[{scale}] {rows} rows over {sheets} sheets", flush=True)
+            path = workbook_path(args.data_dir, rows, sheets, args.seed)
+            suite.run_components(scale, rows, sheets, path)
+            if not args.skip_routes:
+                suite.run_routes(scale, rows, sheets, path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    results = {"environment": environment(), "repeat": args.repeat, "results": suite.results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(baseline, results, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
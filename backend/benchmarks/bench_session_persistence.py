@@ -0,0 +1,131 @@
+"""
+Benchmark the session persistence layer with sessions holding hundreds of sheets
+Measures update_session_data (file + sheet inserts) and a cold get_session reload,
+counting the SQL statements each one issues.
+
+Run from the backend directory:
+    python -m benchmarks.bench_session_persistence --database-url sqlite:///bench.db
+    python -m benchmarks.bench_session_persistence --sessions 5 --files 10 --sheets 50
+Without --database-url the configured PostgreSQL database is used (tables are created if missing).
+"""
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app.models.db_models import Base
+from app.services.db_session_manager import DBSessionManager
+
+
+def make_schema(sheet_index: int) -> dict:
+    """Schema info shaped like ExcelParser.extract_schema_info output"""
+    columns = [f"Column_{i}" for i in range(12)]
+    return {
+        "columns": columns,
+        "dtypes": {col: "float64" for col in columns},
+        "row_count": 1000 + sheet_index,
+        "sample_rows": [{col: float(row) for col in columns} for row in range(5)],
+        "numeric_columns": columns,
+        "statistics": {}
+    }
+
+
+class StatementCounter:
+    """Counts SQL statements executed on an engine"""
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def run(database_url: str, sessions: int, files: int, sheets: int) -> dict:
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    SessionFactory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    counter = StatementCounter(engine)
+
+    insert_times, insert_statements = [], []
+    cold_times, cold_statements = [], []
+
+    with tempfile.TemporaryDirectory() as upload_dir:
+        for _ in range(sessions):
+            manager = DBSessionManager(upload_dir=upload_dir)
+            db = SessionFactory()
+            try:
+                session_id = manager.create_session(db)
+
+                # Files don't exist on disk, so the cold reload below rebuilds schemas from the sheets table
+                for file_index in range(files):
+                    schema_info = {f"Sheet_{i}": make_schema(i) for i in range(sheets)}
+                    counter.count = 0
+                    start = time.perf_counter()
+                    manager.update_session_data(
+                        db=db,
+                        session_id=session_id,
+                        file_path=f"{upload_dir}/{session_id}/missing_{file_index}.xlsx",
+                        file_size=0,
+                        schema_info=schema_info
+                    )
+                    insert_times.append(time.perf_counter() - start)
+                    insert_statements.append(counter.count)
+            finally:
+                db.close()
+
+            # Cold reload: fresh manager (empty caches) and fresh DB session (empty identity map)
+            manager = DBSessionManager(upload_dir=upload_dir)
+            db = SessionFactory()
+            try:
+                counter.count = 0
+                start = time.perf_counter()
+                session_data = manager.get_session(db, session_id)
+                cold_times.append(time.perf_counter() - start)
+                cold_statements.append(counter.count)
+                assert len(session_data.schema_info) == files * sheets
+            finally:
+                db.close()
+
+    engine.dispose()
+    return {
+        "sessions": sessions,
+        "files_per_session": files,
+        "sheets_per_file": sheets,
+        "update_session_data": {
+            "median_ms": statistics.median(insert_times) * 1000,
+            "max_ms": max(insert_times) * 1000,
+            "statements": max(insert_statements),
+        },
+        "cold_get_session": {
+            "median_ms": statistics.median(cold_times) * 1000,
+            "max_ms": max(cold_times) * 1000,
+            "statements": max(cold_statements),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="SQLAlchemy URL (defaults to the configured database)")
+    parser.add_argument("--sessions", type=int, default=3)
+    parser.add_argument("--files", type=int, default=5, help="Uploaded files per session")
+    parser.add_argument("--sheets", type=int, default=100, help="Sheets per uploaded file")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    database_url = args.database_url
+    if not database_url:
+        from app.database import DATABASE_URL
+        database_url = DATABASE_URL
+
+    results = run(database_url, args.sessions, args.files, args.sheets)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Parity check of the pandas Excel engines ExcelParser can use
+Parses each workbook with every engine in --engines and fails (exit status 1) unless all of
+them give the same sheets, with identical DataFrames - values, column names, index and
+dtypes - after ExcelParser's cleaning. The first engine is the reference. Also prints how
+long each engine took, to show what a faster engine (EXCEL_ENGINE) buys.
+
+Workbooks checked: the samples in test_data/, the benchmark workbook at --rows, and a wide
+workbook from generate_test_data.py with every column kind (dates, ids, text, integers,
+amounts) - generated once and cached in --data-dir.
+
+Run from the backend directory:
+    python -m benchmarks.excel_engine_parity
+    python -m benchmarks.excel_engine_parity --engines openpyxl,calamine --rows 100000 --output parity.json
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+from pandas.testing import assert_frame_equal
+from app.services.excel_parser import ExcelParser
+from benchmarks.workload import workbook_path
+from generate_test_data import generate_workbook
+
+# Every column kind generate_test_data.py knows, several of each
+WIDE_COLUMNS = "date=3,category=7,id=3,integer=3,amount=7"
+
+
+def wide_workbook_path(data_dir: str, rows: int, seed: int = 0) -> str:
+    """Path of the cached wide workbook, generating it if missing"""
+    path = os.path.join(data_dir, f"wide_{rows}r_2s_seed{seed}.xlsx")
+    if not os.path.exists(path):
+        generate_workbook(path, rows, sheets=2, columns=WIDE_COLUMNS, cardinality=50, seed=seed)
+    return path
+
+
+def parse(path: str, engine: str):
+    """(sheet_name -> DataFrame, seconds) with one engine"""
+    started = time.perf_counter()
+    dataframes = ExcelParser.read_workbook(path, engine)
+    return dataframes, time.perf_counter() - started
+
+
+def compare(reference: dict, other: dict) -> list:
+    """Differences between two parses of a workbook, one message per mismatching sheet"""
+    problems = []
+    if list(reference) != list(other):
+        problems.append(f"sheets differ: {list(reference)} vs {list(other)}")
+    for sheet_name in reference.keys() & other.keys():
+        try:
+            assert_frame_equal(reference[sheet_name], other[sheet_name], check_dtype=True, check_exact=True)
+        except AssertionError as e:
+            problems.append(f"sheet {sheet_name!r}: {' '.join(str(e).split())}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engines", default="openpyxl,calamine",
+                        help="Comma-separated pandas engines, the first being the reference")
+    parser.add_argument("--rows", type=int, default=10_000, help="Rows of the generated workbooks")
+    parser.add_argument("--data-dir", default=os.path.join(os.path.dirname(__file__), ".data"),
+                        help="Where generated workbooks are cached")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    engines = [engine.strip() for engine in args.engines.split(",") if engine.strip()]
+    if len(engines) < 2:
+        parser.error("--engines needs at least two engines to compare")
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    paths = sorted(glob.glob(os.path.join(backend_dir, "test_data", "*.xlsx")))
+    paths.append(workbook_path(args.data_dir, args.rows, 1, args.seed))
+    paths.append(wide_workbook_path(args.data_dir, args.rows, args.seed))
+
+    results, failures = [], 0
+    for path in paths:
+        reference, seconds = parse(path, engines[0])
+        timings = {engines[0]: seconds}
+        mismatches = {}
+        for engine in engines[1:]:
+            try:
+                dataframes, timings[engine] = parse(path, engine)
+            except Exception as e:
+                mismatches[engine] = [f"failed to parse: {e}"]
+                continue
+            problems = compare(reference, dataframes)
+            if problems:
+                mismatches[engine] = problems
+        failures += bool(mismatches)
+
+        rows = sum(len(df) for df in reference.values())
+        columns = sum(len(df.columns) for df in reference.values())
+        print(f"{'FAIL' if mismatches else 'ok  '} {os.path.basename(path)} "
+              f"({len(reference)} sheets, {rows} rows, {columns} columns)")
+        for engine, seconds in timings.items():
+            print(f"       {engine:10} {seconds * 1000:10.1f} ms")
+        for engine, problems in mismatches.items():
+            for problem in problems:
+                print(f"       {engine}: {problem}")
+        results.append({
+            "workbook": os.path.basename(path),
+            "sheets": len(reference),
+            "rows": rows,
+            "seconds": timings,
+            "mismatches": mismatches,
+        })
+
+    print(f"\n{len(paths) - failures} of {len(paths)} workbooks identical across {', '.join(engines)}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"engines": engines, "pandas": pd.__version__, "results": results,
+                       "passed": not failures}, f, indent=2)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Local HTTP stand-in for the Gemini generateContent REST API
+Answers each prompt with canned text for the pipeline stage it belongs to (recognized from
+the prompt wording in GeminiService), after a configurable simulated model latency.
+Point the app at it with GEMINI_API_ENDPOINT=http://127.0.0.1:<port> (any GEMINI_API_KEY).
+
+Run from the backend directory:
+    python -m benchmarks.fake_gemini --port 8090 --latency-ms 800 --jitter-ms 200
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+# Generated code uses {sheet}, replaced by the first sheet named in the prompt
+CANNED_RESPONSES = {
+    "generate_query_code": "result = dataframes['{sheet}'].groupby('Branch')['Amount'].sum().to_dict()",
+    "generate_chart_code": "df = dataframes['{sheet}'].groupby('Branch', as_index=False)['Amount'].sum()\n"
+                           "fig = px.bar(df, x='Branch', y='Amount')",
+    "generate_answer": "Here are the totals you asked for.",
+    "out_of_scope_reply": "I can only help with questions about your uploaded data.",
+    "conversational_reply": "Hello! Ask me anything about your data.",
+}
+
+# Words in the user's message that make classify_query answer "visualization"
+VISUALIZATION_WORDS = ("chart", "plot", "graph", "visuali")
+
+
+def classify_stage(prompt: str) -> str:
+    """The GeminiService method a prompt came from"""
+    if "Classify the user's message" in prompt:
+        return "classify_query"
+    if prompt.startswith("You are a data visualization assistant"):
+        return "generate_chart_code"
+    if prompt.startswith("You are a data analyst assistant"):
+        return "generate_query_code"
+    if "The data analysis returned:" in prompt:
+        return "generate_answer"
+    if "outside the scope of data analysis" in prompt:
+        return "out_of_scope_reply"
+    return "conversational_reply"
+
+
+class FakeGemini:
+    """Response policy shared by the request handler threads"""
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0,
+                 responses: Optional[Dict[str, str]] = None, seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.responses = {**CANNED_RESPONSES, **(responses or {})}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls: Dict[str, int] = {}
+
+    def delay(self) -> float:
+        with self._lock:
+            return max(0.0, self._random.gauss(self.latency_ms, self.jitter_ms) / 1000)
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def respond(self, prompt: str) -> str:
+        stage = classify_stage(prompt)
+        with self._lock:
+            self.calls[stage] = self.calls.get(stage, 0) + 1
+        if stage == "classify_query":
+            message = re.search(r'User message: "(.*)"', prompt)
+            text = message.group(1).lower() if message else ""
+            return "visualization" if any(word in text for word in VISUALIZATION_WORDS) else "data_query"
+        sheet = re.search(r"^(?:Sheet|Available sheets): ([^,\n]+)", prompt, re.MULTILINE)
+        return self.responses[stage].replace("{sheet}", sheet.group(1) if sheet else "Sheet1")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        fake: FakeGemini = self.server.fake
+        if ":generateContent" not in self.path:
+            return self._send(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+        try:
+            request = json.loads(body)
+            prompt = "".join(part.get("text", "") for content in request.get("contents", [])
+                             for part in content.get("parts", []))
+        except (ValueError, AttributeError):
+            return self._send(400, {"error": {"code": 400, "message": "Invalid JSON", "status": "INVALID_ARGUMENT"}})
+
+        time.sleep(fake.delay())
+        if fake.should_fail():
+            return self._send(500, {"error": {"code": 500, "message": "Injected failure", "status": "INTERNAL"}})
+        text = fake.respond(prompt)
+        self._send(200, {
+            "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP", "index": 0}],
+            "usageMetadata": {"promptTokenCount": len(prompt) // 4, "candidatesTokenCount": len(text) // 4,
+                              "totalTokenCount": (len(prompt) + len(text)) // 4},
+        })
+
+    def _send(self, status: int, payload: dict):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeGeminiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, fake: FakeGemini, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _Handler)
+        self.fake = fake
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeGeminiServer":
+        """Serve from a daemon thread"""
+        threading.Thread(target=self.serve_forever, name="fake-gemini", daemon=True).start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=800, help="Mean simulated model latency")
+    parser.add_argument("--jitter-ms", type=float, default=200, help="Standard deviation of the latency")
+    parser.add_argument("--error-rate", type=float, default=0, help="Fraction of calls answered with HTTP 500")
+    parser.add_argument("--responses", help="JSON file overriding canned responses, keyed by stage")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    responses = None
+    if args.responses:
+        with open(args.responses) as f:
+            responses = json.load(f)
+    server = FakeGeminiServer(FakeGemini(args.latency_ms, args.jitter_ms, args.error_rate, responses, args.seed),
+                              args.host, args.port)
+    print(f"Fake Gemini listening on {server.url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
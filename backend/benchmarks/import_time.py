@@ -0,0 +1,118 @@
+"""
+Cold-start import profile of the API
+Imports app.main in fresh interpreters (as a spawning uvicorn worker does) and fails
+(exit status 1) when the median import time exceeds --budget-ms, or when any of the heavy
+libraries the app defers until first use (pandas, NumPy, pyarrow, plotly, the Excel
+engines, the Gemini SDK) gets imported along with it. Prints the slowest top-level imports
+from `python -X importtime` to show where the time goes.
+
+Run from the backend directory:
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --budget-ms 1000 --runs 7 --output import_time.json
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+# Settings app.main needs to import, without connecting anywhere
+ENVIRONMENT = {"PORT": "8000", "DB_PORT": "5432", "SHARED_STORE_DIR": "", "BLOB_BACKEND": "",
+               "TRACE_EXPORT_PATH": "", "CACHE_INVALIDATION_CHANNEL": ""}
+
+# Must stay out of `import app.main` (see app/services/deferred_import.py)
+DEFERRED_MODULES = ["pandas", "numpy", "pyarrow", "plotly", "openpyxl", "xlrd", "python_calamine",
+                    "google.generativeai"]
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - started
+print(json.dumps({"seconds": elapsed, "modules": [name for name in %r if name in sys.modules]}))
+""" % (DEFERRED_MODULES,)
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def _environment():
+    env = dict(os.environ)
+    for key, value in ENVIRONMENT.items():
+        env.setdefault(key, value)
+    return env
+
+
+def probe(backend_dir: str):
+    """Import app.main once in a new interpreter: (seconds, deferred modules that got imported)"""
+    result = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", PROBE],
+        cwd=backend_dir, env=_environment(), capture_output=True, text=True, check=True
+    )
+    measured = json.loads(result.stdout.strip().splitlines()[-1])
+    return measured["seconds"], measured["modules"]
+
+
+def slowest_imports(backend_dir: str, top: int):
+    """The top-level packages that took longest to import (their own modules' µs), from -X importtime"""
+    result = subprocess.run(
+        [sys.executable, "-W", "ignore", "-X", "importtime", "-c", "import app.main"],
+        cwd=backend_dir, env=_environment(), capture_output=True, text=True, check=True
+    )
+    packages = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, _, _, name = match.groups()
+            package = name.split(".")[0]
+            packages[package] = packages.get(package, 0) + int(self_us)
+    return sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=1200, help="Maximum median import time of app.main")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to time")
+    parser.add_argument("--top", type=int, default=15, help="Slowest packages to list")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    probe(backend_dir)  # Warm the filesystem cache and bytecode
+    timings, leaked = [], set()
+    for _ in range(args.runs):
+        seconds, modules = probe(backend_dir)
+        timings.append(seconds * 1000)
+        leaked.update(modules)
+    median_ms = statistics.median(timings)
+
+    print(f"import app.main: median {median_ms:.0f} ms, min {min(timings):.0f} ms, "
+          f"max {max(timings):.0f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    packages = slowest_imports(backend_dir, args.top)
+    for package, self_us in packages:
+        print(f"  {package:30} {self_us / 1000:8.1f} ms")
+
+    failures = []
+    if median_ms > args.budget_ms:
+        failures.append(f"median import time {median_ms:.0f} ms exceeds the {args.budget_ms:.0f} ms budget")
+    if leaked:
+        failures.append(f"imported at startup instead of on first use: {', '.join(sorted(leaked))}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "median_ms": median_ms,
+                "timings_ms": timings,
+                "budget_ms": args.budget_ms,
+                "eagerly_imported": sorted(leaked),
+                "slowest_packages_ms": {package: self_us / 1000 for package, self_us in packages},
+                "passed": not failures,
+            }, f, indent=2)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
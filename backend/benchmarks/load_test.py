@@ -0,0 +1,255 @@
+"""
+Load test for one API worker against a local fake Gemini
+Starts benchmarks.fake_gemini in-process and the app (benchmarks.serve_app, one uvicorn
+worker on SQLite) as a subprocess, then drives a mix of upload, query and visualize
+requests at each target rate for a fixed duration (open loop: arrivals don't wait for
+responses). Reports throughput, p50/p95/p99 latency and error rate per endpoint and rate,
+so the rate where p99 blows up is visible.
+
+Run from the backend directory:
+    python -m benchmarks.load_test                                   # 1, 2, 4, 8 req/s for 30s each
+    python -m benchmarks.load_test --rates 5,10,20 --latency-ms 1500 --output load.json
+    python -m benchmarks.load_test --target http://localhost:8000    # an already running deployment
+With --target the deployment must itself point GEMINI_API_ENDPOINT at a fake Gemini
+(python -m benchmarks.fake_gemini).
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.fake_gemini import FakeGemini, FakeGeminiServer
+from benchmarks.workload import workbook_path
+
+# Request kinds: (endpoint label, path)
+REQUEST_KINDS = {
+    "upload": ("POST /api/upload", "/api/upload"),
+    "query": ("POST /api/query (data)", "/api/query"),
+    "query_chart": ("POST /api/query (chart)", "/api/query"),
+    "visualize": ("POST /api/visualize", "/api/visualize"),
+}
+DEFAULT_MIX = "upload=1,query=6,query_chart=1,visualize=2"
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """'query=6,visualize=2' -> {'query': 6.0, 'visualize': 2.0}"""
+    mix = {}
+    for item in spec.split(","):
+        kind, _, weight = item.strip().partition("=")
+        if kind not in REQUEST_KINDS:
+            raise ValueError(f"Unknown request kind {kind!r}; expected one of {', '.join(REQUEST_KINDS)}")
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of sorted values"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, math.ceil(fraction * len(values)) - 1))]
+
+
+class LoadTest:
+    def __init__(self, base_url: str, workbook: str, mix: Dict[str, float], sessions: int,
+                 timeout: float, seed: int):
+        self.base_url = base_url
+        self.workbook_name = os.path.basename(workbook)
+        with open(workbook, "rb") as f:
+            self.workbook = f.read()
+        self.kinds = list(mix)
+        self.weights = [mix[kind] for kind in self.kinds]
+        self.session_count = sessions
+        self.session_ids: List[str] = []
+        self.timeout = timeout
+        self.random = random.Random(seed)
+
+    async def _request(self, client: httpx.AsyncClient, kind: str) -> httpx.Response:
+        path = REQUEST_KINDS[kind][1]
+        if kind == "upload":
+            return await client.post(path, files=[("file", (self.workbook_name, self.workbook))])
+        session_id = self.random.choice(self.session_ids)
+        if kind == "query":
+            return await client.post(path, json={"session_id": session_id, "question": "total amount by branch"})
+        if kind == "query_chart":
+            return await client.post(path, json={"session_id": session_id, "question": "chart amount by branch"})
+        return await client.post(path, json={"session_id": session_id, "request": "bar chart of amount by branch"})
+
+    async def setup(self, client: httpx.AsyncClient):
+        """Wait for the app, then upload the workbook into the sessions queries run against"""
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{self.base_url} did not become healthy")
+            await asyncio.sleep(0.2)
+        for _ in range(self.session_count):
+            response = await self._request(client, "upload")
+            response.raise_for_status()
+            self.session_ids.append(response.json()["session_id"])
+
+    async def run_rate(self, client: httpx.AsyncClient, rate: float, duration: float,
+                       max_in_flight: int):
+        """Poisson arrivals at rate req/s for duration seconds; returns (one sample per request, elapsed s)"""
+        samples = []
+        tasks = set()
+
+        async def one(kind: str):
+            started = time.perf_counter()
+            error = None
+            try:
+                response = await self._request(client, kind)
+                if response.status_code != 200:
+                    error = f"HTTP {response.status_code}"
+            except httpx.HTTPError as e:
+                error = type(e).__name__
+            samples.append({"kind": kind, "latency_ms": (time.perf_counter() - started) * 1000, "error": error})
+
+        started = time.perf_counter()
+        next_arrival = started
+        while next_arrival - started < duration:
+            await asyncio.sleep(max(0.0, next_arrival - time.perf_counter()))
+            kind = self.random.choices(self.kinds, self.weights)[0]
+            if len(tasks) >= max_in_flight:
+                samples.append({"kind": kind, "latency_ms": 0.0, "error": "client in-flight limit"})
+            else:
+                task = asyncio.create_task(one(kind))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            next_arrival += self.random.expovariate(rate)
+        if tasks:
+            await asyncio.wait(tasks)
+        return samples, time.perf_counter() - started
+
+    async def run(self, rates: List[float], duration: float, max_in_flight: int) -> List[dict]:
+        limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=limits) as client:
+            await self.setup(client)
+            results = []
+            for rate in rates:
+                print(f"[{rate:g} req/s for {duration:g}s]", flush=True)
+                samples, elapsed = await self.run_rate(client, rate, duration, max_in_flight)
+                for row in summarize(samples, elapsed):
+                    results.append({"target_rate": rate, **row})
+                    print(f"  {row['endpoint']:<26} {row['requests']:>6} req {row['throughput']:>7.2f}/s  "
+                          f"p50 {row['p50_ms']:>8.1f}  p95 {row['p95_ms']:>8.1f}  p99 {row['p99_ms']:>8.1f} ms  "
+                          f"errors {row['error_rate']:.1%}", flush=True)
+            return results
+
+
+def summarize(samples: List[dict], elapsed: float) -> List[dict]:
+    """Per-endpoint statistics, plus an "all" row; latencies only cover successful requests"""
+    groups: Dict[str, List[dict]] = {label: [] for label, _ in REQUEST_KINDS.values()}
+    for sample in samples:
+        groups[REQUEST_KINDS[sample["kind"]][0]].append(sample)
+    groups = {label: group for label, group in groups.items() if group}
+    groups["all"] = samples
+    rows = []
+    for endpoint, group in groups.items():
+        latencies = sorted(s["latency_ms"] for s in group if s["error"] is None)
+        errors: Dict[str, int] = {}
+        for s in group:
+            if s["error"] is not None:
+                errors[s["error"]] = errors.get(s["error"], 0) + 1
+        rows.append({
+            "endpoint": endpoint,
+            "requests": len(group),
+            "throughput": len(latencies) / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(latencies, 0.50),
+            "p95_ms": percentile(latencies, 0.95),
+            "p99_ms": percentile(latencies, 0.99),
+            "max_ms": latencies[-1] if latencies else 0.0,
+            "error_rate": sum(errors.values()) / len(group) if group else 0.0,
+            "errors": errors,
+        })
+    return rows
+
+
+def start_app(port: int, gemini_url: str, work_dir: str, postgres: bool) -> subprocess.Popen:
+    env = {**os.environ, "GEMINI_API_KEY": os.environ.get("GEMINI_API_KEY") or "fake",
+           "GEMINI_API_ENDPOINT": gemini_url, "MAX_FILE_SIZE": str(1 << 30)}
+    command = [sys.executable, "-m", "benchmarks.serve_app", "--port", str(port), "--work-dir", work_dir]
+    if postgres:
+        command.append("--postgres")
+    return subprocess.Popen(command, env=env, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rates", default="1,2,4,8", help="Comma-separated target request rates (req/s)")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per rate")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Request kind weights ({', '.join(REQUEST_KINDS)})")
+    parser.add_argument("--rows", type=int, default=10_000, help="Rows in the uploaded workbook")
+    parser.add_argument("--sheets", type=int, default=1)
+    parser.add_argument("--sessions", type=int, default=4, help="Sessions queries are spread over")
+    parser.add_argument("--latency-ms", type=float, default=800, help="Mean fake Gemini latency per call")
+    parser.add_argument("--jitter-ms", type=float, default=200)
+    parser.add_argument("--gemini-error-rate", type=float, default=0, help="Fraction of failing Gemini calls")
+    parser.add_argument("--timeout", type=float, default=120, help="Per-request client timeout (s)")
+    parser.add_argument("--max-in-flight", type=int, default=1000,
+                        help="Outstanding requests beyond this count as errors")
+    parser.add_argument("--target", help="Base URL of a running deployment (skips starting the app)")
+    parser.add_argument("--port", type=int, default=8001, help="Port for the started app")
+    parser.add_argument("--postgres", action="store_true", help="Started app uses the configured PostgreSQL")
+    parser.add_argument("--data-dir", default=os.path.join(os.path.dirname(__file__), ".data"))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    try:
+        rates = [float(rate) for rate in args.rates.split(",") if rate.strip()]
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    workbook = workbook_path(args.data_dir, args.rows, args.sheets, args.seed)
+    fake = FakeGemini(args.latency_ms, args.jitter_ms, args.gemini_error_rate, seed=args.seed)
+    gemini = None
+    app_process = None
+    work_dir = tempfile.mkdtemp(prefix="load_test_")
+    base_url = args.target
+    if base_url is None:
+        gemini = FakeGeminiServer(fake).start()
+        app_process = start_app(args.port, gemini.url, work_dir, args.postgres)
+        base_url = f"http://127.0.0.1:{args.port}"
+
+    try:
+        test = LoadTest(base_url, workbook, mix, args.sessions, args.timeout, args.seed)
+        results = asyncio.run(test.run(rates, args.duration, args.max_in_flight))
+    finally:
+        if app_process is not None:
+            app_process.terminate()
+            app_process.wait(timeout=30)
+        if gemini is not None:
+            gemini.shutdown()
+            gemini.server_close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if gemini is not None:
+        print(f"Fake Gemini calls: {json.dumps(fake.calls, sort_keys=True)}")
+    if args.output:
+        from benchmarks.bench_pipeline import environment
+        with open(args.output, "w") as f:
+            json.dump({
+                "environment": environment(),
+                "config": {key: value for key, value in vars(args).items() if key != "output"},
+                "gemini_calls": fake.calls if gemini is not None else None,
+                "results": results,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
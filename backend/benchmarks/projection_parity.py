@@ -0,0 +1,115 @@
+"""
+Correctness check of column projection (code_analysis.referenced_columns)
+Runs generated-style query and chart code once against whole sheets and once against sheets
+projected onto the columns the analysis says the code needs, and fails (exit status 1)
+when a result or figure differs, or when a case isn't projected (or is) as expected.
+Cases include the wide-form plotly express calls that read every column of a frame, and
+row methods whose rows depend on every column (dropna, drop_duplicates) - the test sheet has
+missing values and duplicates in a column the code doesn't name.
+
+Run from the backend directory:
+    python -m benchmarks.projection_parity
+    python -m benchmarks.projection_parity --rows 5000 --output projection.json
+"""
+import argparse
+import json
+import sys
+
+import pandas as pd
+import plotly.express as px
+from app.services.chart_generator import ChartGenerator
+from app.services.chart_serializer import dumps_chart
+from app.services.code_analysis import referenced_columns
+from app.services.excel_parser import ExcelParser
+from benchmarks.workload import make_dataframe
+
+SHEET = "Sheet_1"
+
+# name -> (code, whether the sheet should be projected); code sets result or fig
+CASES = {
+    "groupby_sum": ("result = dataframes['Sheet_1'].groupby('Branch')['Amount'].sum()", True),
+    "filter_top10_columns": ("df = dataframes['Sheet_1']\n"
+                             "result = df[df['Quantity'] > 25].nlargest(10, 'Amount')[['Branch', 'Amount']]", True),
+    "filter_top10_rows": ("df = dataframes['Sheet_1']\nresult = df[df['Quantity'] > 25].nlargest(10, 'Amount')", False),
+    "query_expression": ("result = dataframes['Sheet_1'].query('Amount > 1000')[['Branch', 'Amount']]", True),
+    "describe": ("result = dataframes['Sheet_1'].describe()", False),
+    "dropna": ("df = dataframes['Sheet_1']\nresult = df.dropna()['Amount'].sum()", False),
+    "dropna_subset": ("result = dataframes['Sheet_1'].dropna(subset=['Amount'])['Amount'].sum()", True),
+    "drop_duplicates": ("result = dataframes['Sheet_1'].drop_duplicates()['Amount'].sum()", False),
+    "drop_duplicates_subset": ("result = dataframes['Sheet_1'].drop_duplicates(subset=['Branch', 'Amount'])['Amount'].sum()",
+                               True),
+    "drop_duplicates_positional": ("result = dataframes['Sheet_1'].drop_duplicates('Amount')['Amount'].sum()", True),
+    "bar": ("df = dataframes['Sheet_1'].groupby('Branch', as_index=False)['Amount'].sum()\n"
+            "fig = px.bar(df, x='Branch', y='Amount')", True),
+    "scatter_color": ("fig = px.scatter(dataframes['Sheet_1'], x='Quantity', y='Amount', color='Branch')", True),
+    "line_y_list": ("fig = px.line(dataframes['Sheet_1'].head(50), x='Date', y=['Price', 'Amount'])", True),
+    "histogram": ("fig = px.histogram(dataframes['Sheet_1'], x='Amount')", True),
+    "pie": ("fig = px.pie(dataframes['Sheet_1'], names='Branch', values='Amount')", True),
+    "density_heatmap": ("fig = px.density_heatmap(dataframes['Sheet_1'], x='Branch', y='Account', z='Amount')", True),
+    # Wide-form: px plots every column it isn't told about
+    "line_wide_set_index": ("fig = px.line(dataframes['Sheet_1'].head(50).set_index('Date'))", False),
+    "area_without_y": ("fig = px.area(dataframes['Sheet_1'].head(50), x='Date')", False),
+    "box_wide": ("fig = px.box(dataframes['Sheet_1'])", False),
+    "imshow_selected": ("fig = px.imshow(dataframes['Sheet_1'].head(20).set_index('Date')[['Quantity', 'Price']])", True),
+    "imshow": ("fig = px.imshow(dataframes['Sheet_1'].head(20).set_index(['Date', 'Branch', 'Product', 'Account']))",
+               False),
+    "scatter_matrix": ("fig = px.scatter_matrix(dataframes['Sheet_1'].head(100))", False),
+    "parallel_coordinates": ("fig = px.parallel_coordinates(dataframes['Sheet_1'].head(100))", False),
+    "positional_xy": ("df = dataframes['Sheet_1']\nfig = px.scatter(df, 'Quantity', 'Amount')", False),
+}
+
+
+def test_frame(rows: int, seed: int) -> pd.DataFrame:
+    """A benchmark sheet with missing Accounts, and repeated rows - some differing only in Product"""
+    frame = make_dataframe(rows, seed)
+    frame["Account"] = frame["Account"].mask(frame.index % 7 == 0)
+    repeats = frame.head(rows // 10).assign(Product="Other")
+    return pd.concat([frame, repeats, frame.head(rows // 20)], ignore_index=True)
+
+
+def run(code: str, frame: pd.DataFrame) -> bytes:
+    """The code's result or figure - or the error it raised - serialized for comparison"""
+    try:
+        if "fig =" in code:
+            return dumps_chart({"chart_data": ChartGenerator().execute_chart_code(code, {SHEET: frame})})
+        namespace = {"pd": pd, "px": px, "dataframes": {SHEET: frame}}
+        exec(code, namespace)
+        result = namespace["result"]
+        return result.to_json(date_format="iso").encode() if hasattr(result, "to_json") else repr(result).encode()
+    except Exception as e:
+        return f"error: {e}".encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000, help="Rows of the test sheet")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    frame = test_frame(args.rows, args.seed)
+    schema_info = ExcelParser.extract_schema_info({SHEET: frame})
+
+    results, failures = [], 0
+    for name, (code, expect_projected) in CASES.items():
+        columns = referenced_columns(code, schema_info)[SHEET]
+        problems = []
+        if (columns is not None) != expect_projected:
+            problems.append(f"expected the sheet to be {'projected' if expect_projected else 'read whole'}")
+        if columns is not None and run(code, frame) != run(code, frame[columns]):
+            problems.append(f"output differs when projected onto {columns}")
+        failures += bool(problems)
+        print(f"{'FAIL' if problems else 'ok  '} {name:26} {'whole' if columns is None else columns}")
+        for problem in problems:
+            print(f"       {problem}")
+        results.append({"case": name, "columns": columns, "problems": problems})
+
+    print(f"\n{len(CASES) - failures} of {len(CASES)} cases passed")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"rows": args.rows, "results": results, "passed": not failures}, f, indent=2)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Run the API under a single uvicorn worker for load tests
+By default the app uses a scratch SQLite database, so no PostgreSQL is needed;
+--postgres keeps the DB_* settings from the environment instead.
+Set GEMINI_API_ENDPOINT to a benchmarks.fake_gemini server to avoid the real API.
+
+Run from the backend directory:
+    GEMINI_API_KEY=fake GEMINI_API_ENDPOINT=http://127.0.0.1:8090 python -m benchmarks.serve_app --port 8001
+"""
+import argparse
+import os
+import tempfile
+
+# Single node, no shared store or trace export, unless the environment says otherwise
+for key, value in {"PORT": "8000", "DB_PORT": "5432", "SHARED_STORE_DIR": "", "BLOB_BACKEND": "",
+                   "TRACE_EXPORT_PATH": "", "CACHE_INVALIDATION_CHANNEL": ""}.items():
+    os.environ.setdefault(key, value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--postgres", action="store_true", help="Use the configured PostgreSQL database")
+    parser.add_argument("--work-dir", help="Where the SQLite database and uploads go (default: a new temp dir)")
+    args = parser.parse_args()
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="serve_app_")
+    if not args.postgres:
+        from benchmarks.bench_pipeline import use_sqlite
+        use_sqlite(os.path.join(work_dir, "app.db"))
+
+    import uvicorn
+    from app.main import app
+    import app.services.shared as shared
+    shared.db_session_manager.upload_dir = os.path.join(work_dir, "uploads")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Synthetic finance workbooks for the benchmarks, shaped like generate_test_data.py output
+(dated transactions with a few low-cardinality text columns and numeric measures).
+Workbooks are cached in the data directory by (rows, sheets, seed), so repeated runs
+don't pay the slow xlsx write again.
+"""
+import os
+import numpy as np
+import pandas as pd
+
+BRANCHES = ["North", "South", "East", "West", "Central"]
+PRODUCTS = [f"Product {chr(ord('A') + i)}" for i in range(12)]
+ACCOUNTS = ["Revenue", "Cost of Sales", "Salaries", "Rent", "Marketing", "Utilities", "Supplies"]
+
+# Excel's per-sheet row limit (minus the header row)
+MAX_SHEET_ROWS = 1_048_575
+
+
+def make_dataframe(rows: int, seed: int = 0) -> pd.DataFrame:
+    """One transactions sheet"""
+    rng = np.random.default_rng(seed)
+    quantity = rng.integers(1, 50, rows)
+    price = rng.uniform(5, 500, rows).round(2)
+    return pd.DataFrame({
+        "Date": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 366, rows), unit="D"),
+        "Branch": rng.choice(BRANCHES, rows),
+        "Product": rng.choice(PRODUCTS, rows),
+        "Account": rng.choice(ACCOUNTS, rows),
+        "Quantity": quantity,
+        "Price": price,
+        "Amount": (quantity * price).round(2),
+    })
+
+
+def sheet_rows(total_rows: int, sheets: int) -> list:
+    """Split a total row count over sheets"""
+    base, extra = divmod(total_rows, sheets)
+    rows = [base + (1 if i < extra else 0) for i in range(sheets)]
+    if max(rows) > MAX_SHEET_ROWS:
+        raise ValueError(f"{total_rows} rows over {sheets} sheets exceeds Excel's {MAX_SHEET_ROWS} rows per sheet")
+    return rows
+
+
+def workbook_path(data_dir: str, rows: int, sheets: int, seed: int = 0) -> str:
+    """Path of the cached workbook for these parameters, generating it if missing"""
+    path = os.path.join(data_dir, f"bench_{rows}r_{sheets}s_seed{seed}.xlsx")
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        tmp_path = path + ".tmp.xlsx"
+        with pd.ExcelWriter(tmp_path, engine="openpyxl") as writer:
+            for index, count in enumerate(sheet_rows(rows, sheets)):
+                make_dataframe(count, seed + index).to_excel(writer, sheet_name=f"Sheet_{index + 1}", index=False)
+        os.replace(tmp_path, path)
+    return path
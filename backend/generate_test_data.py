@@ -1,10 +1,25 @@
 """
 Script to generate sample multi-sheet Excel files for testing
+
+Without arguments it writes the small sample workbooks in test_data/. With --rows it
+generates synthetic finance workbooks of any size for benchmarks and load tests:
+
+    python generate_test_data.py --rows 1000000 --sheets 10
+    python generate_test_data.py --rows 5000000 --sheets 20 --files 8 --workers 8 \
+        --columns date=1,category=4,integer=2,amount=6 --cardinality 500 --seed 42
+
+Rows are generated vectorized in chunks and streamed through openpyxl's write-only mode,
+so memory stays flat however large the workbook. An xlsx file is a single zip stream,
+so parallelism is across workbooks: each of --files workbooks is written by its own process.
+Output is deterministic for a given seed, independent of --workers.
 """
+import argparse
 import pandas as pd
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 import os
+import time
 
 def generate_sales_data():
     """Generate sample sales data across multiple sheets"""
@@ -280,6 +295,141 @@ def generate_sales_data():
     print("\nYou can now upload these files to test the multi-sheet functionality!")
 
 
+# ============================================
+# Synthetic workbooks of any size
+# ============================================
+
+# Column kinds and the names given to successive columns of each kind
+COLUMN_NAMES = {
+    'date': ['Date', 'Posting_Date', 'Due_Date'],
+    'category': ['Branch', 'Product', 'Account', 'Region', 'Channel', 'Cost_Center', 'Currency'],
+    'id': ['Transaction_ID', 'Invoice_ID', 'Customer_ID'],
+    'integer': ['Quantity', 'Units', 'Orders'],
+    'amount': ['Price', 'Amount', 'Revenue', 'Cost', 'Tax', 'Discount', 'Profit'],
+}
+# Default mix matches the benchmark workload: Date, Branch, Product, Account, Quantity, Price, Amount
+DEFAULT_COLUMNS = 'date=1,category=3,integer=1,amount=2'
+CATEGORY_VALUES = {
+    'Branch': ['North', 'South', 'East', 'West', 'Central'],
+    'Account': ['Revenue', 'Cost of Sales', 'Salaries', 'Rent', 'Marketing', 'Utilities', 'Supplies'],
+    'Currency': ['USD', 'EUR', 'GBP', 'JPY', 'CHF'],
+}
+CHUNK_ROWS = 50_000
+MAX_SHEET_ROWS = 1_048_575  # Excel's row limit minus the header
+
+
+def parse_column_mix(spec):
+    """Parse 'date=1,category=3,...' into a list of (kind, column name)"""
+    columns = []
+    for part in spec.split(','):
+        kind, _, count = part.strip().partition('=')
+        if kind not in COLUMN_NAMES:
+            raise ValueError(f"Unknown column kind '{kind}' (expected one of: {', '.join(COLUMN_NAMES)})")
+        names = COLUMN_NAMES[kind]
+        for i in range(int(count or 1)):
+            columns.append((kind, names[i] if i < len(names) else f"{names[0]}_{i + 1}"))
+    return columns
+
+
+def category_values(name, cardinality):
+    """Distinct values of a text column - realistic names first, numbered ones beyond them"""
+    values = list(CATEGORY_VALUES.get(name, []))[:cardinality]
+    values += [f"{name.replace('_', ' ')} {i + 1}" for i in range(len(values), cardinality)]
+    return np.array(values, dtype=object)
+
+
+def generate_chunk(rng, columns, rows, cardinality, start_row):
+    """One chunk of rows as a list of column arrays"""
+    data = []
+    for kind, name in columns:
+        if kind == 'date':
+            days = rng.integers(0, 3 * 365, rows)
+            data.append((np.datetime64('2022-01-01') + days).astype('datetime64[s]').astype(datetime))
+        elif kind == 'category':
+            data.append(category_values(name, cardinality)[rng.integers(0, cardinality, rows)])
+        elif kind == 'id':
+            data.append(np.array([f"{name[:3].upper()}{i:09d}" for i in range(start_row, start_row + rows)], dtype=object))
+        elif kind == 'integer':
+            data.append(rng.integers(1, 500, rows))
+        else:
+            # Log-normal amounts, like real transaction values
+            data.append(np.round(rng.lognormal(mean=6, sigma=1.2, size=rows), 2))
+    return data
+
+
+def generate_workbook(path, rows, sheets=1, columns=DEFAULT_COLUMNS, cardinality=20, seed=0):
+    """
+    Write one synthetic workbook with `rows` rows spread over `sheets` sheets.
+    Chunks are streamed through a write-only workbook, so memory use doesn't grow with size.
+    """
+    import openpyxl
+
+    column_mix = parse_column_mix(columns)
+    base, extra = divmod(rows, sheets)
+    sheet_rows = [base + (1 if i < extra else 0) for i in range(sheets)]
+    if max(sheet_rows) > MAX_SHEET_ROWS:
+        raise ValueError(f"{rows} rows over {sheets} sheets exceeds Excel's {MAX_SHEET_ROWS} rows per sheet")
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    workbook = openpyxl.Workbook(write_only=True)
+    # Independent, reproducible random stream per sheet
+    for index, (count, sheet_seed) in enumerate(zip(sheet_rows, np.random.SeedSequence(seed).spawn(sheets))):
+        rng = np.random.default_rng(sheet_seed)
+        worksheet = workbook.create_sheet(f"Sheet_{index + 1}")
+        worksheet.append([name for _, name in column_mix])
+        for start in range(0, count, CHUNK_ROWS):
+            chunk = generate_chunk(rng, column_mix, min(CHUNK_ROWS, count - start), cardinality, start)
+            for row in zip(*(column.tolist() for column in chunk)):
+                worksheet.append(row)
+
+    # Write next to the target and rename, so readers never see a partial workbook
+    tmp_path = path + '.tmp.xlsx'
+    workbook.save(tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _generate_file(job):
+    """Process pool entry point - returns the path and the seconds it took"""
+    started = time.perf_counter()
+    path = generate_workbook(*job)
+    return path, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, help='Rows per workbook (omit to write the sample workbooks)')
+    parser.add_argument('--sheets', type=int, default=1, help='Sheets per workbook')
+    parser.add_argument('--files', type=int, default=1, help='Number of workbooks')
+    parser.add_argument('--columns', default=DEFAULT_COLUMNS,
+                        help=f"Column mix as kind=count pairs; kinds: {', '.join(COLUMN_NAMES)} (default: {DEFAULT_COLUMNS})")
+    parser.add_argument('--cardinality', type=int, default=20, help='Distinct values per category column')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Parallel processes (one workbook each)')
+    parser.add_argument('--output-dir', default='test_data/generated')
+    args = parser.parse_args()
+
+    if args.rows is None:
+        generate_sales_data()
+        return
+
+    parse_column_mix(args.columns)  # Fail fast on a bad spec, before starting workers
+    jobs = [
+        (os.path.join(args.output_dir, f"synthetic_{args.rows}r_{args.sheets}s_{i + 1}.xlsx"),
+         args.rows, args.sheets, args.columns, args.cardinality, args.seed + i)
+        for i in range(args.files)
+    ]
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, min(args.workers, len(jobs)))) as executor:
+        for path, seconds in executor.map(_generate_file, jobs):
+            size_mb = os.path.getsize(path) / (1024 * 1024)
+            print(f"✓ {path}: {args.rows} rows, {args.sheets} sheets, {size_mb:.1f} MB in {seconds:.1f}s")
+
+    total_rows = args.rows * args.files
+    elapsed = time.perf_counter() - started
+    print(f"\nGenerated {total_rows} rows in {elapsed:.1f}s ({total_rows / elapsed:,.0f} rows/s)")
+
+
 if __name__ == "__main__":
-    generate_sales_data()
+    main()
 
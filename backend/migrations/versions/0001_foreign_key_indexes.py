@@ -0,0 +1,39 @@
+"""Index the session_id / uploaded_file_id foreign keys
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (index name, table, column) - names match SQLAlchemy's index=True naming
+INDEXES = [
+    ("ix_uploaded_files_session_id", "uploaded_files", "session_id"),
+    ("ix_sheets_session_id", "sheets", "session_id"),
+    ("ix_sheets_uploaded_file_id", "sheets", "uploaded_file_id"),
+    ("ix_conversations_session_id", "conversations", "session_id"),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction, and avoids blocking writes
+    with op.get_context().autocommit_block():
+        for name, table, column in INDEXES:
+            op.create_index(name, table, [column], if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in INDEXES:
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,53 @@
+"""Composite (session_id, created_at, id) index for conversation history pagination
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_conversations_session_created_id",
+            "conversations",
+            ["session_id", "created_at", "id"],
+            if_not_exists=True,
+            postgresql_concurrently=True
+        )
+        # The composite index covers session_id lookups, so the single-column one is redundant
+        op.drop_index(
+            "ix_conversations_session_id",
+            table_name="conversations",
+            if_exists=True,
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_conversations_session_id",
+            "conversations",
+            ["session_id"],
+            if_not_exists=True,
+            postgresql_concurrently=True
+        )
+        op.drop_index(
+            "ix_conversations_session_created_id",
+            table_name="conversations",
+            if_exists=True,
+            postgresql_concurrently=True
+        )
@@ -1,16 +1,19 @@
 import { useState, useRef } from 'react';
 import apiService from '../services/api';
 
+// Excel workbooks, or CSV / Parquet / JSON-lines tables (one sheet each)
+const SUPPORTED_EXTENSIONS = ['xlsx', 'xls', 'csv', 'parquet', 'ndjson', 'jsonl'];
+
 const FileUpload = ({ onUploadSuccess, onUploadError }) => {
   const [isDragging, setIsDragging] = useState(false);
   const [isUploading, setIsUploading] = useState(false);
   const [uploadedFiles, setUploadedFiles] = useState([]);
   const fileInputRef = useRef(null);
 
-  // Validate file type - only allow .xlsx and .xls
+  // Validate file type
   const isValidFileType = (fileName) => {
     const extension = fileName.toLowerCase().split('.').pop();
-    return extension === 'xlsx' || extension === 'xls';
+    return SUPPORTED_EXTENSIONS.includes(extension);
   };
 
   const handleDragEnter = (e) => {
@@ -41,7 +44,7 @@ const FileUpload = ({ onUploadSuccess, onUploadError }) => {
 
     if (invalidFiles.length > 0) {
       const invalidNames = invalidFiles.map(f => f.name).join(', ');
-      onUploadError?.(`Invalid file type(s): ${invalidNames}. Only .xlsx and .xls files are allowed.`);
+      onUploadError?.(`Invalid file type(s): ${invalidNames}. Only .xlsx, .xls, .csv, .parquet, .ndjson and .jsonl files are allowed.`);
     }
 
     if (validFiles.length > 0) {
@@ -61,7 +64,7 @@ const FileUpload = ({ onUploadSuccess, onUploadError }) => {
 
     if (invalidFiles.length > 0) {
       const invalidNames = invalidFiles.map(f => f.name).join(', ');
-      onUploadError?.(`Invalid file type(s): ${invalidNames}. Only .xlsx and .xls files are allowed.`);
+      onUploadError?.(`Invalid file type(s): ${invalidNames}. Only .xlsx, .xls, .csv, .parquet, .ndjson and .jsonl files are allowed.`);
     }
 
     if (validFiles.length > 0) {
@@ -105,7 +108,7 @@ const FileUpload = ({ onUploadSuccess, onUploadError }) => {
           ref={fileInputRef}
           type="file"
           multiple
-          accept=".xlsx,.xls"
+          accept=".xlsx,.xls,.csv,.parquet,.ndjson,.jsonl"
           onChange={handleFileSelect}
           style={{ display: 'none' }}
         />
@@ -130,7 +133,7 @@ const FileUpload = ({ onUploadSuccess, onUploadError }) => {
             <p className="upload-text">
               <strong>Click to upload</strong> or drag and drop
             </p>
-            <p className="upload-hint">Excel files (.xlsx, .xls) - Multiple files supported</p>
+            <p className="upload-hint">Excel (.xlsx, .xls), CSV, Parquet or JSON-lines files - Multiple files supported</p>
           </div>
         )}
       </div>
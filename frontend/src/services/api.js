@@ -2,6 +2,9 @@ import axios from 'axios';
 
 const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000';
 
+// Opt in to base64 typed arrays (plotly.js bdata) for chart trace data
+const CHART_ACCEPT_HEADER = 'application/vnd.plotly.bdata+json, application/json';
+
 const api = axios.create({
   baseURL: API_BASE_URL,
   headers: {
@@ -68,6 +71,8 @@ class ApiService {
       const response = await api.post('/api/query', {
         session_id: sessionId,
         question: question,
+      }, {
+        headers: { Accept: CHART_ACCEPT_HEADER },
       });
       
       // Update session ID if returned
@@ -90,6 +95,8 @@ class ApiService {
       const response = await api.post('/api/visualize', {
         session_id: sessionId,
         request: request,
+      }, {
+        headers: { Accept: CHART_ACCEPT_HEADER },
       });
       
       // Update session ID if returned